@@ -0,0 +1,52 @@
+"""
+Measures how long it takes a fresh interpreter to import doctor modules.
+
+Usage::
+
+    python benchmarks/import_time.py [-n RUNS] [module ...]
+
+Each module is imported in a new python process so that nothing is cached
+between runs.  The fastest and median times are reported in milliseconds.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+#: Modules timed when none are given on the command line.
+DEFAULT_MODULES = ('doctor', 'doctor.types', 'doctor.routing', 'doctor.flask',
+                   'doctor.schema', 'doctor.resource')
+
+_TIMER = ('import time; start = time.perf_counter(); import {module}; '
+          'print(time.perf_counter() - start)')
+
+
+def time_import(module: str, runs: int) -> list:
+    """Returns a list of import times in seconds for a module.
+
+    :param module: The dotted name of the module to import.
+    :param runs: The number of fresh interpreters to time the import in.
+    """
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-c', _TIMER.format(module=module)])
+        times.append(float(output))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    print('{:<20} {:>10} {:>10}'.format('module', 'min (ms)', 'median (ms)'))
+    for module in args.modules:
+        times = time_import(module, args.runs)
+        print('{:<20} {:>10.1f} {:>10.1f}'.format(
+            module, min(times) * 1000, statistics.median(times) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,33 @@
 from __future__ import absolute_import
+
+import importlib
+import sys
+
 from ._version import __version__
 
-from . import errors
-from . import parsers
-from . import response
-from . import resource
-from . import routing
-from . import schema
+#: Submodules exposed as attributes of the package.  They are imported on
+#: first access so that importing `doctor` (or only `doctor.types`) does not
+#: pull in jsonschema, yaml and the other dependencies used by schemas.
+_SUBMODULES = ('errors', 'parsers', 'response', 'resource', 'routing',
+               'schema')
+
+__all__ = ['__version__', 'errors', 'parsers', 'response', 'resource',
+           'routing', 'schema']
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_SUBMODULES))
+
 
-__all__ = [__version__, errors, parsers, response, resource, routing, schema]
+# Module level __getattr__ is only supported on python 3.7+, so eagerly
+# import the submodules on older versions.
+if sys.version_info < (3, 7):  # pragma: no cover
+    for _name in _SUBMODULES:
+        importlib.import_module('.' + _name, __name__)
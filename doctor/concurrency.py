@@ -0,0 +1,159 @@
+"""
+Concurrency limits protect a worker from slow routes using all of its threads.
+
+A :class:`ConcurrencyLimit` caps the number of requests that are handled at
+once, and the number of requests that may wait for one of those slots.
+Requests beyond both are shed immediately with a
+:class:`~doctor.errors.ServiceUnavailableError`, which is returned as a 503
+response with a `Retry-After` header, instead of queueing behind requests that
+are waiting on a slow dependency.
+
+A limit can be set for a route with the `concurrency_limit` kwarg, shared by
+several routes that use the same dependency, and set for all routes with
+:func:`set_global_concurrency_limit`.
+"""
+import threading
+from typing import Iterable, List, Optional
+
+from doctor.errors import ServiceUnavailableError
+
+
+class ConcurrencyLimit(object):
+    """Limits the number of requests that are handled at once.
+
+    The `active`, `queued` and `shed` attributes count the requests that are
+    being handled, that are waiting for a slot and that were rejected.
+
+    :param max_concurrent: The maximum number of requests handled at once.
+    :param max_queued: The maximum number of requests that may wait for a
+        slot.  Requests over this limit are shed immediately.
+    :param queue_timeout: The maximum number of seconds a request waits for a
+        slot before it's shed.  If None requests wait until a slot is free.
+    :param retry_after: The number of seconds clients are asked to wait
+        before retrying a shed request.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int = 0,
+                 queue_timeout: float = None, retry_after: int = 1):
+        if max_concurrent < 1:
+            raise ValueError('max_concurrent must be at least 1.')
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        #: The number of requests being handled.
+        self.active = 0
+        #: The number of requests waiting for a slot.
+        self.queued = 0
+        #: The number of requests that were shed.
+        self.shed = 0
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return ('ConcurrencyLimit(max_concurrent={}, max_queued={}, '
+                'queue_timeout={}, retry_after={})'.format(
+                    self.max_concurrent, self.max_queued,
+                    self.queue_timeout, self.retry_after))
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def _has_slot(self) -> bool:
+        return self.active < self.max_concurrent
+
+    def _shed(self):
+        self.shed += 1
+        raise ServiceUnavailableError(
+            'Too many requests are being handled, try again later.',
+            retry_after=self.retry_after)
+
+    def acquire(self):
+        """Acquires a slot, waiting for one if the queue isn't full.
+
+        :raises ServiceUnavailableError: If the request is shed.
+        """
+        with self._condition:
+            if self._has_slot():
+                self.active += 1
+                return
+            if self.queued >= self.max_queued:
+                self._shed()
+            self.queued += 1
+            try:
+                acquired = self._condition.wait_for(
+                    self._has_slot, self.queue_timeout)
+            finally:
+                self.queued -= 1
+            if not acquired:
+                self._shed()
+            self.active += 1
+
+    def release(self):
+        """Releases a slot acquired with :meth:`acquire`."""
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def reset_stats(self):
+        """Resets the count of shed requests."""
+        with self._condition:
+            self.shed = 0
+
+
+def acquire_all(limits: Iterable[Optional[ConcurrencyLimit]]
+                ) -> List[ConcurrencyLimit]:
+    """Acquires a slot from each limit in order.
+
+    If a limit sheds the request the slots that were already acquired are
+    released, so a request never holds a slot it can't use.
+
+    :param limits: The limits to acquire.  None values are skipped.
+    :returns: The acquired limits, to pass to :func:`release_all`.
+    :raises ServiceUnavailableError: If the request is shed.
+    """
+    acquired = []  # type: List[ConcurrencyLimit]
+    try:
+        for limit in limits:
+            if limit is not None:
+                limit.acquire()
+                acquired.append(limit)
+    except ServiceUnavailableError:
+        release_all(acquired)
+        raise
+    return acquired
+
+
+def release_all(limits: List[ConcurrencyLimit]):
+    """Releases the slots acquired with :func:`acquire_all`.
+
+    :param limits: The acquired limits.
+    """
+    for limit in reversed(limits):
+        limit.release()
+
+
+_global_concurrency_limit = None  # type: ConcurrencyLimit
+
+
+def get_global_concurrency_limit() -> Optional[ConcurrencyLimit]:
+    """Returns the concurrency limit shared by all routes.
+
+    :returns: A ConcurrencyLimit instance or None if there is no limit.
+    """
+    return _global_concurrency_limit
+
+
+def set_global_concurrency_limit(limit: ConcurrencyLimit = None) -> None:
+    """Sets the concurrency limit shared by all routes.
+
+    Requests must acquire a slot from their route's limit and then from this
+    limit before they're handled.
+
+    :param limit: A ConcurrencyLimit instance or None to remove the limit.
+    """
+    global _global_concurrency_limit
+    _global_concurrency_limit = limit
@@ -0,0 +1,75 @@
+"""
+Deadlines stop doctor from working on requests the client has given up on.
+
+A route created with a `timeout` gets a :class:`Deadline` when the request is
+received.  The request is aborted with a 504 response if the deadline has
+passed after the request is parsed, after its parameters are validated, or
+after the logic function returns and before the response is validated.  A
+streamed response is aborted if the deadline passes while it's being sent.
+
+Logic functions receive the deadline in a parameter annotated with
+:class:`Deadline`, and can use it to set timeouts on calls to other services
+or to stop work early with :meth:`Deadline.check`.
+"""
+import inspect
+import time
+from typing import Optional
+
+from doctor.errors import DeadlineExceededError
+
+
+class Deadline(object):
+    """The time by which a request must be handled.
+
+    :param timeout: The number of seconds from now until the deadline.  If
+        None the deadline never expires.
+    """
+
+    def __init__(self, timeout: float = None):
+        self.timeout = timeout
+        #: The value of :func:`time.monotonic` when the deadline expires.
+        self.expires = None
+        if timeout is not None:
+            self.expires = time.monotonic() + timeout
+
+    def __repr__(self):
+        return 'Deadline(timeout={}, remaining={})'.format(
+            self.timeout, self.remaining())
+
+    @property
+    def expired(self) -> bool:
+        """If the deadline has passed."""
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def remaining(self) -> Optional[float]:
+        """Returns the number of seconds until the deadline.
+
+        :returns: The number of seconds, which is 0 if the deadline has
+            passed, or None if it never expires.
+        """
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def check(self):
+        """Raises an error if the deadline has passed.
+
+        :raises DeadlineExceededError: If the deadline has passed.
+        """
+        if self.expired:
+            raise DeadlineExceededError(
+                'The request was not handled within {} seconds.'.format(
+                    self.timeout))
+
+
+def get_deadline_param(signature: inspect.Signature) -> Optional[str]:
+    """Returns the name of the parameter that receives the request deadline.
+
+    :param signature: The signature of a logic function.
+    :returns: The name of the first parameter annotated with
+        :class:`Deadline`, or None if there isn't one.
+    """
+    for name, param in signature.parameters.items():
+        if param.annotation is Deadline:
+            return name
+    return None
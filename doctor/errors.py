@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Any, List, Union
 
 
 class DoctorError(ValueError):
@@ -12,6 +12,14 @@ class DoctorError(ValueError):
 SchematicError = DoctorError
 
 
+class DeadlineExceededError(DoctorError):
+    """Raised when a request wasn't handled before its deadline.
+
+    Corresponds to a HTTP 504 Gateway Timeout error.
+    """
+    pass
+
+
 class ForbiddenError(DoctorError):
     """Raised when a request is forbidden for the authorized user.
 
@@ -54,6 +62,14 @@ class NotFoundError(DoctorError):
     pass
 
 
+class PayloadTooLargeError(DoctorError):
+    """Raised when a request payload is larger than allowed.
+
+    Corresponds to a HTTP 413 Payload Too Large error.
+    """
+    pass
+
+
 class ParseError(DoctorError):
     """Raised when a value cannot be parsed into an appropriate type."""
     pass
@@ -77,6 +93,20 @@ class SchemaValidationError(DoctorError):
         self.errors = errors
 
 
+class ServiceUnavailableError(DoctorError):
+    """Raised when a request can't be handled right now, e.g. because too
+    many requests are already being handled.
+
+    Corresponds to a HTTP 503 Service Unavailable error.
+
+    :param retry_after: The number of seconds the client should wait before
+        retrying the request.
+    """
+    def __init__(self, message, errors: dict = None, retry_after: int = None):
+        self.retry_after = retry_after
+        super().__init__(message, errors=errors)
+
+
 class TypeSystemError(DoctorError):
     """An error that represents an invalid value for a type.
 
@@ -84,7 +114,11 @@ class TypeSystemError(DoctorError):
     https://github.com/encode/apistar/blob/
     50dd15f0878f0a7c50ce829a72adb276782bcb78/apistar/exceptions.py#L4-L15
 
-    :param detail: Detail about the error.
+    The detail is only formatted when it's accessed, so errors that are
+    discarded or counted are cheap to create.
+
+    :param detail: Detail about the error.  For objects and arrays this is a
+        dict of the errors of each property or item.
     :param cls: The class type that was being instantiated.
     :param code: The error code.
     :param errors: A dict containing all validation errors during the request.
@@ -95,17 +129,77 @@ class TypeSystemError(DoctorError):
                  cls: type = None,
                  code: str = None,
                  errors: dict = None) -> None:
-
-        if cls is not None and code is not None:
-            cls_errors = getattr(cls, 'errors')
-            detail = cls_errors[code].format(**cls.__dict__)
-
-        self.detail = detail
+        self.cls = cls
+        self.code = code
+        self._detail = detail
+        self._rendered = False
+        super().__init__(None, errors=errors)
+
+    @property
+    def detail(self) -> Union[str, dict]:
+        """The error detail, formatted on first access."""
+        if not self._rendered:
+            if self.cls is not None and self.code is not None:
+                cls_errors = getattr(self.cls, 'errors')
+                self._detail = cls_errors[self.code].format(
+                    **self.cls.__dict__)
+            elif isinstance(self._detail, dict):
+                # Property or item errors may be lazy too.
+                self._detail = {key: getattr(value, 'detail', value)
+                                for key, value in self._detail.items()}
+            self._rendered = True
+        return self._detail
+
+    @detail.setter
+    def detail(self, value: Union[str, dict]):
+        self._detail = value
+        self._rendered = True
+
+    @property
+    def args(self) -> tuple:
+        errors = self.errors
         if errors and len(errors) == 1:
-            param = list(errors.keys())[0]
-            msg = list(errors.values())[0]
-            detail = '{} - {}'.format(param, msg)
-        super().__init__(detail, errors=errors)
+            param, msg = next(iter(errors.items()))
+            return ('{} - {}'.format(param, msg),)
+        return (self.detail,)
+
+    def __str__(self):
+        return str(self.args[0])
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.args[0])
+
+    def __reduce__(self):
+        # Types are often created dynamically and can't be pickled, so pickle
+        # the formatted detail instead of the type.
+        return (self.__class__, (self.detail, None, self.code, self.errors))
+
+    def get_error_payload(self, path: tuple = ()) -> List[dict]:
+        """Returns the errors as a machine readable list without formatting.
+
+        Each error is a dict with the `path` to the invalid value, as a list
+        of property names and array indexes, and the error `code`.  Errors
+        that don't have a code use the code `'invalid'` and also include the
+        `detail`.
+
+        :param path: The path of the value this error is for.
+        :returns: A list of errors.
+        """
+        if self.code is not None:
+            return [{'path': list(path), 'code': self.code}]
+        return _get_detail_payload(self._detail, path)
+
+
+def _get_detail_payload(detail: Any, path: tuple) -> List[dict]:
+    """Returns the machine readable list of errors for an error detail."""
+    if hasattr(detail, 'get_error_payload'):
+        return detail.get_error_payload(path)
+    if isinstance(detail, dict):
+        payload = []
+        for key, value in detail.items():
+            payload.extend(_get_detail_payload(value, path + (key,)))
+        return payload
+    return [{'path': list(path), 'code': 'invalid', 'detail': detail}]
 
 
 class UnauthorizedError(DoctorError):
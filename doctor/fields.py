@@ -0,0 +1,123 @@
+"""
+Sparse fieldsets allow clients to request only some properties of a response
+with a `fields` query parameter, e.g. `?fields=id,name,author.name`.
+
+The response is projected down to the requested properties before it is
+validated and serialized.  Nested properties are separated by a `.` and
+properties of objects inside arrays are selected the same way as properties
+of objects.
+"""
+import functools
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from doctor.errors import InvalidValueError
+from doctor.types import Array, Object, new_type
+
+#: The name of the query parameter used to select fields.
+FIELDS_PARAM = 'fields'
+
+#: A tree of selected fields.  Each key is a property name and each value is
+#: None if the whole property is selected, or a tree of its selected fields.
+FieldTree = Dict[str, Optional['FieldTree']]
+
+
+def parse_fields(value: str) -> FieldTree:
+    """Parses the value of a `fields` query parameter.
+
+    >>> parse_fields('id,author.name,author.id')
+    {'id': None, 'author': {'name': None, 'id': None}}
+
+    :param value: A comma separated list of property names or paths.
+    :returns: A tree of the selected fields.
+    :raises InvalidValueError: If the value doesn't select any fields.
+    """
+    fields = {}
+    for path in value.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        names = path.split('.')
+        if not all(names):
+            raise InvalidValueError('Invalid field `{}`.'.format(path))
+        tree = fields
+        for name in names[:-1]:
+            subtree = tree.get(name, {})
+            if subtree is None:
+                # The whole property was already selected.
+                break
+            tree = tree.setdefault(name, subtree)
+        else:
+            tree[names[-1]] = None
+    if not fields:
+        raise InvalidValueError('At least one field must be selected.')
+    return fields
+
+
+def project(value: Any, fields: FieldTree) -> Any:
+    """Returns a copy of a value with only the selected fields.
+
+    Fields are selected from dicts and other mappings, e.g. records, and
+    from each of them in lists and iterators.  Other values are returned as is.
+
+    :param value: The value to project.
+    :param fields: The tree of selected fields from :func:`parse_fields`.
+    """
+    if isinstance(value, Mapping):
+        return {name: value[name] if subtree is None
+                else project(value[name], subtree)
+                for name, subtree in fields.items() if name in value}
+    if isinstance(value, (list, tuple)):
+        return [project(item, fields) for item in value]
+    if isinstance(value, Iterator):
+        return (project(item, fields) for item in value)
+    return value
+
+
+def _project_type(annotation: type, fields: FieldTree, path: str) -> type:
+    """Returns a new type with only the selected properties of annotation."""
+    if isinstance(annotation, type) and issubclass(annotation, Array):
+        if annotation.items is None or isinstance(annotation.items, list):
+            raise InvalidValueError(
+                'Fields can not be selected from `{}`.'.format(
+                    path or annotation.__name__))
+        items = _project_type(annotation.items, fields, path)
+        return new_type(annotation, items=items)
+
+    if not (isinstance(annotation, type) and issubclass(annotation, Object)):
+        raise InvalidValueError(
+            'Fields can not be selected from `{}`.'.format(
+                path or annotation.__name__))
+
+    properties = {}
+    for name, subtree in fields.items():
+        field_path = path + '.' + name if path else name
+        if name not in annotation.properties:
+            raise InvalidValueError('Unknown field `{}`.'.format(field_path))
+        prop = annotation.properties[name]
+        if subtree is not None:
+            prop = _project_type(prop, subtree, field_path)
+        properties[name] = prop
+    required = [name for name in annotation.required if name in properties]
+    return new_type(annotation, properties=properties, required=required)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_projected_type(annotation: type, value: str) -> type:
+    return _project_type(annotation, parse_fields(value), '')
+
+
+def get_projected_type(annotation: type, value: str) -> type:
+    """Returns a type that only has the fields selected by a `fields` value.
+
+    Projected types are cached, so repeated requests for the same fields do
+    not create new types.
+
+    :param annotation: An :class:`~doctor.types.Object` type, or an
+        :class:`~doctor.types.Array` of them.
+    :param value: The value of the `fields` query parameter.
+    :returns: The projected type.
+    :raises InvalidValueError: If a field isn't a property of the type.
+    """
+    # Normalize the value so equivalent selections share a cache entry.
+    value = ','.join(sorted(path.strip() for path in value.split(',')))
+    return _get_projected_type(annotation, value)
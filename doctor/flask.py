@@ -1,28 +1,38 @@
 from __future__ import absolute_import
 
+import json
 import logging
 import os
-from typing import Callable, Dict, List, Tuple, Union
+from typing import Callable, Dict, Iterator, List, Tuple, Union
 from typing_inspect import get_origin
 
 
 try:
-    from flask import current_app, request
+    from flask import Response as FlaskResponse
+    from flask import current_app, request, stream_with_context
     from flask_restful import Resource
     from werkzeug.exceptions import (BadRequest, Conflict, Forbidden,
-                                     HTTPException, NotFound, Unauthorized,
-                                     InternalServerError)
+                                     GatewayTimeout, HTTPException, NotFound,
+                                     RequestEntityTooLarge, Unauthorized,
+                                     InternalServerError, ServiceUnavailable)
 except ImportError:  # pragma: no cover
     raise ImportError('You must install flask to use the '
                       'doctor.flask module.')
 
 from .constants import HTTP_METHODS_WITH_JSON_BODY
-from .errors import (ForbiddenError, ImmutableError, InvalidValueError,
-                     NotFoundError, TypeSystemError, UnauthorizedError)
-from .parsers import map_param_names, parse_form_and_query_params
+from .deadline import Deadline
+from .errors import (DeadlineExceededError, ForbiddenError, ImmutableError,
+                     InvalidValueError, NotFoundError, ParseError,
+                     PayloadTooLargeError, ServiceUnavailableError,
+                     TypeSystemError, UnauthorizedError)
+from .fields import FIELDS_PARAM, get_projected_type, parse_fields, project
+from .parsers import (check_body_size, get_default_payload_limits,
+                      map_param_names, parse_form_and_query_params, parse_json)
 from .response import Response
 from .routing import create_routes as doctor_create_routes
 from .routing import Route
+from .types import (
+    Array, limit_errors, Object, Record, to_native, UnionType)
 
 
 STATUS_CODE_MAP = {
@@ -80,10 +90,33 @@ class HTTP409Exception(SchematicHTTPException, Conflict):
     pass
 
 
+class HTTP413Exception(SchematicHTTPException, RequestEntityTooLarge):
+    pass
+
+
 class HTTP500Exception(SchematicHTTPException, InternalServerError):
     pass
 
 
+class HTTP503Exception(SchematicHTTPException, ServiceUnavailable):
+    """Represents a HTTP 503 error.
+
+    :param description: The error description.
+    :param errors: A dict containing all validation errors during the request.
+    :param retry_after: The number of seconds to send in the `Retry-After`
+        header.
+    """
+
+    def __init__(self, description: str=None, errors: dict=None,
+                 retry_after: int=None):
+        super(HTTP503Exception, self).__init__(description, errors=errors)
+        self.retry_after = retry_after
+
+
+class HTTP504Exception(SchematicHTTPException, GatewayTimeout):
+    pass
+
+
 def should_raise_response_validation_errors() -> bool:
     """Returns if the library should raise response validation errors or not.
 
@@ -95,6 +128,95 @@ def should_raise_response_validation_errors() -> bool:
     return bool(os.environ.get('RAISE_RESPONSE_VALIDATION_ERRORS', False))
 
 
+#: The minimum size in characters of each chunk of a streamed response.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _has_records(annotation: type) -> bool:
+    """Returns if values of a type may contain :class:`~doctor.types.Record`
+    instances, which have to be converted to dicts to serialize them as JSON.
+    """
+    if not isinstance(annotation, type):
+        return False
+    if issubclass(annotation, Object):
+        return annotation.record or any(
+            _has_records(prop) for prop in annotation.properties.values())
+    if issubclass(annotation, Array):
+        if isinstance(annotation.items, list):
+            return any(_has_records(item) for item in annotation.items)
+        return _has_records(annotation.items)
+    if issubclass(annotation, UnionType):
+        return any(_has_records(t) for t in annotation.types)
+    return False
+
+
+def stream_json_array(content: Iterator, annotation: type = None,
+                      validate_every: int = 1,
+                      deadline: Deadline = None) -> Iterator[str]:
+    """Serializes an iterator as a JSON array in chunks.
+
+    If `annotation` is an :class:`~doctor.types.Array` with `items` defined,
+    items are validated as they are serialized.  Since part of the response
+    may already have been sent, an invalid item is logged and only raises an
+    error if :func:`should_raise_response_validation_errors` is True.
+    Constraints on the array itself, e.g. `max_items`, are not validated.
+
+    The deadline is checked before each item is serialized, and the response
+    is aborted if it has passed.
+
+    :param content: An iterator of the items of the array.
+    :param annotation: The type the array should be.
+    :param validate_every: Only validate every nth item.
+    :param deadline: The deadline of the request, if any.
+    :returns: An iterator of JSON strings.
+    :raises DeadlineExceededError: If the deadline passes before every item
+        is serialized.
+    """
+    item_types = None
+    if isinstance(annotation, type) and issubclass(annotation, Array):
+        item_types = annotation.items
+    settings = current_app.config.get('RESTFUL_JSON', {})
+    method, path = request.method, request.path
+    has_records = _has_records(annotation)
+
+    chunk = ['[']
+    size = 1
+    for pos, item in enumerate(content):
+        if deadline is not None:
+            deadline.check()
+        if item_types is not None and pos % validate_every == 0:
+            if isinstance(item_types, list):
+                item_type = (item_types[pos] if pos < len(item_types)
+                             else None)
+            else:
+                item_type = item_types
+            result = item_type.check(item) if item_type else None
+            if result is not None and not result.valid:
+                logging.warning(
+                    'Response to %s %s does not validate: item %s `%s` %s.',
+                    method, path, pos, item, result.detail)
+                if should_raise_response_validation_errors():
+                    raise TypeSystemError(
+                        'Response to {method} {path} does not validate: item '
+                        '{pos} `{item}` {error}'.format(
+                            method=method, path=path, pos=pos, item=item,
+                            error=result.detail))
+
+        if has_records or isinstance(item, Record):
+            item = to_native(item)
+        item_json = json.dumps(item, **settings)
+        if pos:
+            item_json = ',' + item_json
+        chunk.append(item_json)
+        size += len(item_json)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    chunk.append(']')
+    yield ''.join(chunk)
+
+
 def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
     """Handle a Flask HTTP request
 
@@ -105,6 +227,9 @@ def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
     :param callable logic: The callable to invoke to actually perform the
         business logic for this request.
     """
+    # The deadline starts when the request is received, so it includes any
+    # time spent parsing and validating the request.
+    deadline = Deadline(getattr(logic, '_doctor_timeout', None))
     try:
         # We are checking mimetype here instead of content_type because
         # mimetype is just the content-type, where as content_type can
@@ -114,11 +239,33 @@ def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
                 request.method in HTTP_METHODS_WITH_JSON_BODY):
             # This is a proper typed JSON request. The parameters will be
             # encoded into the request body as a JSON blob.
+            limits = getattr(logic, '_doctor_payload_limits', None)
+            if limits is None:
+                limits = get_default_payload_limits()
+            if limits is None:
+                request_json = request.json
+            else:
+                # Check the size before reading the body, then parse it
+                # ourselves so the limits are enforced before validation.
+                if request.content_length is not None:
+                    check_body_size(request.content_length, limits)
+                    body = request.get_data(cache=True)
+                elif limits.max_body_bytes is not None:
+                    # The size of e.g. a chunked body isn't known, so don't
+                    # read more than one byte past the limit.
+                    body = request.stream.read(limits.max_body_bytes + 1)
+                    check_body_size(len(body), limits)
+                else:
+                    body = request.get_data(cache=True)
+                try:
+                    request_json = parse_json(body, limits=limits)
+                except ParseError as e:
+                    raise InvalidValueError(str(e))
             if not logic._doctor_req_obj_type:
                 request_params = map_param_names(
-                    request.json, logic._doctor_signature.parameters)
+                    request_json, logic._doctor_signature.parameters)
             else:
-                request_params = request.json
+                request_params = request_json
         else:
             # Try to parse things from normal HTTP parameters
             request_params = parse_form_and_query_params(
@@ -131,6 +278,11 @@ def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
             all_params = logic._doctor_params.all
             params = {k: v for k, v in params.items() if k in all_params}
         params.update(**kwargs)
+        # The deadline is passed by doctor and can't be sent by the client.
+        deadline_param = getattr(logic, '_doctor_deadline_param', None)
+        if deadline_param is not None:
+            params.pop(deadline_param, None)
+        deadline.check()
 
         # Check for required params
         missing = []
@@ -148,66 +300,146 @@ def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
         # Validate and coerce parameters to the appropriate types.
         errors = {}
         sig = logic._doctor_signature
-        # If a `req_obj_type` was defined for the route, pass all request
-        # params to that type for validation/coercion
-        if logic._doctor_req_obj_type:
-            annotation = logic._doctor_req_obj_type
-            try:
-                # NOTE: We calculate the value before applying native type in
-                # order to support UnionType types which dynamically modifies
-                # the native_type property based on the initialized value.
-                value = annotation(params)
-                params = annotation.native_type(value)
-            except TypeError:
-                logging.exception(
-                    'Error casting and validating params with value `%s`.',
-                    params)
-                raise
-            except TypeSystemError as e:
-                errors['__all__'] = e.detail
-        else:
-            for name, value in params.items():
-                annotation = sig.parameters[name].annotation
-                if annotation.nullable and value is None:
-                    continue
+        max_errors = getattr(logic, '_doctor_max_errors', None)
+        with limit_errors(max_errors):
+            # If a `req_obj_type` was defined for the route, pass all request
+            # params to that type for validation/coercion
+            if logic._doctor_req_obj_type:
+                annotation = logic._doctor_req_obj_type
                 try:
-                    # NOTE: We calculate the value before applying native type
-                    # in order to support UnionType types which dynamically
-                    # modifies the native_type property based on the initialized
-                    # value.
-                    value = annotation(value)
-                    params[name] = annotation.native_type(value)
+                    # NOTE: We calculate the value before applying native
+                    # type in order to support UnionType types which
+                    # dynamically modifies the native_type property based on
+                    # the initialized value.
+                    value = annotation(params)
+                    # Records are passed to the logic function as they are.
+                    params = value if isinstance(value, Record) else (
+                        annotation.native_type(value))
+                except TypeError:
+                    logging.exception(
+                        'Error casting and validating params with value '
+                        '`%s`.', params)
+                    raise
                 except TypeSystemError as e:
-                    errors[name] = e.detail
+                    errors['__all__'] = e.detail
+            else:
+                for name, value in params.items():
+                    annotation = sig.parameters[name].annotation
+                    if annotation.nullable and value is None:
+                        continue
+                    try:
+                        # NOTE: We calculate the value before applying native
+                        # type in order to support UnionType types which
+                        # dynamically modifies the native_type property based
+                        # on the initialized value.
+                        value = annotation(value)
+                        if not isinstance(value, Record):
+                            value = annotation.native_type(value)
+                        params[name] = value
+                    except TypeSystemError as e:
+                        errors[name] = e.detail
+                        if (max_errors is not None and
+                                len(errors) >= max_errors):
+                            break
         if errors:
             raise TypeSystemError(errors, errors=errors)
-
-        if logic._doctor_req_obj_type:
-            # Pass any positional arguments followed by the coerced request
-            # parameters to the logic function.
-            response = logic(*args, params)
-        else:
+        deadline.check()
+
+        # Parse any fields selected by the client before calling the logic
+        # function, so unknown fields are rejected early.
+        fields = projected_annotation = None
+        if getattr(logic, '_doctor_sparse_fields', False):
+            fields_value = request.args.get(FIELDS_PARAM)
+            if fields_value:
+                fields = parse_fields(fields_value)
+                annotation = sig.return_annotation
+                if get_origin(annotation) == Response:
+                    annotation = annotation.__args__[0]
+                if annotation != sig.empty and annotation is not None:
+                    projected_annotation = get_projected_type(
+                        annotation, fields_value)
+
+        def call_logic():
+            injected = {}
+            if deadline_param is not None:
+                injected[deadline_param] = deadline
+            if logic._doctor_req_obj_type:
+                # Pass any positional arguments followed by the coerced
+                # request parameters to the logic function.
+                return logic(*args, params, **injected)
             # Only pass request parameters defined by the logic signature.
             logic_params = {k: v for k, v in params.items()
                             if k in logic._doctor_params.logic}
-            response = logic(*args, **logic_params)
+            return logic(*args, **logic_params, **injected)
+
+        idempotency = getattr(logic, '_doctor_idempotency', None)
+        idempotency_key = None
+        if idempotency is not None:
+            idempotency_key = request.headers.get(idempotency.header)
+        if idempotency_key:
+            # Replay the response of the first request with the same key and
+            # params instead of calling the logic function again.
+            def call_idempotent_logic():
+                response = call_logic()
+                if isinstance(response, Response):
+                    return (response.content, response.status_code,
+                            response.headers)
+                return (response, None, None)
+
+            key = idempotency.get_key(
+                idempotency_key, request.method, request.path, params)
+            content, status, headers = idempotency.call(
+                key, call_idempotent_logic)
+            response = Response(content, headers, status)
+        else:
+            response = call_logic()
+        # Don't validate and serialize a response the client won't receive.
+        deadline.check()
 
-        # response validation
+        status_code = STATUS_CODE_MAP.get(request.method, 200)
+        content = response
+        if isinstance(response, Response):
+            content = response.content
+            if response.status_code is not None:
+                status_code = response.status_code
+
+        return_annotation = None
         if sig.return_annotation != sig.empty:
             return_annotation = sig.return_annotation
-            _response = response
+            # Check if our return annotation is a Response that supplied a
+            # type to validate against.  If so, use that type for validation
+            # e.g. def logic() -> Response[MyType]
+            if (isinstance(response, Response) and
+                    get_origin(return_annotation) == Response and
+                    return_annotation.__args__ is not None):
+                return_annotation = return_annotation.__args__[0]
+
+        # Only validate and serialize the fields selected by the client.
+        if fields is not None:
+            content = project(content, fields)
+            if projected_annotation is not None:
+                return_annotation = projected_annotation
+
+        # Stream iterators as a JSON array, validating each item as it's
+        # serialized instead of validating the whole response first.
+        if isinstance(content, Iterator):
+            validate_every = 1
+            headers = None
             if isinstance(response, Response):
-                _response = response.content
-                # Check if our return annotation is a Response that supplied a
-                # type to validate against.  If so, use that type for validation
-                # e.g. def logic() -> Response[MyType]
-                if ((get_origin(return_annotation) == Response) and
-                        return_annotation.__args__ is not None):
-                    return_annotation = return_annotation.__args__[0]
+                validate_every = response.validate_every
+                headers = response.headers
+            body = stream_json_array(content, return_annotation,
+                                     validate_every=validate_every,
+                                     deadline=deadline)
+            return FlaskResponse(stream_with_context(body), status=status_code,
+                                 headers=headers, mimetype='application/json')
+
+        # response validation
+        if return_annotation is not None:
             try:
-                return_annotation(_response)
+                return_annotation(content)
             except TypeSystemError as e:
-                response_str = str(_response)
+                response_str = str(content)
                 logging.warning('Response to %s %s does not validate: %s.',
                                 request.method, request.path,
                                 response_str, exc_info=e)
@@ -218,12 +450,15 @@ def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
                                  response=response, error=e.detail))
                     raise TypeSystemError(error)
 
+        # Records can't be serialized as JSON, so convert them to dicts.
+        if (isinstance(content, Record) or
+                (return_annotation is not None and
+                 _has_records(return_annotation))):
+            content = to_native(content)
+
         if isinstance(response, Response):
-            status_code = response.status_code
-            if status_code is None:
-                status_code = STATUS_CODE_MAP.get(request.method, 200)
-            return (response.content, status_code, response.headers)
-        return response, STATUS_CODE_MAP.get(request.method, 200)
+            return (content, status_code, response.headers)
+        return content, status_code
     except (InvalidValueError, TypeSystemError) as e:
         errors = getattr(e, 'errors', None)
         raise HTTP400Exception(e, errors=errors)
@@ -235,6 +470,12 @@ def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
         raise HTTP404Exception(e)
     except ImmutableError as e:
         raise HTTP409Exception(e)
+    except PayloadTooLargeError as e:
+        raise HTTP413Exception(e)
+    except ServiceUnavailableError as e:
+        raise HTTP503Exception(e, retry_after=e.retry_after)
+    except DeadlineExceededError as e:
+        raise HTTP504Exception(e)
     except Exception as e:
         # Always re-raise exceptions when DEBUG is enabled for development.
         if current_app.config.get('DEBUG', False):
@@ -247,6 +488,14 @@ def handle_http(handler: Resource, args: Tuple, kwargs: Dict, logic: Callable):
         raise HTTP500Exception('Uncaught error in logic function')
 
 
+def handle_service_unavailable(error: ServiceUnavailableError):
+    """Raises a HTTP 503 error for a request that was shed.
+
+    :param error: The error raised by the concurrency limit.
+    """
+    raise HTTP503Exception(error, retry_after=error.retry_after)
+
+
 def create_routes(routes: Tuple[Route]) -> List[Tuple[str, Resource]]:
     """A thin wrapper around create_routes that passes in flask specific values.
 
@@ -255,4 +504,5 @@ def create_routes(routes: Tuple[Route]) -> List[Tuple[str, Resource]]:
     :returns: A list of tuples containing the route and generated handler.
     """
     return doctor_create_routes(
-        routes, handle_http, default_base_handler_class=Resource)
+        routes, handle_http, default_base_handler_class=Resource,
+        handle_error=handle_service_unavailable)
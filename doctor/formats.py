@@ -0,0 +1,354 @@
+"""
+This module contains functions used to parse and validate the string formats
+supported by :attr:`~doctor.types.String.format`.
+
+Each format is a function that accepts a string and returns the parsed value,
+raising a `ValueError` if the string is not valid for the format.  Additional
+formats can be added with :func:`register_format`.
+
+Dates and times are parsed using a tiered approach.  The common shapes are
+handled by `datetime.fromisoformat` or a strict RFC 3339 parser, and anything
+else falls back to the original (slower) parser, so the accepted values and
+error messages are unchanged.
+
+The remaining formats are validated with precompiled regular expressions that
+are written so no two branches can match the same character, which keeps
+matching linear in the length of the value.
+"""
+import ipaddress
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict
+
+#: Matches date strings in the format `YYYY-MM-DD`.
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}\Z', re.ASCII)
+
+#: Matches time strings in the format `HH:MM:SS`.
+_TIME_RE = re.compile(r'\d{2}:\d{2}:\d{2}\Z', re.ASCII)
+
+#: Matches the date-time strings that `datetime.fromisoformat` parses the same
+#: way as isodate on all supported python versions, with an optional `Z`
+#: suffix that is handled separately.
+#: `YYYY-MM-DDTHH:MM[:SS[.fff[fff]]][Z|+HH:MM]`
+_ISOFORMAT_RE = re.compile(
+    r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(?::\d{2}(?:\.\d{3}(?:\d{3})?)?)?'
+    r'(?:Z|[+-]\d{2}:\d{2})?\Z', re.ASCII)
+
+#: Matches RFC 3339 date-time strings, with an optional offset.
+_RFC3339_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?'
+    r'(?:(Z)|([+-])(\d{2}):(\d{2}))?\Z', re.ASCII)
+
+# datetime.fromisoformat was added in python 3.7.
+_date_fromisoformat = getattr(date, 'fromisoformat', None)
+_datetime_fromisoformat = getattr(datetime, 'fromisoformat', None)
+
+
+def _parse_rfc3339(match) -> datetime:
+    """Creates a datetime from a match of `_RFC3339_RE`.
+
+    :param match: The regex match object.
+    :returns: The parsed datetime.
+    :raises ValueError: If any of the components are out of range.
+    """
+    (year, month, day, hour, minute, second, fraction, utc, sign, tz_hour,
+     tz_minute) = match.groups()
+    microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+    tzinfo = None
+    if utc:
+        tzinfo = timezone.utc
+    elif sign:
+        offset = timedelta(hours=int(tz_hour), minutes=int(tz_minute))
+        tzinfo = timezone(-offset if sign == '-' else offset)
+    return datetime(int(year), int(month), int(day), int(hour), int(minute),
+                    int(second), microsecond, tzinfo)
+
+
+def parse_date(value: str) -> date:
+    """Parses a `YYYY-MM-DD` formatted string into a date.
+
+    :param value: The string to parse.
+    :returns: The parsed date.
+    :raises ValueError: If the value is not a valid date.
+    """
+    if _date_fromisoformat is not None and _DATE_RE.match(value):
+        try:
+            return _date_fromisoformat(value)
+        except ValueError:
+            # Let strptime generate the error message.
+            pass
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parses an ISO 8601 formatted string into a datetime.
+
+    :param value: The string to parse.
+    :returns: The parsed datetime.
+    :raises ValueError: If the value is not a valid ISO 8601 date-time.
+    """
+    try:
+        if _datetime_fromisoformat is not None and _ISOFORMAT_RE.match(value):
+            if value[-1] == 'Z':
+                return _datetime_fromisoformat(value[:-1]).replace(
+                    tzinfo=timezone.utc)
+            return _datetime_fromisoformat(value)
+        match = _RFC3339_RE.match(value)
+        if match is not None:
+            return _parse_rfc3339(match)
+    except ValueError:
+        # Let isodate generate the error message.
+        pass
+    # Importing here to avoid loading isodate until it's needed.
+    import isodate
+    return isodate.parse_datetime(value)
+
+
+def parse_time(value: str) -> datetime:
+    """Parses a `HH:MM:SS` formatted string into a datetime.
+
+    The date of the returned datetime is always `1900-01-01`, which matches
+    the behavior of `datetime.strptime`.
+
+    :param value: The string to parse.
+    :returns: The parsed datetime.
+    :raises ValueError: If the value is not a valid time.
+    """
+    if _TIME_RE.match(value):
+        try:
+            return datetime(1900, 1, 1, int(value[0:2]), int(value[3:5]),
+                            int(value[6:8]))
+        except ValueError:
+            # Let strptime generate the error message.
+            pass
+    return datetime.strptime(value, '%H:%M:%S')
+
+
+#: Characters allowed unescaped in a URI (RFC 3986 `unreserved` and
+#: `sub-delims`).
+_URI_CHARS = r"A-Za-z0-9\-._~!$&'()*+,;="
+#: A percent encoded octet.
+_PCT_ENCODED = r'%[0-9A-Fa-f]{2}'
+_URI_PATH = r'(?:[{chars}:@/]|{pct})*'.format(
+    chars=_URI_CHARS, pct=_PCT_ENCODED)
+_URI_QUERY = r'(?:[{chars}:@/?]|{pct})*'.format(
+    chars=_URI_CHARS, pct=_PCT_ENCODED)
+_URI_AUTHORITY = (
+    # userinfo
+    r'(?:(?:[{chars}:]|{pct})*@)?'
+    # host, either an IP literal or a registered name (including IPv4)
+    r'(?:\[(?:[0-9A-Fa-f:.]+|[vV][0-9A-Fa-f]+\.[{chars}:]+)\]'
+    r'|(?:[{chars}]|{pct})*)'
+    # port
+    r'(?::[0-9]*)?').format(chars=_URI_CHARS, pct=_PCT_ENCODED)
+_URI_TAIL = r'(?:\?{query})?(?:#{query})?\Z'.format(query=_URI_QUERY)
+
+#: Matches a URI as defined by RFC 3986.
+_URI_RE = re.compile(
+    r'[A-Za-z][A-Za-z0-9+\-.]*:(?://{authority}(?:/{path})?|(?!//){path})'
+    r'{tail}'.format(authority=_URI_AUTHORITY, path=_URI_PATH, tail=_URI_TAIL),
+    re.ASCII)
+
+#: Matches a relative reference as defined by RFC 3986.  The first path
+#: segment of a relative reference without an authority may not contain a
+#: colon, otherwise it would be parsed as a scheme.
+_RELATIVE_REF_RE = re.compile(
+    r'(?://{authority}(?:/{path})?|(?!//)(?![^/?#]*:){path}){tail}'.format(
+        authority=_URI_AUTHORITY, path=_URI_PATH, tail=_URI_TAIL),
+    re.ASCII)
+
+#: Matches a single label of a hostname.
+_HOSTNAME_LABEL_RE = re.compile(r'(?!-)[A-Za-z0-9-]{1,63}(?<!-)\Z', re.ASCII)
+
+#: Matches the local part of an email address, either a dot-atom or a quoted
+#: string.
+_EMAIL_LOCAL_RE = re.compile(
+    r"(?:[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r'|"(?:[^"\\\r\n]|\\.)*")\Z', re.ASCII)
+
+#: Matches a UUID in its canonical hyphenated form.
+_UUID_RE = re.compile(
+    r'[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-'
+    r'[0-9A-Fa-f]{12}\Z', re.ASCII)
+
+
+def _validate_ip_literal(value: str) -> bool:
+    """Checks if an IPv6 address in a URI host is valid.
+
+    :param value: The URI, which has already matched a URI regex.
+    :returns: True if the URI has no IP literal, or the IP literal is valid.
+    """
+    start = value.find('//[')
+    if start == -1:
+        return True
+    end = value.find(']', start)
+    literal = value[start + 3:end]
+    if literal[:1] in ('v', 'V'):
+        return True
+    try:
+        ipaddress.IPv6Address(literal)
+    except ValueError:
+        return False
+    return True
+
+
+def validate_uri(value: str) -> str:
+    """Validates a string is a URI as defined by RFC 3986.
+
+    :param value: The string to validate.
+    :returns: The value.
+    :raises ValueError: If the value is not a valid URI.
+    """
+    if not _URI_RE.match(value) or not _validate_ip_literal(value):
+        raise ValueError('{!r} is not a valid {!r}.'.format(value, 'URI'))
+    return value
+
+
+def validate_uri_reference(value: str) -> str:
+    """Validates a string is a URI or relative reference per RFC 3986.
+
+    :param value: The string to validate.
+    :returns: The value.
+    :raises ValueError: If the value is not a valid URI reference.
+    """
+    if not (_URI_RE.match(value) or _RELATIVE_REF_RE.match(value)):
+        raise ValueError('{!r} is not a valid {!r}.'.format(
+            value, 'URI_reference'))
+    if not _validate_ip_literal(value):
+        raise ValueError('{!r} is not a valid {!r}.'.format(
+            value, 'URI_reference'))
+    return value
+
+
+def _is_hostname(value: str) -> bool:
+    """Checks if a string is a valid hostname as defined by RFC 1123.
+
+    :param value: The string to check.
+    :returns: True if it is a hostname, otherwise False.
+    """
+    if not value or len(value) > 253:
+        return False
+    return all(_HOSTNAME_LABEL_RE.match(label) for label in value.split('.'))
+
+
+def validate_hostname(value: str) -> str:
+    """Validates a string is a hostname as defined by RFC 1123.
+
+    :param value: The string to validate.
+    :returns: The value.
+    :raises ValueError: If the value is not a valid hostname.
+    """
+    if not _is_hostname(value):
+        raise ValueError('Not a valid hostname.')
+    return value
+
+
+def validate_email(value: str) -> str:
+    """Validates a string is an email address.
+
+    The local part must be a dot-atom or quoted string and the domain must be
+    a hostname or an IP address literal in square brackets.
+
+    :param value: The string to validate.
+    :returns: The value.
+    :raises ValueError: If the value is not a valid email address.
+    """
+    local, _, domain = value.rpartition('@')
+    if not local or len(local) > 64 or not _EMAIL_LOCAL_RE.match(local):
+        raise ValueError('Not a valid email address.')
+    if domain.startswith('[') and domain.endswith(']'):
+        address = domain[1:-1]
+        if address[:5].lower() == 'ipv6:':
+            address = address[5:]
+        try:
+            ipaddress.ip_address(address)
+        except ValueError:
+            raise ValueError('Not a valid email address.') from None
+    elif not _is_hostname(domain):
+        raise ValueError('Not a valid email address.')
+    return value
+
+
+def validate_ipv4(value: str) -> str:
+    """Validates a string is an IPv4 address in dotted decimal notation.
+
+    :param value: The string to validate.
+    :returns: The value.
+    :raises ValueError: If the value is not a valid IPv4 address.
+    """
+    try:
+        ipaddress.IPv4Address(value)
+    except ValueError:
+        raise ValueError('Not a valid IPv4 address.') from None
+    return value
+
+
+def validate_ipv6(value: str) -> str:
+    """Validates a string is an IPv6 address.
+
+    :param value: The string to validate.
+    :returns: The value.
+    :raises ValueError: If the value is not a valid IPv6 address.
+    """
+    try:
+        ipaddress.IPv6Address(value)
+    except ValueError:
+        raise ValueError('Not a valid IPv6 address.') from None
+    return value
+
+
+def validate_uuid(value: str) -> str:
+    """Validates a string is a UUID in its canonical hyphenated form.
+
+    :param value: The string to validate.
+    :returns: The value.
+    :raises ValueError: If the value is not a valid UUID.
+    """
+    if not _UUID_RE.match(value):
+        raise ValueError('Not a valid UUID.')
+    return value
+
+
+#: A mapping of format name to the function used to parse and validate it.
+FORMATS: Dict[str, Callable[[str], Any]] = {
+    'date': parse_date,
+    'date-time': parse_datetime,
+    'email': validate_email,
+    'hostname': validate_hostname,
+    'ipv4': validate_ipv4,
+    'ipv6': validate_ipv6,
+    'time': parse_time,
+    'uri': validate_uri,
+    'uri-reference': validate_uri_reference,
+    'uuid': validate_uuid,
+}
+
+
+def register_format(name: str, func: Callable[[str], Any] = None):
+    """Registers a function to parse and validate a string format.
+
+    The function should accept the string value and return the parsed value
+    (usually the value itself), or raise a `ValueError` with a message
+    describing why the value is invalid.  Registering a name that already
+    exists replaces the existing function.  It can also be used as a
+    decorator.
+
+    >>> from doctor.formats import register_format
+    >>> @register_format('even-length')
+    ... def validate_even_length(value):
+    ...     if len(value) % 2:
+    ...         raise ValueError('Must have an even number of characters.')
+    ...     return value
+
+    :param name: The name of the format, as used by
+        :attr:`~doctor.types.String.format`.
+    :param func: The function to parse and validate the format.
+    :returns: The function, or a decorator if `func` was not specified.
+    """
+    if func is None:
+        def decorator(func):
+            FORMATS[name] = func
+            return func
+        return decorator
+    FORMATS[name] = func
+    return func
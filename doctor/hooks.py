@@ -0,0 +1,190 @@
+"""
+Hooks that run on background threads, so they don't add to request latency.
+
+An `after` hook wrapped in an :class:`AsyncHook` is submitted to a
+:class:`HookExecutor` and the response is returned without waiting for it.
+The executor runs hooks on a bounded pool of threads and limits the number of
+pending hooks, so a slow hook can't use an unbounded amount of memory.
+Exceptions raised by hooks are logged and counted instead of failing the
+request.
+
+Hooks that must finish before the response is returned can still be passed
+to a route without wrapping them.
+
+.. note:: Asynchronous hooks run after the request has been handled, so they
+    can't use the request context of the web framework.  Any values they need
+    from the request should be included in the result of the logic function.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+#: Run the hook in the request thread when the executor is full.
+OVERFLOW_RUN = 'run'
+#: Wait for a pending hook to finish when the executor is full.
+OVERFLOW_BLOCK = 'block'
+#: Discard the hook when the executor is full.
+OVERFLOW_DROP = 'drop'
+
+OVERFLOW_POLICIES = (OVERFLOW_RUN, OVERFLOW_BLOCK, OVERFLOW_DROP)
+
+
+class HookExecutor(object):
+    """Runs hooks on a bounded pool of background threads.
+
+    :param max_workers: The number of threads that run hooks.
+    :param max_pending: The maximum number of hooks that may be queued or
+        running at once.
+    :param overflow: What to do with a hook that is submitted when
+        `max_pending` hooks are pending.  One of `'run'` to run it in the
+        calling thread, `'block'` to wait until a pending hook finishes, or
+        `'drop'` to discard it.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 1000,
+                 overflow: str = OVERFLOW_RUN):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of: {}'.format(
+                ', '.join(OVERFLOW_POLICIES)))
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='doctor-hooks')
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'dropped': 0,
+            'ran_inline': 0,
+            'pending': 0,
+        }
+
+    def __repr__(self):
+        return ('HookExecutor(max_workers={}, max_pending={}, '
+                'overflow={!r})'.format(
+                    self.max_workers, self.max_pending, self.overflow))
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _run(self, func: Callable, *args):
+        """Runs a hook, logging and counting any exception it raises."""
+        try:
+            func(*args)
+        except Exception:
+            self._count('failed')
+            logging.exception('Error in hook %s', getattr(
+                func, '__name__', func))
+        else:
+            self._count('completed')
+
+    def _run_pending(self, func: Callable, *args):
+        try:
+            self._run(func, *args)
+        finally:
+            self._count('pending', -1)
+            self._pending.release()
+
+    def submit(self, func: Callable, *args: Any):
+        """Submits a hook to run on a background thread.
+
+        :param func: The hook to run.
+        :param args: The arguments to call the hook with.
+        """
+        self._count('submitted')
+        if not self._pending.acquire(blocking=self.overflow == OVERFLOW_BLOCK):
+            if self.overflow == OVERFLOW_DROP:
+                self._count('dropped')
+                logging.warning('Dropped hook %s, too many hooks are pending',
+                                getattr(func, '__name__', func))
+            else:
+                self._count('ran_inline')
+                self._run(func, *args)
+            return
+        self._count('pending')
+        try:
+            self._executor.submit(self._run_pending, func, *args)
+        except Exception:
+            self._count('pending', -1)
+            self._pending.release()
+            raise
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counts of the hooks handled by the executor.
+
+        - `submitted` - Hooks that were submitted.
+        - `completed` - Hooks that returned without an error, including hooks
+          that ran in the calling thread.
+        - `failed` - Hooks that raised an exception.
+        - `dropped` - Hooks that were discarded because the executor was full.
+        - `ran_inline` - Hooks that ran in the calling thread because the
+          executor was full.
+        - `pending` - Hooks that are queued or running.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self, wait: bool = True):
+        """Stops the executor's threads.
+
+        :param wait: If True, waits for pending hooks to finish.
+        """
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncHook(object):
+    """Wraps a hook so it runs on a :class:`HookExecutor`.
+
+    :param func: The hook to run, e.g. an `after` hook that accepts the
+        result of the logic function.
+    :param executor: The executor to run the hook on.  Defaults to the
+        executor returned by :func:`get_default_hook_executor`.
+    """
+
+    def __init__(self, func: Callable, executor: HookExecutor = None):
+        self.func = func
+        self.executor = executor
+
+    def __repr__(self):
+        return 'AsyncHook({!r})'.format(self.func)
+
+    def __call__(self, *args: Any):
+        executor = self.executor
+        if executor is None:
+            executor = get_default_hook_executor()
+        executor.submit(self.func, *args)
+
+
+_default_hook_executor = None  # type: HookExecutor
+_default_hook_executor_lock = threading.Lock()
+
+
+def get_default_hook_executor() -> HookExecutor:
+    """Returns the executor used by hooks that don't specify one.
+
+    The executor is created the first time it's needed.
+
+    :returns: A HookExecutor instance.
+    """
+    global _default_hook_executor
+    with _default_hook_executor_lock:
+        if _default_hook_executor is None:
+            _default_hook_executor = HookExecutor()
+        return _default_hook_executor
+
+
+def set_default_hook_executor(executor: HookExecutor = None) -> None:
+    """Sets the executor used by hooks that don't specify one.
+
+    :param executor: A HookExecutor instance, or None to create a new one
+        with the default settings when it's next needed.
+    """
+    global _default_hook_executor
+    with _default_hook_executor_lock:
+        _default_hook_executor = executor
@@ -0,0 +1,223 @@
+"""
+Idempotency keys allow clients to safely retry POST and PUT requests.
+
+A route created with an :class:`Idempotency` instance stores the response of
+the first request with a given `Idempotency-Key` header and request params,
+and replays it for any duplicate requests until it expires.  Duplicate
+requests received while the first one is still being handled wait for its
+response instead of calling the logic function again, and are rejected with a
+409 Conflict if it isn't handled in time.
+"""
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from doctor.errors import ImmutableError
+
+#: A stored response.  This is the content, status code and headers of the
+#: response returned by the logic function.
+StoredResponse = Tuple[Any, Optional[int], Optional[dict]]
+
+
+class IdempotencyStore(object):
+    """The base class for storing responses of idempotent requests."""
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        """Returns the stored response for a key.
+
+        :param key: The key of the request.
+        :returns: The response, or None if there isn't one or it expired.
+        """
+        raise NotImplementedError('This method must be implemented by '
+                                  'subclasses of IdempotencyStore')
+
+    def set(self, key: str, response: StoredResponse, ttl: float):
+        """Stores the response for a key.
+
+        :param key: The key of the request.
+        :param response: The response to store.
+        :param ttl: The number of seconds the response should be stored for.
+        """
+        raise NotImplementedError('This method must be implemented by '
+                                  'subclasses of IdempotencyStore')
+
+
+class MemoryStore(IdempotencyStore):
+    """Stores responses in memory, evicting the least recently used ones.
+
+    Responses are only shared by requests handled by the same process.
+
+    :param max_size: The maximum number of responses to store.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._responses = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            item = self._responses.get(key)
+            if item is None:
+                return None
+            response, expires = item
+            if expires <= time.monotonic():
+                del self._responses[key]
+                return None
+            self._responses.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: StoredResponse, ttl: float):
+        with self._lock:
+            self._responses[key] = (response, time.monotonic() + ttl)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+
+
+class SQLiteStore(IdempotencyStore):
+    """Stores responses in a local SQLite database.
+
+    Responses are shared by all processes using the same database file, and
+    are pickled, so the file should only be writable by the application.
+    Responses that can't be pickled are logged and not stored.
+
+    :param path: The path of the database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS doctor_idempotency ('
+                'key TEXT PRIMARY KEY, response BLOB NOT NULL, '
+                'expires REAL NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection to the database for the current thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        row = self._connect().execute(
+            'SELECT response FROM doctor_idempotency '
+            'WHERE key = ? AND expires > ?', (key, time.time())).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key: str, response: StoredResponse, ttl: float):
+        try:
+            data = pickle.dumps(response)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logging.warning('Not storing idempotent response %s that cannot '
+                            'be pickled: %s', key, e)
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM doctor_idempotency WHERE expires <= ?',
+                         (now,))
+            conn.execute(
+                'INSERT OR REPLACE INTO doctor_idempotency '
+                '(key, response, expires) VALUES (?, ?, ?)',
+                (key, data, now + ttl))
+
+
+class Idempotency(object):
+    """Configures idempotency keys for a route.
+
+    :param store: Where responses are stored.  Defaults to a
+        :class:`MemoryStore`.
+    :param ttl: The number of seconds a response is replayed for.
+    :param header: The request header containing the idempotency key.
+    :param wait_timeout: The maximum number of seconds a duplicate request
+        waits for the response of a request that is in flight.
+    """
+
+    def __init__(self, store: IdempotencyStore = None, ttl: float = 86400,
+                 header: str = 'Idempotency-Key', wait_timeout: float = 30):
+        if store is None:
+            store = MemoryStore()
+        self.store = store
+        self.ttl = ttl
+        self.header = header
+        self.wait_timeout = wait_timeout
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get_key(self, idempotency_key: str, method: str, path: str,
+                params: Any) -> str:
+        """Returns the key to store a response with.
+
+        :param idempotency_key: The value of the idempotency key header.
+        :param method: The HTTP method of the request.
+        :param path: The path of the request.
+        :param params: The validated request params.
+        :returns: A hash of the arguments.
+        """
+        data = json.dumps([idempotency_key, method, path, params],
+                          sort_keys=True, default=repr)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def call(self, key: str,
+             func: Callable[[], StoredResponse]) -> StoredResponse:
+        """Returns the stored response for a key, or calls func to create it.
+
+        If another thread is already calling func for the same key, this
+        waits for its response.  If that call raises an exception, one of the
+        waiting threads calls func instead and the others wait for it.  The
+        response is only stored if func doesn't raise an exception and its
+        content isn't an iterator.
+
+        :param key: The key from :meth:`get_key`.
+        :param func: A function that returns the response.
+        :returns: The response.
+        :raises ImmutableError: If another thread is calling func for the
+            same key and doesn't finish within `wait_timeout` seconds.
+        """
+        response = self.store.get(key)
+        if response is not None:
+            return response
+
+        expires = time.monotonic() + self.wait_timeout
+        while True:
+            with self._lock:
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    break
+            if not event.wait(max(0.0, expires - time.monotonic())):
+                # Don't handle the request twice at the same time.
+                raise ImmutableError(
+                    'A request with the same idempotency key is still being '
+                    'handled.')
+            response = self.store.get(key)
+            if response is not None:
+                return response
+            # The request failed or its response wasn't stored, so try to
+            # handle this one.  Only one of the waiting requests does, and
+            # the others wait for its response.
+
+        try:
+            # The response may have been stored after we checked for it.
+            response = self.store.get(key)
+            if response is not None:
+                return response
+            response = func()
+            if not isinstance(response[0], Iterator):
+                self.store.set(key, response, self.ttl)
+            return response
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
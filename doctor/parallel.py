@@ -0,0 +1,70 @@
+"""
+Validates many values in a pool of processes.
+
+Validation is CPU bound, so threads don't make validating many values faster.
+:func:`map_chunks` splits the values into chunks, validates the chunks in
+worker processes and yields the results in their original order.  Only a few
+chunks are submitted at once, so values are read from the iterable as results
+are consumed and arbitrarily large iterables can be validated.
+
+.. note:: The arguments passed to a worker's initializer, e.g. the type or
+    schema to validate with, are pickled when processes are started with the
+    `spawn` method, the default on macOS and Windows.  Types created with
+    doctor's type factory functions can't be pickled, so they can only be
+    validated in processes started with `fork`, the default on Linux.
+"""
+import collections
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List
+
+
+def iter_chunks(values: Iterable, chunk_size: int) -> Iterator[List]:
+    """Yields lists of up to `chunk_size` values from an iterable."""
+    iterator = iter(values)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_chunks(func: Callable[[List], List], values: Iterable,
+               processes: int = None, chunk_size: int = 1000,
+               initializer: Callable = None,
+               initargs: tuple = ()) -> Iterator[Any]:
+    """Calls a function with chunks of values in a pool of processes.
+
+    :param func: A module level function that's called with a list of values
+        and returns a list of results.
+    :param values: The values to pass to `func`.
+    :param processes: The number of worker processes.  Defaults to the
+        number of CPUs.
+    :param chunk_size: The number of values passed to each call of `func`.
+    :param initializer: A function that's called when each worker starts,
+        e.g. to set up the state used by `func`.
+    :param initargs: The arguments to call `initializer` with.
+    :returns: An iterator of the results of every chunk, in the order of the
+        values.
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    processes = processes or os.cpu_count() or 1
+    # Keep every worker busy without reading far ahead of the consumer.
+    max_pending = processes * 2
+    executor = ProcessPoolExecutor(
+        max_workers=processes, initializer=initializer, initargs=initargs)
+    pending = collections.deque()
+    try:
+        for chunk in iter_chunks(values, chunk_size):
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # Don't run chunks whose results won't be consumed.
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -8,9 +8,8 @@ import logging
 import warnings
 from typing import List
 
-import simplejson as json
-
-from doctor.errors import ParseError, TypeSystemError
+from doctor.errors import (
+    InvalidValueError, ParseError, PayloadTooLargeError, TypeSystemError)
 
 
 _bracket_strings = ('[', ord('['))
@@ -18,6 +17,36 @@ _brace_strings = ('{', ord('{'))
 _false_strings = ('false', b'false')
 _true_strings = ('true', b'true')
 
+#: The maximum length of the repr of an invalid value included in a parse
+#: error, so error responses don't echo back large request bodies.
+MAX_ERROR_VALUE_LENGTH = 100
+
+
+def _truncate_repr(value, max_length: int = MAX_ERROR_VALUE_LENGTH) -> str:
+    """Returns the repr of a value, truncated to `max_length` characters.
+
+    :param value: The value to represent.
+    :param max_length: The maximum length of the returned string.
+    :returns: The repr, ending with `...` if it was truncated.
+    """
+    text = repr(value)
+    if len(text) > max_length:
+        text = text[:max_length - 3] + '...'
+    return text
+
+
+def _json_loads(value):
+    """Deserialize a JSON string using simplejson.
+
+    simplejson is imported on first use so that importing doctor types does
+    not require loading it.
+
+    :param str value: JSON string.
+    :returns: the deserialized value.
+    """
+    import simplejson
+    return simplejson.loads(value)
+
 
 def _parse_array(value):
     """Coerce value into an list.
@@ -30,7 +59,7 @@ def _parse_array(value):
     value = value.lstrip()
     if not value or value[0] not in _bracket_strings:
         return None
-    return json.loads(value)
+    return _json_loads(value)
 
 
 def _parse_boolean(value):
@@ -59,7 +88,7 @@ def _parse_object(value):
     value = value.lstrip()
     if not value or value[0] not in _brace_strings:
         return None
-    return json.loads(value)
+    return _json_loads(value)
 
 
 def _parse_string(value):
@@ -145,7 +174,109 @@ def parse_value(value, allowed_types, name='value'):
                      (name, ', '.join(allowed_types)))
 
 
-def parse_json(value: str, sig_params: List[inspect.Parameter] = None) -> dict:
+class PayloadLimits(object):
+    """Limits on the size and complexity of a JSON payload.
+
+    These are checked before a payload is validated, so a pathological
+    request is rejected before any expensive validation happens.  A limit of
+    `None` means there is no limit.
+
+    :param max_body_bytes: The maximum size of the payload in bytes.
+    :param max_depth: The maximum nesting depth of arrays and objects.  e.g.
+        `{"a": [1]}` has a depth of 2.
+    :param max_array_length: The maximum number of items in any array.
+    :param max_object_keys: The maximum number of keys in any object.
+    """
+    def __init__(self, max_body_bytes: int = None, max_depth: int = None,
+                 max_array_length: int = None, max_object_keys: int = None):
+        self.max_body_bytes = max_body_bytes
+        self.max_depth = max_depth
+        self.max_array_length = max_array_length
+        self.max_object_keys = max_object_keys
+
+    def __repr__(self):
+        return ('PayloadLimits(max_body_bytes={}, max_depth={}, '
+                'max_array_length={}, max_object_keys={})'.format(
+                    self.max_body_bytes, self.max_depth,
+                    self.max_array_length, self.max_object_keys))
+
+
+#: The payload limits used for routes that don't define their own.
+_default_payload_limits = None  # type: PayloadLimits
+
+
+def get_default_payload_limits() -> PayloadLimits:
+    """Returns the payload limits used for routes that don't define their own.
+
+    :returns: A PayloadLimits instance or None if there are no limits.
+    """
+    return _default_payload_limits
+
+
+def set_default_payload_limits(limits: PayloadLimits = None) -> None:
+    """Sets the payload limits used for routes that don't define their own.
+
+    :param limits: A PayloadLimits instance or None to remove the limits.
+    """
+    global _default_payload_limits
+    _default_payload_limits = limits
+
+
+def check_body_size(size: int, limits: PayloadLimits) -> None:
+    """Checks the size of a payload against the `max_body_bytes` limit.
+
+    :param size: The size of the payload in bytes.
+    :param limits: The limits to check.
+    :raises PayloadTooLargeError: If the payload is too large.
+    """
+    if limits.max_body_bytes is not None and size > limits.max_body_bytes:
+        raise PayloadTooLargeError(
+            'Payload must not be larger than {} bytes.'.format(
+                limits.max_body_bytes))
+
+
+def check_payload_limits(value, limits: PayloadLimits) -> None:
+    """Checks a parsed JSON value against the depth, array length and object
+    key limits.
+
+    :param value: The parsed JSON value.
+    :param limits: The limits to check.
+    :raises InvalidValueError: If the value exceeds any of the limits.
+    """
+    max_depth = limits.max_depth
+    max_array_length = limits.max_array_length
+    max_object_keys = limits.max_object_keys
+    if max_depth is None and max_array_length is None and (
+            max_object_keys is None):
+        return
+
+    stack = [(value, 1)]
+    while stack:
+        value, depth = stack.pop()
+        if isinstance(value, dict):
+            if max_object_keys is not None and len(value) > max_object_keys:
+                raise InvalidValueError(
+                    'Objects must not have more than {} keys.'.format(
+                        max_object_keys))
+            children = value.values()
+        elif isinstance(value, list):
+            if max_array_length is not None and len(value) > max_array_length:
+                raise InvalidValueError(
+                    'Arrays must not have more than {} items.'.format(
+                        max_array_length))
+            children = value
+        else:
+            continue
+        if max_depth is not None and depth > max_depth:
+            raise InvalidValueError(
+                'Payload must not be nested more than {} levels deep.'.format(
+                    max_depth))
+        stack.extend((child, depth + 1) for child in children
+                     if isinstance(child, (dict, list)))
+
+
+def parse_json(value: str, sig_params: List[inspect.Parameter] = None,
+               limits: PayloadLimits = None) -> dict:
     """Parse a value as JSON.
 
     This is just a wrapper around json.loads which re-raises any errors as a
@@ -153,14 +284,24 @@ def parse_json(value: str, sig_params: List[inspect.Parameter] = None) -> dict:
 
     :param str value: JSON string.
     :param dict sig_params: The logic function's signature parameters.
+    :param limits: Optional limits on the size and complexity of the value.
+        If it is a str, the `max_body_bytes` limit is checked against the
+        number of characters.
     :returns: the parsed JSON value
+    :raises PayloadTooLargeError: If the value is larger than allowed.
+    :raises InvalidValueError: If the value is more complex than allowed.
     """
+    if limits is not None:
+        check_body_size(len(value), limits)
     try:
-        loaded = json.loads(value)
+        loaded = _json_loads(value)
     except Exception as e:
-        message = 'Error parsing JSON: %r error: %s' % (value, e)
+        message = 'Error parsing JSON: %s error: %s' % (
+            _truncate_repr(value), e)
         logging.debug(message, exc_info=e)
         raise ParseError(message)
+    if limits is not None:
+        check_payload_limits(loaded, limits)
 
     if sig_params is not None:
         return map_param_names(loaded, sig_params)
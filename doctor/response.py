@@ -13,13 +13,22 @@ class Response(Generic[CT]):
     this class can be returned from a logic function in order to modify
     response headers.
 
-    :param content: The data to be returned with the response.
+    :param content: The data to be returned with the response.  If it's an
+        iterator, e.g. a generator, it's streamed as a JSON array.
     :param dict headers: A dict of response headers to include with the response
     :param int status_code: The status code for the response.
+    :param int validate_every: If `content` is an iterator only every nth item
+        is validated.  Defaults to validating every item.
+    :raises ValueError: If `validate_every` isn't an int of at least 1.
     """
 
     def __init__(self, content: CT, headers: dict = None,
-                 status_code: int = None):
+                 status_code: int = None, validate_every: int = 1):
+        if (not isinstance(validate_every, int) or
+                isinstance(validate_every, bool) or validate_every < 1):
+            raise ValueError('validate_every must be an int of at least 1, '
+                             'not {!r}'.format(validate_every))
         self.content = content
         self.headers = headers
         self.status_code = status_code
+        self.validate_every = validate_every
@@ -2,6 +2,12 @@ import functools
 import inspect
 from typing import Any, Callable, List, Sequence, Tuple
 
+from doctor.concurrency import (
+    acquire_all, get_global_concurrency_limit, release_all, ConcurrencyLimit)
+from doctor.deadline import get_deadline_param
+from doctor.errors import ServiceUnavailableError
+from doctor.idempotency import Idempotency
+from doctor.parsers import PayloadLimits
 from doctor.utils import copy_func, get_params_from_func, get_valid_class_name
 
 
@@ -11,8 +17,21 @@ class HTTPMethod(object):
     When instantiated the logic attribute will have 3 attributes added to it:
         - `_doctor_allowed_exceptions` - A list of excpetions that are allowed
           to be re-reaised if encountered during a request.
+        - `_doctor_concurrency_limit` - The
+          :class:`~doctor.concurrency.ConcurrencyLimit` for the route, if any.
+        - `_doctor_deadline_param` - The name of the parameter that receives
+          the :class:`~doctor.deadline.Deadline` of the request, if any.
+        - `_doctor_idempotency` - The
+          :class:`~doctor.idempotency.Idempotency` configuration, if any.
+        - `_doctor_max_errors` - The maximum number of validation errors to
+          collect for a request.
         - `_doctor_params` - A :class:`~doctor.utils.Params` instance.
+        - `_doctor_payload_limits` - The
+          :class:`~doctor.parsers.PayloadLimits` for the request body.
         - `_doctor_signature` - The parsed function Signature.
+        - `_doctor_sparse_fields` - If the response can be projected with a
+          `fields` query parameter.
+        - `_doctor_timeout` - The number of seconds a request may take.
         - `_doctor_title` - The title that should be used in api documentation.
 
     :param method: The HTTP method.  One of: (delete, get, post, put).
@@ -23,10 +42,32 @@ class HTTPMethod(object):
         when generating api documentation.
     :param req_obj_type: A doctor :class:`~doctor.types.Object` type that the
         request body should be converted to.
+    :param payload_limits: Limits on the size and complexity of a JSON request
+        body.  If not specified the default limits set with
+        :func:`~doctor.parsers.set_default_payload_limits` are used.
+    :param max_errors: The maximum number of validation errors to collect for
+        the request parameters and each Object or Array type that doesn't
+        define its own `max_errors`.  `1` stops at the first error.
+    :param sparse_fields: If `True` clients can select the properties of the
+        response to return with a `fields` query parameter.  See
+        :mod:`doctor.fields`.
+    :param idempotency: If specified, duplicate requests with the same
+        idempotency key header and params replay the first response.  See
+        :class:`~doctor.idempotency.Idempotency`.
+    :param concurrency_limit: If specified, limits the number of requests to
+        this route that are handled at once.  The same limit may be shared by
+        several routes.  See :class:`~doctor.concurrency.ConcurrencyLimit`.
+    :param timeout: If specified, the number of seconds after which a request
+        is aborted with a 504 error.  See :mod:`doctor.deadline`.
     """
     def __init__(self, method: str, logic: Callable,
                  allowed_exceptions: List = None, title: str = None,
-                 req_obj_type: Callable = None):
+                 req_obj_type: Callable = None,
+                 payload_limits: PayloadLimits = None,
+                 max_errors: int = None, sparse_fields: bool = False,
+                 idempotency: Idempotency = None,
+                 concurrency_limit: ConcurrencyLimit = None,
+                 timeout: float = None):
         self.method = method
         logic = copy_func(logic)
 
@@ -41,55 +82,104 @@ class HTTPMethod(object):
         if not hasattr(logic, '_doctor_params'):
             logic._doctor_params = get_params_from_func(logic)
         logic._doctor_allowed_exceptions = allowed_exceptions
+        logic._doctor_concurrency_limit = concurrency_limit
+        logic._doctor_deadline_param = get_deadline_param(
+            logic._doctor_signature)
+        logic._doctor_idempotency = idempotency
+        logic._doctor_max_errors = max_errors
+        logic._doctor_payload_limits = payload_limits
+        logic._doctor_sparse_fields = sparse_fields
+        logic._doctor_timeout = timeout
         logic._doctor_title = title
         self.logic = logic
 
 
 def delete(func: Callable, allowed_exceptions: List = None,
-           title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+           title: str = None, req_obj_type: Callable = None,
+           payload_limits: PayloadLimits = None,
+           max_errors: int = None,
+           sparse_fields: bool = False,
+           concurrency_limit: ConcurrencyLimit = None,
+           timeout: float = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a DELETE route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('delete', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      payload_limits=payload_limits, max_errors=max_errors,
+                      sparse_fields=sparse_fields,
+                      concurrency_limit=concurrency_limit, timeout=timeout)
 
 
 def get(func: Callable, allowed_exceptions: List = None,
-        title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+        title: str = None, req_obj_type: Callable = None,
+        payload_limits: PayloadLimits = None,
+        max_errors: int = None,
+        sparse_fields: bool = False,
+        concurrency_limit: ConcurrencyLimit = None,
+        timeout: float = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a GET route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('get', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      payload_limits=payload_limits, max_errors=max_errors,
+                      sparse_fields=sparse_fields,
+                      concurrency_limit=concurrency_limit, timeout=timeout)
 
 
 def post(func: Callable, allowed_exceptions: List = None,
-         title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+         title: str = None, req_obj_type: Callable = None,
+         payload_limits: PayloadLimits = None,
+         max_errors: int = None,
+         sparse_fields: bool = False,
+         idempotency: Idempotency = None,
+         concurrency_limit: ConcurrencyLimit = None,
+         timeout: float = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a POST route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('post', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      payload_limits=payload_limits, max_errors=max_errors,
+                      sparse_fields=sparse_fields, idempotency=idempotency,
+                      concurrency_limit=concurrency_limit, timeout=timeout)
 
 
 def put(func: Callable, allowed_exceptions: List = None,
-        title: str = None, req_obj_type: Callable = None) -> HTTPMethod:
+        title: str = None, req_obj_type: Callable = None,
+        payload_limits: PayloadLimits = None,
+        max_errors: int = None,
+        sparse_fields: bool = False,
+        idempotency: Idempotency = None,
+        concurrency_limit: ConcurrencyLimit = None,
+        timeout: float = None) -> HTTPMethod:
     """Returns a HTTPMethod instance to create a PUT route.
 
     :see: :class:`~doctor.routing.HTTPMethod`
     """
     return HTTPMethod('put', func, allowed_exceptions=allowed_exceptions,
-                      title=title, req_obj_type=req_obj_type)
+                      title=title, req_obj_type=req_obj_type,
+                      payload_limits=payload_limits, max_errors=max_errors,
+                      sparse_fields=sparse_fields, idempotency=idempotency,
+                      concurrency_limit=concurrency_limit, timeout=timeout)
 
 
 def create_http_method(logic: Callable, http_method: str,
                        handle_http: Callable, before: Callable = None,
-                       after: Callable = None) -> Callable:
+                       after: Callable = None,
+                       handle_error: Callable = None) -> Callable:
     """Create a handler method to be used in a handler class.
 
+    Before the request is handled a slot is acquired from the route's
+    concurrency limit and then from the global concurrency limit, if they
+    are set.  The slots are released once the handler returns, or if it
+    returns a streamed response, once the response is closed.  The `after`
+    function is called before a streamed response's body is sent.
+
     :param callable logic: The underlying function to execute with the
         parsed and validated parameters.
     :param str http_method: HTTP method this will handle.
@@ -99,16 +189,36 @@ def create_http_method(logic: Callable, http_method: str,
         with the route.
     :param after: A function to be called after the logic function associated
         with the route.
+    :param handle_error: A function that is called with a
+        :class:`~doctor.errors.ServiceUnavailableError` when the request is
+        shed.  It should raise or return the framework's error response.  If
+        not specified the error is raised.
     :returns: A handler function.
     """
     @functools.wraps(logic)
     def fn(handler, *args, **kwargs):
-        if before is not None and callable(before):
-            before()
-        result = handle_http(handler, args, kwargs, logic)
-        if after is not None and callable(after):
-            after(result)
-        return result
+        limits = (getattr(logic, '_doctor_concurrency_limit', None),
+                  get_global_concurrency_limit())
+        try:
+            acquired = acquire_all(limits)
+        except ServiceUnavailableError as e:
+            if handle_error is None:
+                raise
+            return handle_error(e)
+        try:
+            if before is not None and callable(before):
+                before()
+            result = handle_http(handler, args, kwargs, logic)
+            if after is not None and callable(after):
+                after(result)
+            if (acquired and getattr(result, 'is_streamed', False) and
+                    hasattr(result, 'call_on_close')):
+                # Hold the slots until the streamed body has been sent.
+                result.call_on_close(functools.partial(release_all, acquired))
+                acquired = []
+            return result
+        finally:
+            release_all(acquired)
     return fn
 
 
@@ -125,7 +235,8 @@ class Route(object):
     :param before: A function to be called before the logic function associated
         with the route.
     :param after: A function to be called after the logic function associated
-        with the route.
+        with the route.  Wrap it in a :class:`~doctor.hooks.AsyncHook` to run
+        it on a background thread instead of before the response is returned.
     """
     def __init__(self, route: str, methods: Sequence[HTTPMethod],
                  heading: str = 'API', base_handler_class = None,
@@ -160,7 +271,8 @@ def get_handler_name(route: Route, logic: Callable) -> str:
 
 
 def create_routes(routes: Sequence[HTTPMethod], handle_http: Callable,
-                  default_base_handler_class: Any) -> List[Tuple[str, Any]]:
+                  default_base_handler_class: Any,
+                  handle_error: Callable = None) -> List[Tuple[str, Any]]:
     """Creates handler routes from the provided routes.
 
     :param routes: A tuple containing the route and another tuple with
@@ -169,6 +281,8 @@ def create_routes(routes: Sequence[HTTPMethod], handle_http: Callable,
         used to wrap the logic functions.
     :param default_base_handler_class: The default base handler class that
         should be used.
+    :param handle_error: The function to call when a request is shed.  See
+        :func:`create_http_method`.
     :returns: A list of tuples containing the route and generated handler.
     """
     created_routes = []
@@ -193,7 +307,8 @@ def create_routes(routes: Sequence[HTTPMethod], handle_http: Callable,
             logic = method.logic
             http_method = method.method
             http_func = create_http_method(logic, http_method, handle_http,
-                                           before=r.before, after=r.after)
+                                           before=r.before, after=r.after,
+                                           handle_error=handle_error)
 
             handler_methods_and_properties = {
                 '__name__': handler_name,
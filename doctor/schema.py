@@ -1,10 +1,20 @@
+import hashlib
 import logging
+import marshal
 import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple)
 
 import jsonschema
 import yaml
 from jsonschema.compat import urldefrag
 
+from .compiler import CompiledValidator
 from .errors import (
     DoctorError, SchemaError, SchemaLoadingError, SchemaValidationError)
 from .parsers import parse_json
@@ -12,10 +22,383 @@ from .parsers import parse_json
 
 DEFAULT = object()
 
+#: The YAML loader used to parse schema files.  This is the C loader if PyYAML
+#: was built with libyaml, which is much faster than the Python loader.
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+#: Parsed schema files keyed by absolute path.  Each value is a tuple of the
+#: file's modification time and size and the parsed document.
+_document_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+#: Schemas created with :meth:`Schema.from_file` keyed by class and absolute
+#: path.  Each value is a tuple of the document it was created from and the
+#: schema.
+_schema_cache: Dict[Tuple[type, str], Tuple[Any, 'Schema']] = {}
+_schema_cache_lock = threading.Lock()
+#: The directory parsed schema files are stored in, or None to not store them.
+_schema_cache_dir: str = None
+
+#: Validate values with :class:`jsonschema.Draft4Validator`.
+JSONSCHEMA_BACKEND = 'jsonschema'
+#: Validate values with a :class:`~doctor.compiler.CompiledValidator`.
+COMPILED_BACKEND = 'compiled'
+
+VALIDATOR_BACKENDS = (JSONSCHEMA_BACKEND, COMPILED_BACKEND)
+
+#: The backend used by schemas that don't specify one.
+_default_validator_backend: str = JSONSCHEMA_BACKEND
+
+
+def get_schema_cache_dir() -> str:
+    """Returns the directory parsed schema files are stored in.
+
+    :returns: The path of the directory or None if parsed schema files aren't
+        stored.
+    """
+    return _schema_cache_dir
+
+
+def set_schema_cache_dir(path: str = None) -> None:
+    """Sets a directory to store parsed schema files in.
+
+    Parsed files are stored in a file named after a hash of their contents,
+    so later processes load them from there instead of parsing the YAML
+    again.  The directory should only be writable by the application, since
+    the stored files are loaded with :mod:`marshal`.
+
+    :param path: The path of the directory, which is created if it doesn't
+        exist, or None to stop storing parsed files.
+    """
+    global _schema_cache_dir
+    _schema_cache_dir = path
+
+
+def get_default_validator_backend() -> str:
+    """Returns the validator backend used by schemas that don't specify one.
+
+    :returns: One of `'jsonschema'` or `'compiled'`.
+    """
+    return _default_validator_backend
+
+
+def set_default_validator_backend(backend: str) -> None:
+    """Sets the validator backend used by schemas that don't specify one.
+
+    :param backend: `'jsonschema'` to validate with jsonschema's
+        :class:`~jsonschema.Draft4Validator`, or `'compiled'` to validate with
+        validators compiled from the bundled schema.
+    :raises ValueError: If the backend is unknown.
+    """
+    global _default_validator_backend
+    if backend not in VALIDATOR_BACKENDS:
+        raise ValueError('backend must be one of: {}'.format(
+            ', '.join(VALIDATOR_BACKENDS)))
+    _default_validator_backend = backend
+
+
+def _parse_schema(content: bytes) -> Any:
+    """Parses the contents of a schema file, using the cache directory set
+    with :func:`set_schema_cache_dir` if there is one.
+    """
+    cache_dir = _schema_cache_dir
+    if cache_dir is None:
+        return yaml.load(content, Loader=YAML_LOADER)
+
+    # The marshal format can change between Python versions, so include the
+    # version in the name.
+    digest = hashlib.sha256(content).hexdigest()
+    cache_path = os.path.join(cache_dir, '{}.{}.marshal'.format(
+        digest, sys.implementation.cache_tag))
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cached = marshal.load(cache_file)
+        # Stored files include the digest, since marshal doesn't detect
+        # most corrupted data.
+        if isinstance(cached, tuple) and cached[0] == digest:
+            return cached[1]
+        logging.warning('Ignoring invalid cached schema %s', cache_path)
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, TypeError, ValueError) as e:
+        logging.warning('Error loading cached schema %s: %s', cache_path, e)
+
+    document = yaml.load(content, Loader=YAML_LOADER)
+    try:
+        data = marshal.dumps((digest, document))
+    except ValueError:
+        # The document contains values marshal can't store, e.g. dates.
+        return document
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first, so other processes never load a
+        # partially written file.
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        logging.warning('Error storing cached schema %s: %s', cache_path, e)
+    return document
+
+
+def load_schema_file(path: str) -> Any:
+    """Loads a YAML or JSON schema file.
+
+    Parsed files are cached for the life of the process, so each file is only
+    parsed once no matter how many schemas or types use it.  A file is parsed
+    again if its modification time or size changes.  The returned document is
+    shared and must not be modified.
+
+    :param path: The path to the schema file.
+    :returns: The parsed document.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _schema_cache_lock:
+        cached = _document_cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, 'rb') as schema_file:
+        document = _parse_schema(schema_file.read())
+    with _schema_cache_lock:
+        _document_cache[path] = (version, document)
+    return document
+
+
+def clear_schema_cache(path: str = None) -> None:
+    """Removes schema files from the cache used by :func:`load_schema_file`
+    and :meth:`Schema.from_file`.
+
+    :param path: The path of the file to remove.  If None, all files are
+        removed.
+    """
+    with _schema_cache_lock:
+        if path is None:
+            _document_cache.clear()
+            _schema_cache.clear()
+            return
+        path = os.path.abspath(path)
+        _document_cache.pop(path, None)
+        for key in [key for key in _schema_cache if key[1] == path]:
+            del _schema_cache[key]
+
+
+#: The extensions of the files loaded by :func:`preload_schema_files`.
+SCHEMA_FILE_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+
+class PreloadResult(object):
+    """The result of preloading schema files with :func:`preload_schema_files`.
+
+    :param root: The directory the files were loaded from.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        #: The documents that were loaded, keyed by absolute path.
+        self.documents: Dict[str, Any] = {}
+        #: The number of seconds it took to load each file, keyed by absolute
+        #: path.
+        self.timings: Dict[str, float] = {}
+        #: Error messages for files that couldn't be loaded, keyed by
+        #: absolute path.
+        self.errors: Dict[str, str] = {}
+        #: The number of seconds it took to load all files.
+        self.total = 0.0
+
+    def __repr__(self):
+        return ('<PreloadResult root={!r} files={} errors={} '
+                'total={:.3f}s>'.format(self.root, len(self.documents),
+                                        len(self.errors), self.total))
+
+
+def _load_schema_document(
+        path: str) -> Tuple[str, Tuple[int, int], Any, float]:
+    """Parses a schema file for :func:`preload_schema_files`.
+
+    This runs in a worker thread or process, so it doesn't use the cache.
+
+    :returns: A tuple of the path, the file's modification time and size, the
+        parsed document and the number of seconds it took to load.
+    """
+    start = time.perf_counter()
+    stat = os.stat(path)
+    with open(path, 'rb') as schema_file:
+        document = _parse_schema(schema_file.read())
+    return (path, (stat.st_mtime_ns, stat.st_size), document,
+            time.perf_counter() - start)
+
+
+def preload_schema_files(
+        root: str, max_workers: int = None, processes: bool = False,
+        extensions: Sequence[str] = SCHEMA_FILE_EXTENSIONS) -> PreloadResult:
+    """Loads every schema file in a directory tree in parallel.
+
+    The files are added to the cache used by :func:`load_schema_file`, so
+    references to them don't parse any files while requests are handled.
+    Call this when a process starts, before it handles requests.  Files that
+    are already cached and haven't changed aren't loaded again.
+
+    :param root: The directory to load schema files from.
+    :param max_workers: The number of threads or processes that parse files.
+        Defaults to the default of the executor.
+    :param processes: If True files are parsed in a pool of processes instead
+        of threads.  Parsing YAML holds the GIL, so processes are faster for
+        large schema trees, but the documents have to be sent back to this
+        process.
+    :param extensions: The extensions of the files to load.
+    :returns: A PreloadResult with the loaded documents, the time it took to
+        load each file and the total time.  Files that can't be loaded are
+        logged and included in its `errors`.
+    """
+    start = time.perf_counter()
+    root = os.path.abspath(root)
+    result = PreloadResult(root)
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if filename.endswith(tuple(extensions)):
+                paths.append(os.path.join(dirpath, filename))
+
+    with _schema_cache_lock:
+        cached = {path: _document_cache.get(path) for path in paths}
+    to_load = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            result.errors[path] = str(e)
+            continue
+        if (cached[path] is not None and
+                cached[path][0] == (stat.st_mtime_ns, stat.st_size)):
+            result.documents[path] = cached[path][1]
+            result.timings[path] = 0.0
+        else:
+            to_load.append(path)
+
+    if to_load:
+        executor_class = ProcessPoolExecutor if processes else (
+            ThreadPoolExecutor)
+        with executor_class(max_workers=max_workers) as executor:
+            futures = [(path, executor.submit(_load_schema_document, path))
+                       for path in to_load]
+            for path, future in futures:
+                try:
+                    _, version, document, seconds = future.result()
+                except Exception as e:
+                    logging.warning('Error preloading schema %s: %s', path, e)
+                    result.errors[path] = str(e)
+                    continue
+                with _schema_cache_lock:
+                    _document_cache[path] = (version, document)
+                result.documents[path] = document
+                result.timings[path] = seconds
+
+    result.total = time.perf_counter() - start
+    logging.debug('Preloaded %d schema files from %s in %.3fs',
+                  len(result.documents), root, result.total)
+    return result
+
+
+#: Draft 4 keywords whose value is a subschema.
+_SUBSCHEMA_KEYWORDS = ('additionalItems', 'additionalProperties', 'items',
+                       'not')
+#: Draft 4 keywords whose value is a list of subschemas.
+_SUBSCHEMA_LIST_KEYWORDS = ('allOf', 'anyOf', 'items', 'oneOf')
+#: Draft 4 keywords whose value is a dict of subschemas.
+_SUBSCHEMA_DICT_KEYWORDS = ('dependencies', 'patternProperties', 'properties')
+
+
+def bundle_schema(schema: Any, resolver: 'SchemaRefResolver') -> Any:
+    """Returns a copy of a schema with every `$ref` replaced by the value it
+    references.
+
+    Only keywords that are validated are bundled, so references in
+    `definitions` and other keywords that aren't part of the schema are
+    kept.  A reference that is used more than once is inlined as the same
+    object, so the result must not be modified.
+
+    :param schema: The schema to bundle.
+    :param resolver: The resolver to resolve references with.  Its resolution
+        scope should be the scope of the schema.
+    :returns: The bundled schema.
+    :raises SchemaError: If a reference can't be resolved, or if it's
+        circular, e.g. a recursive schema.
+    """
+    bundled: Dict[str, Any] = {}
+    # The urls of the references that are being bundled.
+    stack: List[str] = []
+
+    def bundle_ref(ref: str) -> Any:
+        url, value = resolver.resolve(ref)
+        if url in bundled:
+            return bundled[url]
+        if url in stack:
+            raise SchemaError('Circular reference in schema: {}'.format(
+                resolver._format_stack(stack, url)))
+        stack.append(url)
+        resolver.push_scope(url)
+        try:
+            bundled[url] = bundle_subschema(value)
+        finally:
+            resolver.pop_scope()
+            stack.pop()
+        return bundled[url]
+
+    def bundle_subschema(value: Any) -> Any:
+        if not isinstance(value, dict):
+            # e.g. `additionalProperties: false`
+            return value
+        ref = value.get('$ref')
+        if isinstance(ref, str):
+            return bundle_ref(ref)
+        value = dict(value)
+        for keyword in _SUBSCHEMA_KEYWORDS:
+            if isinstance(value.get(keyword), dict):
+                value[keyword] = bundle_subschema(value[keyword])
+        for keyword in _SUBSCHEMA_LIST_KEYWORDS:
+            if isinstance(value.get(keyword), list):
+                value[keyword] = [bundle_subschema(v) for v in value[keyword]]
+        for keyword in _SUBSCHEMA_DICT_KEYWORDS:
+            if isinstance(value.get(keyword), dict):
+                # Dependencies may also be lists of property names, which
+                # are returned as is.
+                value[keyword] = {k: bundle_subschema(v)
+                                  for k, v in value[keyword].items()}
+        return value
+
+    return bundle_subschema(schema)
+
 
 class SchemaRefResolver(jsonschema.RefResolver):
 
-    """Subclass in order to provide support for loading YAML files."""
+    """Subclass in order to provide support for loading YAML files.
+
+    The stack of resolution scopes is kept per thread, so a resolver can be
+    shared by validators running in several threads at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._local = threading.local()
+        super(SchemaRefResolver, self).__init__(*args, **kwargs)
+
+    @property
+    def _scopes_stack(self) -> List[str]:
+        """The resolution scopes of the current thread."""
+        scopes = getattr(self._local, 'scopes', None)
+        if scopes is None:
+            scopes = self._local.scopes = list(self._initial_scopes)
+        return scopes
+
+    @_scopes_stack.setter
+    def _scopes_stack(self, scopes: List[str]):
+        # Threads that haven't resolved anything yet start from these scopes.
+        self._initial_scopes = list(scopes)
+        self._local.scopes = scopes
 
     def _format_stack(self, stack, current=None):
         """Prettifies a scope stack for use in error messages.
@@ -98,8 +481,7 @@ class SchemaRefResolver(jsonschema.RefResolver):
         if uri.startswith('file://'):
             try:
                 path = uri[7:]
-                with open(path, 'r') as schema_file:
-                    result = yaml.load(schema_file)
+                result = load_schema_file(path)
                 if self.cache_remote:
                     self.store[uri] = result
                 return result
@@ -109,6 +491,37 @@ class SchemaRefResolver(jsonschema.RefResolver):
         return super(SchemaRefResolver, self).resolve_remote(uri)
 
 
+def _validate_many(
+        schema: 'Schema', validator: Any, values: Iterable
+) -> Iterator[Tuple[Any, Optional[SchemaValidationError]]]:
+    """Yields a tuple of each value and its SchemaValidationError, or None
+    if it's valid.
+    """
+    for value in values:
+        try:
+            schema.validate(value, validator)
+        except SchemaValidationError as e:
+            yield value, e
+        else:
+            yield value, None
+
+
+#: The schema and validator used in a :meth:`Schema.validate_many` worker
+#: process.
+_worker_validator: Tuple['Schema', Any] = None
+
+
+def _init_validate_worker(schema: 'Schema', custom_schema: dict = None):
+    """Sets up a worker process to validate values with a schema."""
+    global _worker_validator
+    _worker_validator = (schema, schema.get_validator(custom_schema))
+
+
+def _validate_chunk(values: list) -> list:
+    """Validates a chunk of values in a worker process."""
+    return list(_validate_many(*_worker_validator, values))
+
+
 class Schema(object):
 
     """
@@ -117,20 +530,116 @@ class Schema(object):
 
     :param dict schema: The loaded schema.
     :param str schema_path: The absolute path to the directory of local schemas.
+    :param str validator_backend: The backend used to validate values, either
+        `'jsonschema'` or `'compiled'`.  If None the backend returned by
+        :func:`get_default_validator_backend` is used.
     """
 
-    def __init__(self, schema, schema_path=None):
+    def __init__(self, schema, schema_path=None, validator_backend=None):
+        if (validator_backend is not None and
+                validator_backend not in VALIDATOR_BACKENDS):
+            raise ValueError('validator_backend must be one of: {}'.format(
+                ', '.join(VALIDATOR_BACKENDS)))
         self.schema = schema
+        self.validator_backend = validator_backend
+        self._bundles = {}
+        #: Compiled validators keyed by the id of the schema they validate.
+        #: Each value is a tuple of the schema and its validator, which is
+        #: None if the schema couldn't be compiled.
+        self._compiled_validators = {}
         self._resolver = None
+        self._resolver_lock = threading.Lock()
         self._schema_path = schema_path
 
+    def bundle(self, ref=None):
+        """Returns the schema with every `$ref` inlined.
+
+        Validating against a bundled schema doesn't need to resolve any
+        references, so it's faster and doesn't use the resolver's state.
+        Bundled schemas are cached and must not be modified.
+
+        :param str ref: A reference to the part of the schema to bundle, e.g.
+            `'#/definitions/foo'`.  If None the whole schema is bundled.
+        :returns: The bundled schema.
+        :raises SchemaError: If a reference can't be resolved, or the schema
+            is recursive and can't be bundled.
+        :see: :func:`bundle_schema`
+        """
+        bundled = self._bundles.get(ref)
+        if bundled is None:
+            if ref is None:
+                bundled = bundle_schema(self.schema, self.resolver)
+            else:
+                bundled = bundle_schema({'$ref': ref}, self.resolver)
+            self._bundles[ref] = bundled
+        return bundled
+
+    def _get_compiled_validator(self, schema):
+        """Returns a compiled validator for the schema or one of its bundles.
+
+        :param dict schema: The schema, or a schema returned by
+            :meth:`bundle`.
+        :returns: A CompiledValidator, or None if the schema can't be
+            compiled.
+        """
+        cached = self._compiled_validators.get(id(schema))
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        if not (schema is self.schema or
+                any(schema is bundled for bundled in self._bundles.values())):
+            # Only schemas that live as long as this one are compiled, since
+            # compiling is much slower than validating.
+            return None
+        validator = None
+        try:
+            bundled = self.bundle() if schema is self.schema else schema
+            validator = CompiledValidator(
+                bundled, format_checker=jsonschema.draft4_format_checker)
+        except SchemaError as e:
+            logging.debug('Unable to compile schema: %s', e)
+        self._compiled_validators[id(schema)] = (schema, validator)
+        return validator
+
+    def preload(self, root=None, **kwargs):
+        """Loads every schema file in a directory tree in parallel and adds
+        them to the resolver's store, so no files are loaded when references
+        are resolved.
+
+        :param str root: The directory to load schema files from.  Defaults
+            to the directory of local schemas.
+        :param kwargs: Passed on to :func:`preload_schema_files`.
+        :returns: A PreloadResult.
+        :raises ValueError: If there is no directory to load files from.
+        """
+        if root is None:
+            root = self._schema_path
+        if root is None:
+            raise ValueError('A root directory is required for schemas '
+                             'without a schema_path.')
+        result = preload_schema_files(root, **kwargs)
+        store = self.resolver.store
+        for path, document in result.documents.items():
+            store['file://' + path] = document
+        return result
+
     def get_validator(self, schema=None):
-        """Get a jsonschema validator.
+        """Get a validator for the schema.
+
+        When the `'compiled'` validator backend is used, the schema and
+        schemas returned by :meth:`bundle` are validated with a
+        :class:`~doctor.compiler.CompiledValidator`.  Other schemas, and
+        schemas that can't be bundled, are validated with jsonschema.
 
         :param dict schema: A custom schema to validate against.
-        :returns: an instance of jsonschema Draft4Validator.
+        :returns: an instance of jsonschema Draft4Validator, or a
+            CompiledValidator.
         """
         schema = schema if schema is not None else self.schema
+        backend = self.validator_backend or _default_validator_backend
+        if backend == COMPILED_BACKEND:
+            validator = self._get_compiled_validator(schema)
+            if validator is not None:
+                return validator
         return jsonschema.Draft4Validator(
             schema, resolver=self.resolver,
             format_checker=jsonschema.draft4_format_checker)
@@ -151,17 +660,23 @@ class Schema(object):
 
     @property
     def resolver(self):
-        """jsonschema RefResolver object for the base schema."""
+        """jsonschema RefResolver object for the base schema.
+
+        The resolver is shared by all threads using the schema.
+        """
         if self._resolver is not None:
             return self._resolver
-        if self._schema_path is not None:
-            # the documentation for ref resolving
-            # https://github.com/Julian/jsonschema/issues/98
-            # https://python-jsonschema.readthedocs.org/en/latest/references/
-            self._resolver = SchemaRefResolver(
-                'file://' + self._schema_path + '/', self.schema)
-        else:
-            self._resolver = SchemaRefResolver.from_schema(self.schema)
+        with self._resolver_lock:
+            if self._resolver is not None:
+                return self._resolver
+            if self._schema_path is not None:
+                # the documentation for ref resolving
+                # https://github.com/Julian/jsonschema/issues/98
+                # https://python-jsonschema.readthedocs.org/en/latest/references/
+                self._resolver = SchemaRefResolver(
+                    'file://' + self._schema_path + '/', self.schema)
+            else:
+                self._resolver = SchemaRefResolver.from_schema(self.schema)
         return self._resolver
 
     def validate(self, value, validator):
@@ -197,6 +712,31 @@ class Schema(object):
                 raise SchemaValidationError(e.args[0], errors=errors)
         return value
 
+    def validate_many(self, values, schema=None, processes=None,
+                      chunk_size=1000):
+        """Validates many values, yielding a result for each in order.
+
+        The validator is only created once.  Results are yielded as values
+        are read from the iterable, so it can be a generator of any length.
+
+        :param values: The values to validate.
+        :param dict schema: A custom schema to validate against, as passed to
+            :meth:`get_validator`.
+        :param int processes: If not None, the values are validated in chunks
+            in a pool of this many processes.  See :mod:`doctor.parallel`.
+        :param int chunk_size: The number of values sent to a process at
+            once.
+        :returns: An iterator of tuples of each value and None if it's valid,
+            or the SchemaValidationError if it's invalid.
+        """
+        if processes is None:
+            return _validate_many(self, self.get_validator(schema), values)
+        from .parallel import map_chunks
+        return map_chunks(
+            _validate_chunk, values, processes=processes,
+            chunk_size=chunk_size, initializer=_init_validate_worker,
+            initargs=(self, schema))
+
     def validate_json(self, json_value, validator):
         """Validates and returns the parsed JSON string.
 
@@ -219,17 +759,33 @@ class Schema(object):
         Any additional args or kwargs will be passed on when constructing the
         new schema instance (useful for subclasses).
 
+        Instances created without additional args or kwargs are cached and
+        shared along with their resolver until the file changes or
+        :func:`clear_schema_cache` is called.
+
         :param str schema_filepath: Path to the schema file.
         :returns: an instance of the class.
         :raises SchemaLoadingError: for invalid input files.
         """
         schema_filepath = os.path.abspath(schema_filepath)
         try:
-            with open(schema_filepath, 'r') as schema_file:
-                schema = yaml.load(schema_file.read())
+            schema = load_schema_file(schema_filepath)
         except Exception:
             msg = 'Error loading schema file {}'.format(schema_filepath)
             logging.exception(msg)
             raise SchemaLoadingError(msg)
-        return cls(schema, *args, schema_path=os.path.dirname(schema_filepath),
-                   **kwargs)
+        schema_path = os.path.dirname(schema_filepath)
+        if args or kwargs:
+            return cls(schema, *args, schema_path=schema_path, **kwargs)
+
+        key = (cls, schema_filepath)
+        with _schema_cache_lock:
+            cached = _schema_cache.get(key)
+        # The cached instance is current if it was created from the document
+        # that is currently cached for the file.
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        instance = cls(schema, schema_path=schema_path)
+        with _schema_cache_lock:
+            _schema_cache[key] = (schema, instance)
+        return instance
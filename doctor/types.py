@@ -29,16 +29,28 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 This file is a modified version of the typingsystem.py module in apistar.
 https://github.com/encode/apistar/blob/973c6485d8297c1bcef35a42221ac5107dce25d5/apistar/typesystem.py
 """
+import collections
+import collections.abc
+import contextlib
+import keyword
 import math
 import re
+import sys
+import threading
 import typing
-from datetime import datetime
+import warnings
+import weakref
 from typing import Any
 
-import isodate
-import rfc3987
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # pragma: no cover
+    # Python < 3.11
+    import sre_constants
+    import sre_parse
 
 from doctor.errors import SchemaError, SchemaValidationError, TypeSystemError
+from doctor.formats import FORMATS
 from doctor.parsers import parse_value
 
 
@@ -73,6 +85,355 @@ class MissingDescriptionError(ValueError):
     pass
 
 
+class UnsafePatternError(ValueError):
+    """An exception raised when a type defines a pattern that is unsafe.
+
+    A pattern is considered unsafe if it contains nested quantifiers, e.g.
+    `(a+)+`, which can take exponential time to match some strings.
+    """
+    pass
+
+
+#: Regex opcodes of quantifiers that backtrack.
+_BACKTRACKING_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+
+def _has_nested_quantifiers(parsed, in_repeat: bool = False) -> bool:
+    """Checks if a parsed regex has a variable length quantifier nested inside
+    an unbounded quantifier.
+
+    This is a heuristic for patterns that are vulnerable to catastrophic
+    backtracking.  Possessive quantifiers never backtrack, so they are
+    ignored.
+
+    :param parsed: A pattern parsed by `sre_parse.parse` or a sub pattern.
+    :param in_repeat: True if `parsed` is inside an unbounded quantifier.
+    :returns: True if the pattern has nested quantifiers, otherwise False.
+    """
+    for op, av in parsed:
+        if op in _BACKTRACKING_REPEATS:
+            min_repeat, max_repeat, sub_pattern = av
+            if in_repeat and max_repeat != min_repeat:
+                return True
+            unbounded = max_repeat == sre_constants.MAXREPEAT
+            if _has_nested_quantifiers(sub_pattern, in_repeat or unbounded):
+                return True
+        elif op is sre_constants.SUBPATTERN:
+            if _has_nested_quantifiers(av[-1], in_repeat):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _has_nested_quantifiers(av[1], in_repeat):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_has_nested_quantifiers(branch, in_repeat)
+                   for branch in av[1]):
+                return True
+        elif op is sre_constants.GROUPREF_EXISTS:
+            if any(_has_nested_quantifiers(branch, in_repeat)
+                   for branch in av[1:] if branch is not None):
+                return True
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            if _has_nested_quantifiers(av, in_repeat):
+                return True
+    return False
+
+
+def compile_pattern(pattern: typing.Union[str, typing.Pattern],
+                    unsafe_action: str = 'warn',
+                    stacklevel: int = 1) -> typing.Pattern:
+    """Compiles a pattern and checks that it is safe to match.
+
+    :param pattern: The regex pattern to compile.
+    :param unsafe_action: What to do if the pattern has nested quantifiers.
+        One of `'warn'`, `'error'` or `'ignore'`.
+    :param stacklevel: The stack level of the code the warning should be
+        attributed to, relative to the caller of this function.
+    :returns: The compiled pattern.
+    :raises UnsafePatternError: If the pattern is unsafe and `unsafe_action`
+        is `'error'`.
+    """
+    compiled = re.compile(pattern)
+    if unsafe_action == 'ignore':
+        return compiled
+    parsed = sre_parse.parse(compiled.pattern, compiled.flags)
+    if _has_nested_quantifiers(parsed):
+        msg = ('Pattern /{}/ has nested quantifiers and may take exponential '
+               'time to match.'.format(compiled.pattern))
+        if unsafe_action == 'error':
+            raise UnsafePatternError(msg)
+        warnings.warn(msg, stacklevel=stacklevel + 1)
+    return compiled
+
+
+def _get_stacklevel() -> int:
+    """Returns the stack level of the first caller outside of this module.
+
+    Warnings about a type definition are attributed to the user's code that
+    created the type, whether it's a class statement or a call to one of the
+    type factory functions.
+    """
+    frame = sys._getframe(1)
+    stacklevel = 1
+    while (frame.f_back is not None and
+           frame.f_code.co_filename == __file__):
+        frame = frame.f_back
+        stacklevel += 1
+    return stacklevel
+
+
+class CheckResult(object):
+    """The result of checking a value with :meth:`SuperType.check`.
+
+    Checking a value does not raise an exception if it is invalid.  Instead
+    the result holds the error code and the error detail is only formatted
+    when it is accessed.
+
+    :param value: The validated value.
+    :param cls: The type that checked the value.
+    :param code: The error code, a key of the `errors` attribute of `cls`.
+    :param detail: The error detail if it isn't described by a code.
+    :param exception: The exception raised while checking the value, e.g.
+        by a `validate` method.
+    """
+    __slots__ = ('value', 'cls', 'code', '_detail', 'exception')
+
+    def __init__(self, value: Any = None, cls: type = None, code: str = None,
+                 detail: Any = None, exception: TypeSystemError = None):
+        self.value = value
+        self.cls = cls
+        self.code = code
+        self._detail = detail
+        self.exception = exception
+
+    def __repr__(self):
+        if self.valid:
+            return '<CheckResult value={!r}>'.format(self.value)
+        return '<CheckResult detail={!r}>'.format(self.detail)
+
+    @property
+    def valid(self) -> bool:
+        """True if the value is valid, otherwise False."""
+        return (self.code is None and self._detail is None and
+                self.exception is None)
+
+    @property
+    def detail(self) -> Any:
+        """The error detail, or None if the value is valid."""
+        if self.exception is not None:
+            return self.exception.detail
+        if self.code is not None:
+            return self.cls.errors[self.code].format(**self.cls.__dict__)
+        if isinstance(self._detail, dict):
+            return {key: getattr(value, 'detail', value)
+                    for key, value in self._detail.items()}
+        return self._detail
+
+    def to_exception(self) -> TypeSystemError:
+        """Returns the TypeSystemError describing why the value is invalid."""
+        if self.exception is not None:
+            return self.exception
+        if self.code is not None:
+            return TypeSystemError(cls=self.cls, code=self.code)
+        return TypeSystemError(self._detail, cls=self.cls)
+
+    def get_error_payload(self, path: tuple = ()) -> typing.List[dict]:
+        """Returns the errors as a machine readable list without formatting.
+
+        See :meth:`~doctor.errors.TypeSystemError.get_error_payload`.
+
+        :param path: The path of the value that was checked.
+        :returns: A list of errors, which is empty if the value is valid.
+        """
+        if self.valid:
+            return []
+        return self.to_exception().get_error_payload(path)
+
+    def raise_for_error(self):
+        """Raises the TypeSystemError if the value is invalid."""
+        if not self.valid:
+            raise self.to_exception()
+
+
+class ValidationMemo(object):
+    """A bounded cache of the results of checking values, which discards the
+    least recently used result when it's full.
+
+    :param maxsize: The maximum number of results to remember.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._results = collections.OrderedDict()  # type: typing.Dict
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self):
+        return '<ValidationMemo {}>'.format(self.info())
+
+    def get(self, key: typing.Hashable) -> typing.Optional[CheckResult]:
+        """Returns the remembered result for a key, or None."""
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key: typing.Hashable, result: CheckResult):
+        """Remembers the result for a key."""
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def info(self) -> typing.Dict[str, typing.Any]:
+        """Returns statistics about the memo.
+
+        - `hits` - Values whose result was remembered.
+        - `misses` - Values that were checked.
+        - `hit_rate` - The fraction of values whose result was remembered.
+        - `size` - The number of results that are remembered.
+        - `maxsize` - The maximum number of results to remember.
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total else 0.0,
+                'size': len(self._results),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self):
+        """Forgets all results and resets the statistics."""
+        with self._lock:
+            self._results.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+#: Thread local state for :func:`limit_errors`.
+_error_limits = threading.local()
+
+
+@contextlib.contextmanager
+def limit_errors(max_errors: typing.Optional[int]):
+    """Limits the number of errors collected by Objects and Arrays.
+
+    The limit applies to types created in the block that don't define their
+    own `max_errors` attribute.
+
+    :param max_errors: The maximum number of errors an Object or Array
+        collects before it stops validating.  `None` collects all errors.
+    """
+    previous = getattr(_error_limits, 'max_errors', None)
+    _error_limits.max_errors = max_errors
+    try:
+        yield
+    finally:
+        _error_limits.max_errors = previous
+
+
+def _get_max_errors(cls) -> typing.Optional[int]:
+    """Returns the maximum number of errors a container type collects."""
+    if cls.max_errors is not None:
+        return cls.max_errors
+    return getattr(_error_limits, 'max_errors', None)
+
+
+def _make_hashable(value: Any) -> typing.Hashable:
+    """Returns a hashable value that is equal for equal JSON values.
+
+    Mappings, e.g. dicts and records, are converted to frozensets of their
+    items and lists and tuples to tuples, so nested values can be compared in
+    linear time with a set.  Lists and tuples are tagged with their type,
+    since `[1, 2]` isn't equal to `(1, 2)`.
+
+    :param value: Any JSON value.
+    """
+    if isinstance(value, collections.abc.Mapping):
+        return frozenset((key, _make_hashable(item))
+                         for key, item in value.items())
+    if isinstance(value, list):
+        return (list, tuple(_make_hashable(item) for item in value))
+    if isinstance(value, tuple):
+        return (tuple, tuple(_make_hashable(item) for item in value))
+    return value
+
+
+def _validate(cls, value: Any) -> CheckResult:
+    """Calls the `validate` method of a type and returns the result."""
+    try:
+        cls.validate(value)
+    except TypeSystemError as e:
+        return CheckResult(exception=e)
+    return CheckResult(value)
+
+
+def _get_check(annotation) -> typing.Callable[[Any], CheckResult]:
+    """Returns a function that checks values with the given annotation.
+
+    :param annotation: A doctor type or any other callable that raises a
+        TypeSystemError for invalid values.
+    """
+    check = getattr(annotation, 'check', None)
+    if check is not None:
+        return check
+
+    def check(value):
+        try:
+            return CheckResult(annotation(value))
+        except TypeSystemError as e:
+            return CheckResult(exception=e)
+    return check
+
+
+#: The function that checks values in a :meth:`SuperType.validate_many`
+#: worker process.
+_worker_check = None  # type: typing.Callable[[Any], CheckResult]
+
+
+def _init_check_worker(cls: type):
+    """Sets up a worker process to check values with a type."""
+    global _worker_check
+    _worker_check = cls._get_many_check()
+
+
+def to_native(value: Any) -> Any:
+    """Converts instances of Object, Array and :class:`Record` in a value to
+    plain dicts and lists, e.g. to serialize them as JSON or to pickle them
+    when their type can't be pickled.
+
+    :param value: The value to convert.
+    :returns: The converted value.
+    """
+    if isinstance(value, (dict, Record)):
+        return {key: to_native(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_native(item) for item in value]
+    return value
+
+
+def _check_chunk(values: list) -> typing.List[typing.Tuple[Any, Any]]:
+    """Checks a chunk of values in a worker process.
+
+    :returns: A list of tuples of the validated value and None, or None and
+        the TypeSystemError for invalid values.
+    """
+    results = []
+    for value in values:
+        result = _worker_check(value)
+        if result.valid:
+            results.append((to_native(result.value), None))
+        else:
+            results.append((None, result.to_exception()))
+    return results
+
+
 class SuperType(object):
     """A super type all custom types must extend from.
 
@@ -98,6 +459,17 @@ class SuperType(object):
     #: parsed value.
     parser = None  # type: typing.Callable
 
+    #: True if `_check` does the same validation as creating an instance of
+    #: the type.  It's set to False for subclasses that override `__new__` or
+    #: `__init__`, so `check` calls the type instead.
+    _native_check = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if (('__new__' in cls.__dict__ or '__init__' in cls.__dict__) and
+                '_native_check' not in cls.__dict__):
+            cls._native_check = False
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.description is None:
@@ -105,6 +477,63 @@ class SuperType(object):
             raise MissingDescriptionError(
                 '{} did not define a description attribute'.format(cls))
 
+    @classmethod
+    def check(cls, value: Any) -> CheckResult:
+        """Checks a value without raising an exception if it's invalid.
+
+        This does the same validation as creating an instance of the type,
+        but returns a :class:`~doctor.types.CheckResult` instead of raising
+        a :class:`~doctor.errors.TypeSystemError`.
+
+        :param value: The value to check.
+        :returns: The result of the check.
+        """
+        if cls._native_check:
+            return cls._check(value)
+        try:
+            return CheckResult(cls(value))
+        except TypeSystemError as e:
+            return CheckResult(exception=e)
+
+    @classmethod
+    def _get_many_check(cls) -> typing.Callable[[Any], CheckResult]:
+        """Returns a function that checks values for :meth:`validate_many`.
+
+        Subclasses can override this to do any setup that doesn't depend on
+        the value once instead of for every value.
+        """
+        if cls._native_check:
+            return cls._check
+        return cls.check
+
+    @classmethod
+    def validate_many(cls, values: typing.Iterable, processes: int = None,
+                      chunk_size: int = 1000) -> typing.Iterator[CheckResult]:
+        """Checks many values, yielding a result for each in order.
+
+        This does the same validation as :meth:`check`, but any setup that
+        doesn't depend on the value is only done once.  Results are yielded
+        as values are read from the iterable, so it can be a generator of any
+        length.
+
+        :param values: The values to check.
+        :param processes: If not None, the values are checked in chunks in
+            a pool of this many processes.  Validated values are returned as
+            plain dicts and lists.  See :mod:`doctor.parallel`.
+        :param chunk_size: The number of values sent to a process at once.
+        :returns: An iterator of a :class:`~doctor.types.CheckResult` for
+            each value.
+        """
+        if processes is None:
+            return map(cls._get_many_check(), values)
+        from doctor.parallel import map_chunks
+        results = map_chunks(
+            _check_chunk, values, processes=processes, chunk_size=chunk_size,
+            initializer=_init_check_worker, initargs=(cls,))
+        return (CheckResult(value) if error is None
+                else CheckResult(exception=error)
+                for value, error in results)
+
     @classmethod
     def validate(cls, value: typing.Any):
         """Additional validation for a type.
@@ -128,34 +557,36 @@ class UnionType(SuperType):
     types = []
 
     _native_type = None
+    _native_check = True
 
-    def __new__(cls, *args, **kwargs):
+    def __new__(cls, value):
+        result = cls._check(value)
+        result.raise_for_error()
+        return result.value
+
+    @classmethod
+    def _check(cls, value: Any) -> CheckResult:
         if not cls.types:
-            raise TypeSystemError(
-                'Sub-class must define a `types` list attribute containing at '
-                'least 1 type.', cls=cls)
+            return CheckResult(
+                cls=cls, detail='Sub-class must define a `types` list '
+                                'attribute containing at least 1 type.')
 
-        valid = False
-        value = None
-        errors = {}
+        failed = []
         for obj_class in cls.types:
-            try:
-                value = obj_class(*args, **kwargs)
-                valid = True
+            result = _get_check(obj_class)(value)
+            if result.valid:
                 # Dynamically change the native_type based on that of the value.
                 cls._native_type = obj_class.native_type
                 break
-            except TypeSystemError as e:
-                errors[obj_class.__name__] = str(e)
-                continue
-
-        if not valid:
+            failed.append((obj_class, result))
+        else:
             klasses = [klass.__name__ for klass in cls.types]
-            raise TypeSystemError('Value is not one of {}. {}'.format(
+            errors = {obj_class.__name__: str(result.to_exception())
+                      for obj_class, result in failed}
+            return CheckResult(detail='Value is not one of {}. {}'.format(
                 klasses, errors))
 
-        cls.validate(value)
-        return value
+        return _validate(cls, result.value)
 
     @classmethod
     def get_example(cls):
@@ -194,32 +625,182 @@ class UnionType(SuperType):
         return cls.types[0].native_type
 
 
-class String(SuperType, str):
+#: The memos of types that set `memoize`.  Subclasses don't share the memo of
+#: their parent class, since they may validate values differently.
+_memos = weakref.WeakKeyDictionary()  # type: typing.MutableMapping
+_memos_lock = threading.Lock()
+
+
+def _get_memoizable_result(result: CheckResult) -> typing.Optional[
+        CheckResult]:
+    """Returns a result that can be remembered and shared between checks.
+
+    Results with an exception raised by a `validate` method only keep the
+    error's type, code and detail, so a new exception is created each time
+    the result is raised instead of re-raising one shared instance.
+
+    :returns: The result, or None if it can't be remembered.
+    """
+    e = result.exception
+    if e is None:
+        return result
+    if (type(e) is not TypeSystemError or e.errors or
+            (e.code is None and e.detail is None)):
+        return None
+    if e.code is not None:
+        return CheckResult(cls=e.cls, code=e.code)
+    return CheckResult(cls=e.cls, detail=e.detail)
+
+
+class _ScalarType(SuperType):
+    """Base class for types of immutable values, whose results can be
+    remembered.
+    """
+    #: The number of values whose results are remembered by the type.  When
+    #: a value is checked again, e.g. an ID that is repeated in a payload,
+    #: its result is returned without validating it again.  Results are
+    #: keyed by the value and its type.  `0` doesn't remember any results.
+    #:
+    #: Only enable this for types whose `validate` method always returns the
+    #: same result for the same value.  Call :meth:`clear_memo` after changing
+    #: any other attribute of the type.
+    memoize = 0  # type: int
+
+    @classmethod
+    def check(cls, value: Any) -> CheckResult:
+        if cls._native_check:
+            return cls._memo_check(value)
+        return super().check(value)
+
+    @classmethod
+    def _get_many_check(cls) -> typing.Callable[[Any], CheckResult]:
+        if cls._native_check and cls._get_memo() is not None:
+            return cls._memo_check
+        return super()._get_many_check()
+
+    @classmethod
+    def _get_memo(cls) -> typing.Optional[ValidationMemo]:
+        """Returns the memo of the type, or None if `memoize` is 0."""
+        if not cls.memoize:
+            return None
+        memo = _memos.get(cls)
+        if memo is None or memo.maxsize != cls.memoize:
+            with _memos_lock:
+                memo = _memos.get(cls)
+                if memo is None or memo.maxsize != cls.memoize:
+                    memo = _memos[cls] = ValidationMemo(cls.memoize)
+        return memo
+
+    @classmethod
+    def _memo_check(cls, value: Any) -> CheckResult:
+        """Checks a value, returning the remembered result if it has been
+        checked before and `memoize` is set.
+        """
+        memo = cls._get_memo()
+        if memo is None:
+            return cls._check(value)
+        # Include the type, since e.g. `1`, `1.0` and `True` are equal.
+        key = (value.__class__, value)
+        try:
+            result = memo.get(key)
+        except TypeError:
+            # Unhashable values can't be remembered.
+            return cls._check(value)
+        if result is None:
+            result = cls._check(value)
+            memoized = _get_memoizable_result(result)
+            if memoized is not None:
+                memo.put(key, memoized)
+                result = memoized
+        return result
+
+    @classmethod
+    def memo_info(cls) -> typing.Dict[str, typing.Any]:
+        """Returns statistics about the results remembered by the type.
+
+        :returns: The :meth:`~doctor.types.ValidationMemo.info` of the type's
+            memo, which is empty if `memoize` is 0.
+        """
+        memo = cls._get_memo()
+        if memo is None:
+            return {}
+        return memo.info()
+
+    @classmethod
+    def clear_memo(cls):
+        """Forgets the results remembered by the type."""
+        memo = _memos.get(cls)
+        if memo is not None:
+            memo.clear()
+
+
+class String(_ScalarType, str):
     """Represents a `str` type."""
     native_type = str
     errors = {
         'blank': 'Must not be blank.',
         'max_length': 'Must have no more than {max_length} characters.',
         'min_length': 'Must have at least {min_length} characters.',
-        'pattern': 'Must match the pattern /{pattern}/.',
+        # The compiled pattern's source, since `pattern` may be compiled.
+        'pattern': 'Must match the pattern /{_pattern_re.pattern}/.',
+        'pattern_max_length': ('Must have no more than {pattern_max_length} '
+                               'characters to match the pattern.'),
     }
     #: Will check format of the string for `date`, `date-time`, `email`,
-    #: `time` and `uri`.
+    #: `hostname`, `ipv4`, `ipv6`, `time`, `uri`, `uri-reference`, `uuid` or
+    #: any format added with :func:`~doctor.formats.register_format`.
     format = None
     #: The maximum length of the string.
     max_length = None  # type: int
     #: The minimum length of the string.
     min_length = None  # type: int
-    #: A regex pattern that the string should match.
-    pattern = None  # type: str
+    #: A regex pattern, or a compiled pattern, that the string should match.
+    #: It is compiled once when the type is created.
+    pattern = None  # type: typing.Union[str, typing.Pattern]
+    #: The maximum length of a string that will be matched against `pattern`.
+    #: Longer strings are rejected without running the regex.
+    pattern_max_length = None  # type: int
+    #: What to do if `pattern` has nested quantifiers (e.g. `(a+)+`), which
+    #: can cause catastrophic backtracking.  `'warn'` issues a warning when
+    #: the type is created, `'error'` raises an
+    #: :class:`~doctor.types.UnsafePatternError` and `'ignore'` does nothing.
+    unsafe_pattern = 'warn'
     #: Whether to trim whitespace on a string.  Defaults to `True`.
     trim_whitespace = True
 
+    _pattern_re = None  # type: typing.Pattern
+    #: The `pattern` that `_pattern_re` was compiled from.
+    _pattern_source = None  # type: typing.Union[str, typing.Pattern]
+    _native_check = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.pattern is not None:
+            cls._compile_pattern()
+
+    @classmethod
+    def _compile_pattern(cls) -> typing.Pattern:
+        """Compiles `pattern` and caches it on the class."""
+        cls._pattern_re = compile_pattern(
+            cls.pattern, cls.unsafe_pattern, stacklevel=_get_stacklevel())
+        cls._pattern_source = cls.pattern
+        return cls._pattern_re
+
     def __new__(cls, *args, **kwargs):
         if cls.nullable and args[0] is None:
             return None
 
-        value = super().__new__(cls, *args, **kwargs)
+        result = cls._memo_check(str(*args, **kwargs))
+        result.raise_for_error()
+        return result.value
+
+    @classmethod
+    def _check(cls, value: Any) -> CheckResult:
+        if cls.nullable and value is None:
+            return CheckResult(None)
+
+        # Coerce value to the native str type.
+        value = str(value)
 
         if cls.trim_whitespace:
             value = value.strip()
@@ -227,51 +808,35 @@ class String(SuperType, str):
         if cls.min_length is not None:
             if len(value) < cls.min_length:
                 if cls.min_length == 1:
-                    raise TypeSystemError(cls=cls, code='blank')
+                    return CheckResult(cls=cls, code='blank')
                 else:
-                    raise TypeSystemError(cls=cls, code='min_length')
+                    return CheckResult(cls=cls, code='min_length')
 
         if cls.max_length is not None:
             if len(value) > cls.max_length:
-                raise TypeSystemError(cls=cls, code='max_length')
+                return CheckResult(cls=cls, code='max_length')
 
         if cls.pattern is not None:
-            if not re.search(cls.pattern, value):
-                raise TypeSystemError(cls=cls, code='pattern')
+            if (cls.pattern_max_length is not None and
+                    len(value) > cls.pattern_max_length):
+                return CheckResult(cls=cls, code='pattern_max_length')
+            pattern_re = cls._pattern_re
+            # The pattern may have been changed after the class was created.
+            if pattern_re is None or cls._pattern_source is not cls.pattern:
+                pattern_re = cls._compile_pattern()
+            if not pattern_re.search(value):
+                return CheckResult(cls=cls, code='pattern')
 
         # Validate format, if specified
-        if cls.format == 'date':
-            try:
-                value = datetime.strptime(value, "%Y-%m-%d").date()
-            except ValueError as e:
-                raise TypeSystemError(str(e), cls=cls)
-        elif cls.format == 'date-time':
-            try:
-                value = isodate.parse_datetime(value)
-            except (ValueError, isodate.ISO8601Error) as e:
-                raise TypeSystemError(str(e), cls=cls)
-        elif cls.format == 'email':
-            if '@' not in value:
-                raise TypeSystemError('Not a valid email address.', cls=cls)
-        elif cls.format == 'time':
-            try:
-                value = datetime.strptime(value, "%H:%M:%S")
-            except ValueError as e:
-                raise TypeSystemError(str(e), cls=cls)
-        elif cls.format == 'uri':
-            try:
-                rfc3987.parse(value, rule='URI')
-            except ValueError as e:
-                raise TypeSystemError(str(e), cls=cls)
-
-        # Coerce value to the native str type.  We only do this if the value
-        # is an instance of the class.  It could be a datetime instance or
-        # a str already if `trim_whitespace` is True.
-        if isinstance(value, cls):
-            value = cls.native_type(value)
+        if cls.format is not None:
+            format_func = FORMATS.get(cls.format)
+            if format_func is not None:
+                try:
+                    value = format_func(value)
+                except ValueError as e:
+                    return CheckResult(cls=cls, detail=str(e))
 
-        cls.validate(value)
-        return value
+        return _validate(cls, value)
 
     @classmethod
     def get_example(cls) -> str:
@@ -281,7 +846,7 @@ class String(SuperType, str):
         return 'string'
 
 
-class _NumericType(SuperType):
+class _NumericType(_ScalarType):
     """
     Base class for both `Number` and `Integer`.
     """
@@ -306,33 +871,50 @@ class _NumericType(SuperType):
     #: The value is required to be a multiple of this value.
     multiple_of = None  # type: typing.Union[float, int]
 
+    _native_check = True
+
     def __new__(cls, *args, **kwargs):
         if cls.nullable and args[0] is None:
             return None
 
         try:
-            value = cls.native_type.__new__(cls, *args, **kwargs)
+            value = cls.native_type(*args, **kwargs)
         except (TypeError, ValueError):
             raise TypeSystemError(cls=cls, code='type') from None
 
+        result = cls._memo_check(value)
+        result.raise_for_error()
+        return result.value
+
+    @classmethod
+    def _check(cls, value: Any) -> CheckResult:
+        if cls.nullable and value is None:
+            return CheckResult(None)
+
+        # Coerce value to the native type.
+        try:
+            value = cls.native_type(value)
+        except (TypeError, ValueError):
+            return CheckResult(cls=cls, code='type')
+
         if not math.isfinite(value):
-            raise TypeSystemError(cls=cls, code='finite')
+            return CheckResult(cls=cls, code='finite')
 
         if cls.minimum is not None:
             if cls.exclusive_minimum:
                 if value <= cls.minimum:
-                    raise TypeSystemError(cls=cls, code='exclusive_minimum')
+                    return CheckResult(cls=cls, code='exclusive_minimum')
             else:
                 if value < cls.minimum:
-                    raise TypeSystemError(cls=cls, code='minimum')
+                    return CheckResult(cls=cls, code='minimum')
 
         if cls.maximum is not None:
             if cls.exclusive_maximum:
                 if value >= cls.maximum:
-                    raise TypeSystemError(cls=cls, code='exclusive_maximum')
+                    return CheckResult(cls=cls, code='exclusive_maximum')
             else:
                 if value > cls.maximum:
-                    raise TypeSystemError(cls=cls, code='maximum')
+                    return CheckResult(cls=cls, code='maximum')
 
         if cls.multiple_of is not None:
             if isinstance(cls.multiple_of, float):
@@ -340,15 +922,9 @@ class _NumericType(SuperType):
             else:
                 failed = value % cls.multiple_of
             if failed:
-                raise TypeSystemError(cls=cls, code='multiple_of')
+                return CheckResult(cls=cls, code='multiple_of')
 
-        # Coerce value to the native type.  We only do this if the value
-        # is an instance of the class.
-        if isinstance(value, cls):
-            value = cls.native_type(value)
-
-        cls.validate(value)
-        return value
+        return _validate(cls, value)
 
 
 class Number(_NumericType, float):
@@ -375,36 +951,47 @@ class Integer(_NumericType, int):
         return 1
 
 
-class Boolean(SuperType):
+class Boolean(_ScalarType):
     """Represents a `bool` type."""
     native_type = bool
     errors = {
         'type': 'Must be a valid boolean.'
     }
 
+    _native_check = True
+
+    #: Strings that are accepted as booleans, e.g. from a query string.
+    _STRING_VALUES = {
+        'true': True,
+        'false': False,
+        'on': True,
+        'off': False,
+        '1': True,
+        '0': False,
+        '': False
+    }
+
     def __new__(cls, *args, **kwargs) -> bool:
-        value = args[0]
+        result = cls._memo_check(args[0])
+        result.raise_for_error()
+        return result.value
+
+    @classmethod
+    def _check(cls, value: Any) -> CheckResult:
         if cls.nullable and value is None:
-            return None
+            return CheckResult(None)
 
-        if args and isinstance(value, str):
+        if isinstance(value, str):
             try:
-                value = {
-                    'true': True,
-                    'false': False,
-                    'on': True,
-                    'off': False,
-                    '1': True,
-                    '0': False,
-                    '': False
-                }[value.lower()]
+                value = cls._STRING_VALUES[value.lower()]
             except KeyError:
-                raise TypeSystemError(cls=cls, code='type') from None
-            cls.validate(value)
-            return value
+                return CheckResult(cls=cls, code='type')
+            return _validate(cls, value)
 
-        cls.validate(value)
-        return bool(*args, **kwargs)
+        result = _validate(cls, value)
+        if result.valid:
+            result.value = bool(value)
+        return result
 
     @classmethod
     def get_example(cls) -> bool:
@@ -414,7 +1001,7 @@ class Boolean(SuperType):
         return True
 
 
-class Enum(SuperType, str):
+class Enum(_ScalarType, str):
     """
     Represents a `str` type that must be one of any defined allowed values.
     """
@@ -434,9 +1021,21 @@ class Enum(SuperType, str):
     #: If True the input value will be uppercased before validation.
     uppercase_value = False
 
+    #: If True valid values are interned with :func:`sys.intern`, so every
+    #: validated value shares one copy of each string in `enum`.
+    intern_values = False
+
+    _native_check = True
+
     def __new__(cls, value: typing.Union[None, str]):
+        result = cls._memo_check(value)
+        result.raise_for_error()
+        return result.value
+
+    @classmethod
+    def _check(cls, value: Any) -> CheckResult:
         if cls.nullable and value is None:
-            return None
+            return CheckResult(None)
 
         if cls.case_insensitive:
             if cls.uppercase_value:
@@ -449,10 +1048,11 @@ class Enum(SuperType, str):
         if cls.uppercase_value:
             value = value.upper()
         if value not in cls.enum:
-            raise TypeSystemError(cls=cls, code='invalid')
+            return CheckResult(cls=cls, code='invalid')
 
-        cls.validate(value)
-        return value
+        if cls.intern_values and type(value) is str:
+            value = sys.intern(value)
+        return _validate(cls, value)
 
     @classmethod
     def get_example(cls) -> str:
@@ -462,6 +1062,93 @@ class Enum(SuperType, str):
         return cls.enum[0]
 
 
+class Record(collections.abc.Mapping):
+    """A compact, read only representation of a validated Object.
+
+    Objects with `record` set are validated into instances of a subclass of
+    this class, created by :meth:`Object.get_record_class`, that stores each
+    property in a slot instead of a dict.  Properties can be read as
+    attributes if their name is a valid identifier, or as items like a dict.
+    Properties that weren't in the validated value aren't set.
+
+    Setting or deleting attributes raises an AttributeError.
+
+    :param values: A mapping of property names to values.
+    :raises KeyError: If a key isn't a property of the record.
+    """
+    __slots__ = ()
+
+    #: The names of the properties.
+    _fields = ()  # type: typing.Tuple[str, ...]
+    #: The slot of each property, keyed by property name.
+    _slots = {}  # type: typing.Dict[str, typing.Any]
+    #: The Object type the record class was created for.
+    _object_type = None  # type: type
+
+    def __init__(self, values: typing.Mapping[str, Any] = None):
+        if values:
+            slots = self._slots
+            for key, value in values.items():
+                slots[key].__set__(self, value)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._slots[key].__get__(self)
+        except (KeyError, AttributeError):
+            raise KeyError(key) from None
+
+    def __iter__(self) -> typing.Iterator[str]:
+        for key, slot in self._slots.items():
+            try:
+                slot.__get__(self)
+            except AttributeError:
+                continue
+            yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError('{!r} object is read only'.format(
+            self.__class__.__name__))
+
+    def __delattr__(self, name: str):
+        raise AttributeError('{!r} object is read only'.format(
+            self.__class__.__name__))
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, dict(self.items()))
+
+    def __reduce__(self):
+        # Record classes are created dynamically and can't be pickled, so
+        # pickle a dict instead.
+        return (dict, (dict(self.items()),))
+
+
+def _create_record_class(cls: type) -> typing.Type[Record]:
+    """Creates the record class of an Object type."""
+    fields = tuple(cls.properties)
+    # Property names may not be valid identifiers, so the slots are named
+    # after their position.
+    slot_names = tuple('_{}'.format(i) for i in range(len(fields)))
+    record_class = type('{}Record'.format(cls.__name__), (Record,), {
+        '__slots__': slot_names,
+        '__module__': cls.__module__,
+        '_fields': fields,
+        '_object_type': cls,
+    })
+    slots = {field: getattr(record_class, slot_name)
+             for field, slot_name in zip(fields, slot_names)}
+    record_class._slots = slots
+    # Allow reading properties as attributes.
+    for field, slot in slots.items():
+        if (field.isidentifier() and not keyword.iskeyword(field) and
+                not field.startswith('_') and
+                not hasattr(record_class, field)):
+            setattr(record_class, field, slot)
+    return record_class
+
+
 class Object(SuperType, dict):
     """Represents a `dict` type."""
     native_type = dict
@@ -482,6 +1169,36 @@ class Object(SuperType, dict):
     #: A mapping of property name to a list of other properties it requires
     #: when the property name is present.
     property_dependencies = {}  # type: typing.Dict[str, typing.List[str]]
+    #: The maximum number of property errors to collect before validation
+    #: stops.  `1` stops at the first error and `None` collects all errors.
+    max_errors = None  # type: typing.Optional[int]
+    #: If True the keys of properties defined in `properties` are interned
+    #: with :func:`sys.intern`, so every validated object shares one copy of
+    #: each property name.  Other keys aren't interned, so clients can't add
+    #: arbitrary strings to the interned strings.
+    intern_keys = False  # type: bool
+    #: If True valid values are returned as instances of a compact
+    #: :class:`~doctor.types.Record` class, which stores each property in a
+    #: slot instead of a dict.  This can only be set if
+    #: `additional_properties` is False.
+    record = False  # type: bool
+
+    _native_check = True
+    _record_class = None  # type: typing.Type[Record]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.record and cls.additional_properties:
+            raise TypeError('{} can only set record if additional_properties '
+                            'is False.'.format(cls.__name__))
+
+    def __new__(cls, *args, **kwargs):
+        if cls.record and len(args) == 1 and not kwargs:
+            # Return a record instead of an instance of the class.
+            result = cls._check(args[0])
+            result.raise_for_error()
+            return result.value
+        return super().__new__(cls)
 
     def __init__(self, *args, **kwargs):
         if self.nullable and args[0] is None:
@@ -492,73 +1209,119 @@ class Object(SuperType, dict):
         except MissingDescriptionError:
             raise
         except (ValueError, TypeError):
-            if (len(args) == 1 and not kwargs and
+            if not (len(args) == 1 and not kwargs and
                     hasattr(args[0], '__dict__')):
-                value = dict(args[0].__dict__)
-            else:
                 raise TypeSystemError(
                     cls=self.__class__, code='type') from None
-        value = self
 
+        self._check_properties(self).raise_for_error()
+
+    @classmethod
+    def _check(cls, value: Any) -> CheckResult:
+        obj = dict.__new__(cls)
+        if cls.nullable and value is None:
+            return CheckResult(obj)
+
+        if cls.description is None:
+            raise MissingDescriptionError(
+                '{} did not define a description attribute'.format(cls))
+
+        try:
+            dict.__init__(obj, value)
+        except (ValueError, TypeError):
+            if not hasattr(value, '__dict__'):
+                return CheckResult(cls=cls, code='type')
+
+        result = cls._check_properties(obj)
+        if cls.record and result.valid:
+            result.value = cls.get_record_class()(result.value)
+        return result
+
+    @classmethod
+    def get_record_class(cls) -> typing.Type[Record]:
+        """Returns the record class valid values are returned as when
+        `record` is set.
+
+        The class is created the first time it's needed.
+        """
+        record_class = cls._record_class
+        # Types created with new_type copy the record class of their parent.
+        if record_class is None or record_class._object_type is not cls:
+            record_class = _create_record_class(cls)
+            cls._record_class = record_class
+        return record_class
+
+    @classmethod
+    def _check_properties(cls, obj: 'Object') -> CheckResult:
+        """Validates and coerces the properties of an object in place.
+
+        :param obj: An instance of the class populated with the input value.
+        :returns: The result of the check.
+        """
         # Ensure all property keys are strings.
         errors = {}
-        if any(not isinstance(key, str) for key in value.keys()):
-            raise TypeSystemError(cls=self.__class__, code='invalid_key')
+        if any(not isinstance(key, str) for key in obj.keys()):
+            return CheckResult(cls=cls, code='invalid_key')
+
+        if cls.intern_keys:
+            # Assigning to an existing key keeps the original key, so the
+            # object is rebuilt to keep the order of its keys.
+            properties = cls.properties
+            items = [(sys.intern(key) if key in properties and
+                      type(key) is str else key, value)
+                     for key, value in obj.items()]
+            dict.clear(obj)
+            dict.update(obj, items)
+
+        max_errors = _get_max_errors(cls)
 
         # Properties
-        for key, child_schema in self.properties.items():
+        for key, child_schema in cls.properties.items():
+            if max_errors is not None and len(errors) >= max_errors:
+                break
             try:
-                item = value[key]
+                item = obj[key]
             except KeyError:
                 if hasattr(child_schema, 'default'):
                     # If a key is missing but has a default, then use that.
-                    self[key] = child_schema.default
-                elif key in self.required:
-                    exc = TypeSystemError(cls=self.__class__, code='required')
-                    errors[key] = exc.detail
+                    obj[key] = child_schema.default
+                elif key in cls.required:
+                    errors[key] = CheckResult(cls=cls, code='required')
             else:
                 # Coerce value into the given schema type if needed.
-                if isinstance(item, child_schema):
-                    self[key] = item
-                else:
-                    try:
-                        self[key] = child_schema(item)
-                    except TypeSystemError as exc:
-                        errors[key] = exc.detail
-
-        # If additional properties are allowed set any other key/value(s) not
-        # in the defined properties.
-        if self.additional_properties:
-            for key, value in value.items():
-                if key not in self:
-                    self[key] = value
-
-        # Raise an exception if additional properties are defined and
-        # not allowed.
-        if not self.additional_properties:
-            properties = list(self.properties.keys())
-            for key in self.keys():
-                if key not in properties:
-                    detail = '{key} not in {properties}'.format(
-                        key=key, properties=properties)
-                    exc = TypeSystemError(detail, cls=self.__class__,
-                                          code='additional_properties')
-                    errors[key] = exc.detail
+                if not isinstance(item, child_schema):
+                    result = _get_check(child_schema)(item)
+                    if result.valid:
+                        obj[key] = result.value
+                    else:
+                        errors[key] = result
+
+        # Add an error for any additional properties if they are not allowed.
+        if not cls.additional_properties:
+            for key in obj.keys():
+                if max_errors is not None and len(errors) >= max_errors:
+                    break
+                if key not in cls.properties:
+                    errors[key] = CheckResult(
+                        cls=cls, code='additional_properties')
 
         # Check for any property dependencies that are defined.
-        if self.property_dependencies:
+        if cls.property_dependencies:
             err = 'Required properties {} for property `{}` are missing.'
-            for prop, dependencies in self.property_dependencies.items():
-                if prop in self:
+            for prop, dependencies in cls.property_dependencies.items():
+                if prop in obj:
                     for dep in dependencies:
-                        if dep not in self:
-                            raise TypeSystemError(err.format(
+                        if dep not in obj:
+                            return CheckResult(detail=err.format(
                                 dependencies, prop))
 
         if errors:
-            raise TypeSystemError(errors)
+            return CheckResult(detail=errors)
 
-        self.validate(self.copy())
+        result = _validate(cls, obj.copy())
+        if result.valid:
+            result.value = obj
+        return result
 
     @classmethod
     def get_example(cls) -> dict:
@@ -580,6 +1343,7 @@ class Array(SuperType, list):
         'min_items': 'Not enough items.',
         'max_items': 'Too many items.',
         'unique_items': 'This item is not unique.',
+        'unique_key': 'Could not get the unique key of this item.',
     }
     #: The type each item should be, or a list of types where the position
     #: of the type in the list represents the type at that position in the
@@ -594,6 +1358,16 @@ class Array(SuperType, list):
     max_items = None  # type: typing.Optional[int]
     #: If `True` items in the array should be unique from one another.
     unique_items = False  # type: bool
+    #: An optional function that returns the value of an item to compare when
+    #: checking `unique_items`, e.g. `operator.itemgetter('id')`.  It's called
+    #: with each valid item.  If it raises a KeyError, TypeError or
+    #: AttributeError the item is invalid.
+    unique_key = None  # type: typing.Callable[[typing.Any], typing.Any]
+    #: The maximum number of item errors to collect before validation stops.
+    #: `1` stops at the first error and `None` collects all errors.
+    max_errors = None  # type: typing.Optional[int]
+
+    _native_check = True
 
     def __init__(self, *args, **kwargs):
         if self.nullable and args[0] is None:
@@ -607,45 +1381,94 @@ class Array(SuperType, list):
         except TypeError:
             raise TypeSystemError(cls=self.__class__, code='type') from None
 
-        if isinstance(self.items, list) and len(self.items) > 1:
-            if len(value) < len(self.items):
-                raise TypeSystemError(cls=self.__class__, code='min_items')
-            elif len(value) > len(self.items) and not self.additional_items:
-                raise TypeSystemError(cls=self.__class__, code='max_items')
+        self._check_items(self, value).raise_for_error()
+
+    @classmethod
+    def _check(cls, value: Any) -> CheckResult:
+        arr = cls.__new__(cls)
+        if cls.nullable and value is None:
+            return CheckResult(arr)
+
+        if isinstance(value, (str, bytes)):
+            return CheckResult(cls=cls, code='type')
 
-        if len(value) < self.min_items:
-            raise TypeSystemError(cls=self.__class__, code='min_items')
-        elif self.max_items is not None and len(value) > self.max_items:
-            raise TypeSystemError(cls=self.__class__, code='max_items')
+        try:
+            value = list(value)
+        except TypeError:
+            return CheckResult(cls=cls, code='type')
+
+        return cls._check_items(arr, value)
+
+    @classmethod
+    def _check_items(cls, arr: 'Array', value: list) -> CheckResult:
+        """Validates and coerces the items of a list, appending them to `arr`.
+
+        :param arr: An empty instance of the class.
+        :param value: The list of items to validate.
+        :returns: The result of the check.
+        """
+        if isinstance(cls.items, list) and len(cls.items) > 1:
+            if len(value) < len(cls.items):
+                return CheckResult(cls=cls, code='min_items')
+            elif len(value) > len(cls.items) and not cls.additional_items:
+                return CheckResult(cls=cls, code='max_items')
+
+        if len(value) < cls.min_items:
+            return CheckResult(cls=cls, code='min_items')
+        elif cls.max_items is not None and len(value) > cls.max_items:
+            return CheckResult(cls=cls, code='max_items')
 
         # Ensure all items are of the right type.
         errors = {}
-        if self.unique_items:
+        max_errors = _get_max_errors(cls)
+        if cls.unique_items:
             seen_items = set()
 
+        if isinstance(cls.items, list):
+            checks = [_get_check(item_type) for item_type in cls.items]
+        elif cls.items is not None:
+            check = _get_check(cls.items)
+
         for pos, item in enumerate(value):
-            try:
-                if isinstance(self.items, list):
-                    if pos < len(self.items):
-                        item = self.items[pos](item)
-                elif self.items is not None:
-                    item = self.items(item)
-
-                if self.unique_items:
-                    if item in seen_items:
-                        raise TypeSystemError(
-                            cls=self.__class__, code='unique_items')
-                    else:
-                        seen_items.add(item)
+            if max_errors is not None and len(errors) >= max_errors:
+                break
+            if isinstance(cls.items, list):
+                result = checks[pos](item) if pos < len(checks) else None
+            elif cls.items is not None:
+                result = check(item)
+            else:
+                result = None
+
+            if result is not None:
+                if not result.valid:
+                    errors[pos] = result
+                    continue
+                item = result.value
 
-                self.append(item)
-            except TypeSystemError as exc:
-                errors[pos] = exc.detail
+            if cls.unique_items:
+                if cls.unique_key is None:
+                    key = item
+                else:
+                    try:
+                        key = cls.unique_key(item)
+                    except (KeyError, TypeError, AttributeError):
+                        errors[pos] = CheckResult(cls=cls, code='unique_key')
+                        continue
+                key = _make_hashable(key)
+                if key in seen_items:
+                    errors[pos] = CheckResult(cls=cls, code='unique_items')
+                    continue
+                seen_items.add(key)
+
+            arr.append(item)
 
         if errors:
-            raise TypeSystemError(errors)
+            return CheckResult(detail=errors)
 
-        self.validate(value)
+        result = _validate(cls, value)
+        if result.valid:
+            result.value = arr
+        return result
 
     @classmethod
     def get_example(cls) -> list:
@@ -681,25 +1504,45 @@ class JsonSchema(SuperType):
     #: The key from the definitions in the schema file that the type should
     #: come from.
     definition_key = None  # type: str
+    #: The schema or definition with all references inlined, or None if it
+    #: couldn't be bundled, e.g. because it's recursive.
+    bundled_schema = None  # type: dict
 
     def __new__(cls, value):
+        super().__new__(cls)
+        return cls._validate_value(value, cls._get_validator())
+
+    @classmethod
+    def _get_validator(cls):
+        """Returns the validator used to validate values of the type."""
+        request_schema = None
+        if cls.bundled_schema is not None:
+            # Validate against the bundled schema, so no references need to
+            # be resolved.
+            request_schema = cls.bundled_schema
+        elif cls.definition_key is not None:
+            params = [cls.definition_key]
+            request_schema = cls.schema._create_request_schema(params, params)
+        return cls.schema.get_validator(request_schema)
+
+    @classmethod
+    def _validate_value(cls, value: Any, validator) -> Any:
+        """Validates a value with a validator from `_get_validator`.
+
+        :returns: The value, parsed if it came from a query string.
+        :raises TypeSystemError: If the value is invalid.
+        """
         # Attempt to parse the value if it came from a query string
         try:
             _, value = parse_value(value, [cls.json_type])
         except ValueError:
             pass
-        request_schema = None
-        if cls.definition_key is not None:
-            params = [cls.definition_key]
-            request_schema = cls.schema._create_request_schema(params, params)
+        data = value
+        if cls.bundled_schema is None and cls.definition_key is not None:
             data = {cls.definition_key: value}
-        else:
-            data = value
 
-        super().__new__(cls)
         # Validate the data against the schema and raise an error if it
         # does not validate.
-        validator = cls.schema.get_validator(request_schema)
         try:
             cls.schema.validate(data, validator)
         except SchemaValidationError as e:
@@ -707,6 +1550,19 @@ class JsonSchema(SuperType):
 
         return value
 
+    @classmethod
+    def _get_many_check(cls) -> typing.Callable[[Any], CheckResult]:
+        if cls.__new__ is not JsonSchema.__new__:
+            return super()._get_many_check()
+        validator = cls._get_validator()
+
+        def check(value):
+            try:
+                return CheckResult(cls._validate_value(value, validator))
+            except TypeSystemError as e:
+                return CheckResult(exception=e)
+        return check
+
     @classmethod
     def get_example(cls) -> typing.Any:
         """Returns an example value for the JsonSchema type."""
@@ -809,6 +1665,14 @@ def json_schema_type(schema_file: str, **kwargs) -> typing.Type:
 
     # Look up the description, example and type in the schema.
     definition_key = kwargs.get('definition_key')
+    try:
+        kwargs['bundled_schema'] = schema.bundle(
+            '#/definitions/{}'.format(definition_key)
+            if definition_key else None)
+    except SchemaError:
+        # The schema is recursive or has invalid references, so references
+        # are resolved when values are validated.
+        pass
     if definition_key:
         params = [definition_key]
         request_schema = schema._create_request_schema(params, params)
@@ -9,11 +9,6 @@ from copy import copy
 from inspect import Parameter, Signature
 from typing import Callable, List
 
-try:
-    from sphinx.util.docstrings import prepare_docstring
-except ImportError:
-    prepare_docstring = None
-
 from doctor.types import SuperType
 
 #: Used to identify the end of the description block, and the beginning of the
@@ -222,7 +217,11 @@ def get_description_lines(docstring):
     :param str docstring: The source docstring.
     :returns: list
     """
-    if prepare_docstring is None:
+    # Importing here since sphinx is slow to import and only needed when
+    # generating documentation.
+    try:
+        from sphinx.util.docstrings import prepare_docstring
+    except ImportError:
         raise ImportError('sphinx must be installed to use this function.')
 
     if not isinstance(docstring, str):
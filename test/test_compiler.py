@@ -0,0 +1,108 @@
+import jsonschema
+import pytest
+
+from doctor.compiler import CompiledValidator, compile_schema
+from doctor.errors import SchemaError
+
+
+SCHEMAS = [
+    ({'type': 'integer', 'minimum': 1, 'maximum': 5,
+      'exclusiveMaximum': True, 'multipleOf': 2},
+     [0, 1, 2, 4, 5, 6, True, 'a', 2.0, 3.5]),
+    ({'type': 'number', 'minimum': 1, 'exclusiveMinimum': True,
+      'multipleOf': 0.5},
+     [1, 1.5, 1.7, False]),
+    ({'type': ['string', 'null'], 'minLength': 2, 'maxLength': 3,
+      'pattern': '^a'},
+     ['a', 'ab', 'abcd', 'bb', None, 1]),
+    ({'format': 'email'}, ['x', 'a@b', 1]),
+    ({'format': 'date-time'}, ['2020-01-01T00:00:00Z', 'x']),
+    ({'format': 'unknown'}, ['x']),
+    ({'enum': [1, 'a', [1]]}, [1, 'a', [1], 2]),
+    ({'type': 'object', 'required': ['a', 'b'],
+      'properties': {
+          'a': {'type': 'integer'},
+          'b': {'type': 'object',
+                'properties': {'c': {'type': 'string'}},
+                'additionalProperties': False}},
+      'additionalProperties': False,
+      'minProperties': 1, 'maxProperties': 3},
+     [{}, {'a': 'x', 'b': {'c': 1, 'd': 2}}, {'a': 1, 'b': {}, 'z': 1},
+      {'a': 1, 'b': {}, 'z': 1, 'y': 2}, {'a': 1, 'b': {}}, []]),
+    ({'patternProperties': {'^x': {'type': 'integer'}, '^y': {}},
+      'additionalProperties': False},
+     [{'xa': 's', 'yb': 1, 'q': 1}, {'q': 1, 'r': 2}, {'xa': 1}]),
+    ({'properties': {'a': {}},
+      'additionalProperties': {'type': 'string'}},
+     [{'a': 1, 'b': 2, 'c': 'x'}]),
+    ({'items': {'type': 'integer'}, 'minItems': 2, 'maxItems': 3,
+      'uniqueItems': True},
+     [[1], [1, 1], [1, 'a', 2, 3], [1, 2], {}]),
+    ({'items': [{'type': 'integer'}, {'type': 'string'}],
+      'additionalItems': False},
+     [[1, 'a'], [1, 2, 3, 4], ['a']]),
+    ({'items': [{'type': 'integer'}], 'additionalItems': {'type': 'string'}},
+     [[1, 'a', 2]]),
+    ({'anyOf': [{'type': 'integer'}, {'type': 'string'}],
+      'allOf': [{'minimum': 2}, {'maximum': 3}]},
+     [1, 4, 'a', None, 2.5]),
+    ({'oneOf': [{'type': 'integer'}, {'minimum': 2}, {'type': 'number'}]},
+     [1, 3, 1.5, 'x']),
+    ({'not': {'type': 'string'}}, ['a', 1]),
+    ({'dependencies': {'a': ['b', 'c'], 'd': {'required': ['e']}}},
+     [{'a': 1}, {'d': 1}, {'a': 1, 'b': 1, 'c': 1}]),
+]
+
+
+def get_errors(validator, value):
+    return [(list(error.path), error.message)
+            for error in validator.iter_errors(value)]
+
+
+@pytest.mark.parametrize('schema, values', SCHEMAS)
+def test_same_errors_as_jsonschema(schema, values):
+    format_checker = jsonschema.draft4_format_checker
+    expected_validator = jsonschema.Draft4Validator(
+        schema, format_checker=format_checker)
+    validator = CompiledValidator(schema, format_checker=format_checker)
+    for value in values:
+        expected = get_errors(expected_validator, value)
+        assert sorted(expected) == sorted(get_errors(validator, value))
+        assert (not expected) is validator.is_valid(value)
+        if expected:
+            # The first error is the same, so messages for single values
+            # match.
+            with pytest.raises(jsonschema.ValidationError) as exc_info:
+                validator.validate(value)
+            assert expected[0][1] == exc_info.value.message
+        else:
+            validator.validate(value)
+
+
+def test_error_paths():
+    schema = {'properties': {'a': {'items': {'type': 'integer'}}}}
+    errors = list(CompiledValidator(schema).iter_errors({'a': [1, 'b']}))
+    assert 1 == len(errors)
+    assert ['a', 1] == list(errors[0].path)
+
+
+def test_format_not_checked_without_format_checker():
+    assert CompiledValidator({'format': 'email'}).is_valid('x')
+
+
+def test_shared_subschemas_compiled_once():
+    integer = {'type': 'integer'}
+    schema = {'properties': {'a': integer, 'b': integer}}
+    validator = CompiledValidator(schema)
+    assert [(['b'], "'x' is not of type 'integer'")] == get_errors(
+        validator, {'a': 1, 'b': 'x'})
+
+
+def test_ref_not_allowed():
+    with pytest.raises(SchemaError, match='must be bundled'):
+        compile_schema({'properties': {'a': {'$ref': '#/definitions/a'}}})
+
+
+def test_unknown_type():
+    with pytest.raises(SchemaError, match="Unknown type: 'foo'"):
+        compile_schema({'type': 'foo'})
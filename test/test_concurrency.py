@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from doctor.concurrency import (
+    acquire_all, get_global_concurrency_limit, release_all,
+    set_global_concurrency_limit, ConcurrencyLimit)
+from doctor.errors import ServiceUnavailableError
+
+
+class TestConcurrencyLimit(object):
+
+    def test_acquire_and_release(self):
+        limit = ConcurrencyLimit(2)
+        limit.acquire()
+        limit.acquire()
+        assert 2 == limit.active
+        limit.release()
+        assert 1 == limit.active
+        with limit:
+            assert 2 == limit.active
+        assert 1 == limit.active
+        assert 0 == limit.shed
+
+    def test_shed_when_full(self):
+        limit = ConcurrencyLimit(1, retry_after=5)
+        limit.acquire()
+        with pytest.raises(ServiceUnavailableError) as excinfo:
+            limit.acquire()
+        assert 5 == excinfo.value.retry_after
+        assert 1 == limit.shed
+        assert 1 == limit.active
+
+        limit.reset_stats()
+        assert 0 == limit.shed
+
+    def test_queued_request_gets_released_slot(self):
+        limit = ConcurrencyLimit(1, max_queued=1)
+        limit.acquire()
+        acquired = threading.Event()
+
+        def wait_for_slot():
+            limit.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=wait_for_slot)
+        thread.start()
+        # Wait until the thread is queued.
+        while limit.queued != 1:
+            pass
+
+        # The queue is full, so this request is shed.
+        with pytest.raises(ServiceUnavailableError):
+            limit.acquire()
+
+        assert not acquired.is_set()
+        limit.release()
+        thread.join(5)
+        assert acquired.is_set()
+        assert 1 == limit.active
+        assert 0 == limit.queued
+        assert 1 == limit.shed
+
+    def test_queue_timeout(self):
+        limit = ConcurrencyLimit(1, max_queued=1, queue_timeout=0.01)
+        limit.acquire()
+        with pytest.raises(ServiceUnavailableError):
+            limit.acquire()
+        assert 0 == limit.queued
+        assert 1 == limit.shed
+
+    def test_invalid_max_concurrent(self):
+        with pytest.raises(ValueError, match='max_concurrent'):
+            ConcurrencyLimit(0)
+
+
+def test_acquire_all():
+    route_limit = ConcurrencyLimit(2)
+    global_limit = ConcurrencyLimit(1)
+    acquired = acquire_all((route_limit, None, global_limit))
+    assert [route_limit, global_limit] == acquired
+
+    # The route slot is released when the global limit sheds the request.
+    with pytest.raises(ServiceUnavailableError):
+        acquire_all((route_limit, global_limit))
+    assert 1 == route_limit.active
+
+    release_all(acquired)
+    assert 0 == route_limit.active
+    assert 0 == global_limit.active
+
+
+def test_global_concurrency_limit():
+    assert get_global_concurrency_limit() is None
+    limit = ConcurrencyLimit(1)
+    set_global_concurrency_limit(limit)
+    try:
+        assert limit is get_global_concurrency_limit()
+    finally:
+        set_global_concurrency_limit(None)
+    assert get_global_concurrency_limit() is None
@@ -0,0 +1,49 @@
+import inspect
+
+import mock
+import pytest
+
+from doctor.deadline import get_deadline_param, Deadline
+from doctor.errors import DeadlineExceededError
+
+from .types import FooId
+
+
+@mock.patch('doctor.deadline.time.monotonic')
+class TestDeadline(object):
+
+    def test_deadline(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        deadline = Deadline(5)
+        assert 105.0 == deadline.expires
+        assert 5.0 == deadline.remaining()
+        assert not deadline.expired
+        deadline.check()
+
+        mock_monotonic.return_value = 105.0
+        assert 0.0 == deadline.remaining()
+        assert deadline.expired
+        with pytest.raises(DeadlineExceededError, match='within 5 seconds'):
+            deadline.check()
+
+        mock_monotonic.return_value = 110.0
+        assert 0.0 == deadline.remaining()
+
+    def test_no_timeout(self, mock_monotonic):
+        deadline = Deadline()
+        assert deadline.expires is None
+        assert deadline.remaining() is None
+        assert not deadline.expired
+        deadline.check()
+
+
+def test_get_deadline_param():
+    def logic(foo_id: FooId, deadline: Deadline):
+        pass
+
+    def logic_without_deadline(foo_id: FooId):
+        pass
+
+    assert 'deadline' == get_deadline_param(inspect.signature(logic))
+    assert get_deadline_param(
+        inspect.signature(logic_without_deadline)) is None
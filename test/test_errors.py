@@ -0,0 +1,101 @@
+import pickle
+
+from doctor.errors import TypeSystemError
+from doctor.types import array, integer, Object, string
+
+
+class Person(Object):
+    description = 'A person.'
+    properties = {
+        'name': string('A name.', min_length=1),
+        'age': integer('An age.', minimum=0),
+    }
+    required = ['name']
+    additional_properties = False
+
+
+class TestTypeSystemError(object):
+
+    def test_detail_is_formatted_lazily(self):
+        class Lazy(object):
+            errors = {'bad': 'Missing {does_not_exist}.'}
+
+        # The detail can't be formatted, but that only matters when it's
+        # accessed.
+        e = TypeSystemError(cls=Lazy, code='bad')
+        assert e.code == 'bad'
+        assert e.get_error_payload() == [{'path': [], 'code': 'bad'}]
+
+    def test_detail_with_code(self):
+        S = string('A string.', max_length=2)
+        e = TypeSystemError('ignored', cls=S, code='max_length')
+        assert e.detail == 'Must have no more than 2 characters.'
+        assert str(e) == 'Must have no more than 2 characters.'
+        assert e.args == ('Must have no more than 2 characters.',)
+
+    def test_detail_without_code(self):
+        e = TypeSystemError('Bad value.')
+        assert e.detail == 'Bad value.'
+        assert str(e) == 'Bad value.'
+        assert repr(e) == "TypeSystemError('Bad value.')"
+        e.detail = 'Other value.'
+        assert str(e) == 'Other value.'
+
+    def test_str_with_single_error(self):
+        e = TypeSystemError({'foo': 'Bad.'}, errors={'foo': 'Bad.'})
+        assert str(e) == 'foo - Bad.'
+        assert e.detail == {'foo': 'Bad.'}
+
+    def test_pickle(self):
+        S = string('A string.', max_length=2)
+        e = pickle.loads(pickle.dumps(TypeSystemError('Bad value.')))
+        assert e.detail == 'Bad value.'
+        e = pickle.loads(pickle.dumps(
+            TypeSystemError(cls=S, code='max_length')))
+        assert e.detail == 'Must have no more than 2 characters.'
+        assert e.code == 'max_length'
+
+    def test_nested_detail(self):
+        People = array('People.', items=Person)
+        result = People.check([
+            {'name': 'Bob', 'age': 1},
+            {'name': '', 'age': -1, 'foo': 1},
+            {},
+        ])
+        expected = {
+            1: {
+                'name': 'Must not be blank.',
+                'age': 'Must be greater than or equal to 0.',
+                'foo': 'Additional properties are not allowed.',
+            },
+            2: {'name': 'This field is required.'},
+        }
+        assert result.detail == expected
+        assert result.to_exception().detail == expected
+
+    def test_get_error_payload(self):
+        People = array('People.', items=Person)
+        result = People.check([
+            {'name': 'Bob', 'age': 1},
+            {'name': '', 'age': -1, 'foo': 1},
+            {},
+        ])
+        expected = [
+            {'path': [1, 'name'], 'code': 'blank'},
+            {'path': [1, 'age'], 'code': 'minimum'},
+            {'path': [1, 'foo'], 'code': 'additional_properties'},
+            {'path': [2, 'name'], 'code': 'required'},
+        ]
+        assert sorted(result.get_error_payload(), key=str) == sorted(
+            expected, key=str)
+        assert sorted(result.to_exception().get_error_payload(),
+                      key=str) == sorted(expected, key=str)
+        assert People.check([]).get_error_payload() == []
+
+    def test_get_error_payload_without_code(self):
+        e = TypeSystemError({'foo': 'Bad.', 'bar': {'baz': 'Worse.'}})
+        assert e.get_error_payload(('body',)) == [
+            {'path': ['body', 'foo'], 'code': 'invalid', 'detail': 'Bad.'},
+            {'path': ['body', 'bar', 'baz'], 'code': 'invalid',
+             'detail': 'Worse.'},
+        ]
@@ -0,0 +1,117 @@
+import pytest
+
+from doctor.errors import InvalidValueError
+from doctor.fields import get_projected_type, parse_fields, project
+from doctor.types import array, integer, new_type, Object, string
+
+
+class Author(Object):
+    description = 'An author.'
+    properties = {
+        'id': integer('The author ID.'),
+        'name': string('The author name.'),
+    }
+    required = ['id', 'name']
+    additional_properties = False
+
+
+class Book(Object):
+    description = 'A book.'
+    properties = {
+        'id': integer('The book ID.'),
+        'title': string('The title.'),
+        'author': Author,
+        'tags': array('Tags.', items=string('A tag.')),
+        'editors': array('Editors.', items=Author),
+    }
+    required = ['id', 'title', 'author']
+    additional_properties = False
+
+
+Books = array('Books.', items=Book)
+
+
+class TestParseFields(object):
+
+    def test_parse_fields(self):
+        assert {'id': None, 'author': {'id': None, 'name': None}} == (
+            parse_fields(' id, author.id,author.name,'))
+
+    def test_parse_fields_whole_property(self):
+        assert {'author': None} == parse_fields('author.id,author')
+        assert {'author': None} == parse_fields('author,author.id')
+
+    @pytest.mark.parametrize('value, error', (
+        ('', 'At least one field'),
+        (',', 'At least one field'),
+        ('author..id', 'Invalid field `author..id`'),
+        ('.id', 'Invalid field `.id`'),
+    ))
+    def test_parse_fields_invalid(self, value, error):
+        with pytest.raises(InvalidValueError, match=error):
+            parse_fields(value)
+
+
+class TestProject(object):
+
+    def test_project(self):
+        book = {
+            'id': 1, 'title': 'A Title',
+            'author': {'id': 2, 'name': 'Bob'},
+            'editors': [{'id': 3, 'name': 'Jo'}, {'id': 4, 'name': 'Al'}],
+        }
+        fields = parse_fields('title,author.name,editors.id,tags')
+        expected = {
+            'title': 'A Title',
+            'author': {'name': 'Bob'},
+            'editors': [{'id': 3}, {'id': 4}],
+        }
+        assert expected == project(book, fields)
+        assert [expected] == project([book], fields)
+        assert [expected] == list(project(iter([book]), fields))
+        assert 1 == project(1, fields)
+
+    def test_project_record(self):
+        Author = new_type(Object, description='An author.', record=True,
+                          additional_properties=False,
+                          properties={'id': integer('id'),
+                                      'name': string('name')})
+        author = Author({'id': 2, 'name': 'Bob'})
+        assert {'name': 'Bob'} == project(author, parse_fields('name'))
+
+
+class TestGetProjectedType(object):
+
+    def test_object(self):
+        Projected = get_projected_type(Book, 'title,author.name')
+        assert {'title', 'author'} == set(Projected.properties)
+        assert ['title', 'author'] == Projected.required
+        assert ['name'] == list(Projected.properties['author'].properties)
+        assert ['name'] == Projected.properties['author'].required
+        assert Projected.description == Book.description
+
+        # The projected type validates the projected value.
+        Projected({'title': 'A Title', 'author': {'name': 'Bob'}})
+        # The original type is not changed.
+        assert 5 == len(Book.properties)
+
+    def test_array(self):
+        Projected = get_projected_type(Books, 'editors.name')
+        item_type = Projected.items
+        assert ['editors'] == list(item_type.properties)
+        assert ['name'] == list(
+            item_type.properties['editors'].items.properties)
+
+    def test_cached(self):
+        assert get_projected_type(Book, 'id,title') is get_projected_type(
+            Book, 'title, id')
+
+    @pytest.mark.parametrize('value, error', (
+        ('foo', 'Unknown field `foo`'),
+        ('author.foo', 'Unknown field `author.foo`'),
+        ('title.foo', 'Fields can not be selected from `title`'),
+        ('tags.foo', 'Fields can not be selected from `tags`'),
+    ))
+    def test_invalid(self, value, error):
+        with pytest.raises(InvalidValueError, match=error):
+            get_projected_type(Book, value)
@@ -1,22 +1,34 @@
 import inspect
+import io
+import json
 import os
+import threading
 from functools import wraps
 
 import mock
 import pytest
 
+from doctor.concurrency import ConcurrencyLimit
+from doctor.deadline import Deadline
 from doctor.errors import (
-    ForbiddenError, ImmutableError, InvalidValueError, NotFoundError,
+    DeadlineExceededError, ForbiddenError, ImmutableError, InvalidValueError,
+    NotFoundError, ServiceUnavailableError, TypeSystemError,
     UnauthorizedError)
 from doctor.flask import (
-    handle_http, HTTP400Exception, HTTP401Exception, HTTP403Exception,
-    HTTP404Exception, HTTP409Exception, HTTP500Exception,
+    create_routes, handle_http, HTTP400Exception, HTTP401Exception,
+    HTTP403Exception, HTTP404Exception, HTTP409Exception, HTTP413Exception,
+    HTTP500Exception, HTTP503Exception, HTTP504Exception,
     should_raise_response_validation_errors)
-from doctor.types import new_type
+from doctor.hooks import AsyncHook, HookExecutor
+from doctor.parsers import PayloadLimits, set_default_payload_limits
+from doctor.idempotency import Idempotency
+from doctor.routing import get, post, Route
+from doctor.types import array, integer, new_type, Object, Record, string
 from doctor.response import Response
 from doctor.utils import (
     add_param_annotations, get_params_from_func, Params, RequestParamAnnotation)
 
+from .base import FlaskTestCase
 from .types import (
     Auth, Colors, ColorsOrObject, FooInstance, Item, ItemId, IncludeDeleted,
     Latitude)
@@ -174,6 +186,108 @@ def test_handle_http_object_array_types(mock_request, mock_post_logic):
     assert type(kwargs['colors']) is list
 
 
+def test_handle_http_with_json_payload_limits(mock_request, mock_post_logic):
+    body = json.dumps({'item': {'item_id': 1}, 'colors': ['blue', 'green']})
+    mock_request.method = 'POST'
+    mock_request.content_type = 'application/json; charset=UTF8'
+    mock_request.mimetype = 'application/json'
+    mock_request.content_length = len(body)
+    mock_request.get_data.return_value = body.encode('utf-8')
+    mock_handler = mock.Mock()
+
+    mock_post_logic._doctor_payload_limits = PayloadLimits(
+        max_body_bytes=100, max_array_length=2)
+    actual = handle_http(mock_handler, (), {}, mock_post_logic)
+    assert actual == ({'item_id': 1}, 201)
+    expected_call = mock.call(item={'item_id': 1}, colors=['blue', 'green'])
+    assert expected_call == mock_post_logic.call_args
+
+    # Too many array items is a 400
+    mock_post_logic._doctor_payload_limits = PayloadLimits(max_array_length=1)
+    with pytest.raises(HTTP400Exception, match='more than 1 items'):
+        handle_http(mock_handler, (), {}, mock_post_logic)
+
+    # A body that is too large is a 413 and the body is never read.
+    mock_request.get_data.reset_mock()
+    mock_post_logic._doctor_payload_limits = PayloadLimits(max_body_bytes=10)
+    with pytest.raises(HTTP413Exception, match='larger than 10 bytes'):
+        handle_http(mock_handler, (), {}, mock_post_logic)
+    assert not mock_request.get_data.called
+
+    # Invalid json is a 400
+    mock_post_logic._doctor_payload_limits = PayloadLimits(max_depth=5)
+    mock_request.content_length = None
+    mock_request.get_data.return_value = b'{bad json'
+    with pytest.raises(HTTP400Exception, match='Error parsing JSON'):
+        handle_http(mock_handler, (), {}, mock_post_logic)
+
+
+def test_handle_http_with_json_payload_limits_no_content_length(
+        mock_request, mock_post_logic):
+    mock_request.method = 'POST'
+    mock_request.content_type = 'application/json; charset=UTF8'
+    mock_request.mimetype = 'application/json'
+    mock_request.content_length = None
+    mock_handler = mock.Mock()
+    mock_post_logic._doctor_payload_limits = PayloadLimits(max_body_bytes=50)
+
+    # Only one byte past the limit is read from a body of unknown size.
+    stream = io.BytesIO(b'{"colors": ["' + b'a' * 5000000 + b'"]}')
+    mock_request.stream = stream
+    with pytest.raises(HTTP413Exception, match='larger than 50 bytes'):
+        handle_http(mock_handler, (), {}, mock_post_logic)
+    assert 51 == stream.tell()
+    assert not mock_request.get_data.called
+
+    mock_request.stream = io.BytesIO(
+        b'{"item": {"item_id": 1}, "colors": ["blue"]}')
+    assert ({'item_id': 1}, 201) == handle_http(
+        mock_handler, (), {}, mock_post_logic)
+
+
+def test_handle_http_with_json_default_payload_limits(
+        mock_request, mock_post_logic):
+    mock_request.method = 'POST'
+    mock_request.content_type = 'application/json; charset=UTF8'
+    mock_request.mimetype = 'application/json'
+    mock_request.content_length = None
+    mock_request.get_data.return_value = b'{"colors": [[["blue"]]]}'
+    mock_handler = mock.Mock()
+
+    set_default_payload_limits(PayloadLimits(max_depth=2))
+    try:
+        with pytest.raises(HTTP400Exception, match='nested more than 2'):
+            handle_http(mock_handler, (), {}, mock_post_logic)
+    finally:
+        set_default_payload_limits(None)
+
+
+def test_handle_http_with_max_errors(mock_request, mock_post_logic):
+    mock_request.method = 'POST'
+    mock_request.content_type = 'application/json; charset=UTF8'
+    mock_request.mimetype = 'application/json'
+    mock_request.json = {'item': {'item_id': 'a'}, 'colors': ['red', 'red']}
+    mock_handler = mock.Mock()
+
+    with pytest.raises(HTTP400Exception) as excinfo:
+        handle_http(mock_handler, (), {}, mock_post_logic)
+    assert 2 == len(excinfo.value.errors)
+    assert 2 == len(excinfo.value.errors['colors'])
+
+    # Only the first error of the request params and of each array or object
+    # is collected.
+    mock_post_logic._doctor_max_errors = 1
+    with pytest.raises(HTTP400Exception) as excinfo:
+        handle_http(mock_handler, (), {}, mock_post_logic)
+    assert 1 == len(excinfo.value.errors)
+
+    mock_request.json = {'item': {'item_id': 1}, 'colors': ['red', 'red']}
+    with pytest.raises(HTTP400Exception) as excinfo:
+        handle_http(mock_handler, (), {}, mock_post_logic)
+    assert {'colors': {0: "Must be one of: ['blue', 'green']"}} == (
+        excinfo.value.errors)
+
+
 def test_handle_http_non_json(mock_request, mock_get_logic):
     mock_request.method = 'GET'
     mock_request.content_type = 'application/x-www-form-urlencoded'
@@ -403,6 +517,18 @@ def test_handle_http_http_errors(
     with pytest.raises(HTTP409Exception, match='immutable'):
         handle_http(mock_handler, (), {}, mock_get_logic)
 
+    # 503
+    mock_get_logic.side_effect = ServiceUnavailableError(
+        'unavailable', retry_after=3)
+    with pytest.raises(HTTP503Exception, match='unavailable') as excinfo:
+        handle_http(mock_handler, (), {}, mock_get_logic)
+    assert 3 == excinfo.value.retry_after
+
+    # 504
+    mock_get_logic.side_effect = DeadlineExceededError('deadline')
+    with pytest.raises(HTTP504Exception, match='deadline'):
+        handle_http(mock_handler, (), {}, mock_get_logic)
+
     # 500
     mock_get_logic.side_effect = Exception('internal error')
     with pytest.raises(HTTP500Exception, match='Uncaught error in logic func'):
@@ -412,3 +538,361 @@ def test_handle_http_http_errors(
     mock_app.config = {'DEBUG': True}
     with pytest.raises(Exception, match='internal error'):
         handle_http(mock_handler, (), {}, mock_get_logic)
+
+
+Count = integer('The number of items.', minimum=0)
+Items = array('A list of items.', items=Item)
+
+
+def stream_items(count: Count) -> Items:
+    return ({'item_id': i} for i in range(1, count + 1))
+
+
+def stream_invalid_items() -> Response[Items]:
+    items = iter([{'item_id': 1}, {'item_id': 'a'}, {'item_id': 'b'}])
+    return Response(items, headers={'X-Foo': 'bar'}, status_code=202,
+                    validate_every=2)
+
+
+stream_limit = ConcurrencyLimit(1)
+
+
+def stream_items_with_deadline(count: Count, deadline: Deadline) -> Items:
+    for i in range(1, count + 1):
+        yield {'item_id': i}
+        # Simulate a slow item that uses all of the remaining time.
+        deadline.expires -= deadline.timeout
+
+
+class StreamingResponseTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/stream/', methods=[get(stream_items)]),
+            Route('/stream/invalid/', methods=[get(stream_invalid_items)]),
+            Route('/stream/limited/', methods=[
+                get(stream_items, concurrency_limit=stream_limit)]),
+            Route('/stream/deadline/', methods=[
+                get(stream_items_with_deadline, timeout=10)]),
+        )
+        return create_routes(routes)
+
+    def test_stream(self):
+        response = self.client.get('/stream/', query_string={'count': 3})
+        assert 200 == response.status_code
+        assert 'application/json' == response.mimetype
+        assert [{'item_id': 1}, {'item_id': 2}, {'item_id': 3}] == (
+            response.json)
+
+        response = self.client.get('/stream/', query_string={'count': 0})
+        assert [] == response.json
+
+    @mock.patch('doctor.flask.STREAM_CHUNK_SIZE', 20)
+    def test_stream_chunks(self):
+        response = self.client.get('/stream/', query_string={'count': 5})
+        chunks = [chunk.decode('utf-8') for chunk in response.response]
+        assert 3 == len(chunks)
+        assert [{'item_id': i} for i in range(1, 6)] == json.loads(
+            ''.join(chunks))
+
+    @mock.patch('doctor.flask.should_raise_response_validation_errors',
+                mock.Mock(return_value=False))
+    @mock.patch('doctor.flask.logging')
+    def test_stream_invalid_items(self, mock_logging):
+        response = self.client.get('/stream/invalid/')
+        assert 202 == response.status_code
+        assert 'bar' == response.headers['X-Foo']
+        assert [{'item_id': 1}, {'item_id': 'a'}, {'item_id': 'b'}] == (
+            response.json)
+        # Only every other item is validated.
+        assert 1 == mock_logging.warning.call_count
+        assert 2 == mock_logging.warning.call_args[0][3]
+
+    @mock.patch.dict('os.environ', {'RAISE_RESPONSE_VALIDATION_ERRORS': '1'})
+    def test_stream_invalid_items_raises(self):
+        with pytest.raises(TypeSystemError, match='item 2'):
+            self.client.get('/stream/invalid/')
+
+    def test_stream_holds_concurrency_slot(self):
+        response = self.client.get(
+            '/stream/limited/', query_string={'count': 2}, buffered=False)
+        # The slot is held until the streamed response is closed.
+        assert 1 == stream_limit.active
+        assert [{'item_id': 1}, {'item_id': 2}] == json.loads(
+            b''.join(response.response))
+        response.close()
+        assert 0 == stream_limit.active
+
+    def test_stream_deadline_exceeded(self):
+        response = self.client.get(
+            '/stream/deadline/', query_string={'count': 1})
+        assert [{'item_id': 1}] == response.json
+        with pytest.raises(DeadlineExceededError):
+            self.client.get('/stream/deadline/', query_string={'count': 2})
+
+
+Books = array('Books.', items=new_type(
+    Item, properties={'item_id': ItemId, 'name': Auth},
+    required=['item_id', 'name']))
+
+
+def get_books() -> Books:
+    return [{'item_id': 1, 'name': 'a'}, {'item_id': 2, 'name': 'b'}]
+
+
+class SparseFieldsTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/books/', methods=[get(get_books, sparse_fields=True)]),
+            Route('/books/all/', methods=[get(get_books)]),
+        )
+        return create_routes(routes)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/books/', query_string={'fields': 'name'})
+        assert 200 == response.status_code
+        assert [{'name': 'a'}, {'name': 'b'}] == response.json
+
+        response = self.client.get('/books/')
+        assert [{'item_id': 1, 'name': 'a'},
+                {'item_id': 2, 'name': 'b'}] == response.json
+
+    def test_sparse_fields_unknown_field(self):
+        response = self.client.get('/books/', query_string={'fields': 'foo'})
+        assert 400 == response.status_code
+        assert b'Unknown field `foo`.' in response.data
+
+    def test_sparse_fields_not_enabled(self):
+        response = self.client.get(
+            '/books/all/', query_string={'fields': 'name'})
+        assert [{'item_id': 1, 'name': 'a'},
+                {'item_id': 2, 'name': 'b'}] == response.json
+
+
+created_items = []
+
+
+def create_idempotent_item(item_id: ItemId) -> Item:
+    created_items.append(item_id)
+    return Response({'item_id': item_id}, {'X-Count': str(len(created_items))})
+
+
+class IdempotencyTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/items/', methods=[
+                post(create_idempotent_item, idempotency=Idempotency())]),
+        )
+        return create_routes(routes)
+
+    def setUp(self):
+        del created_items[:]
+
+    def test_duplicates_are_replayed(self):
+        headers = {'Idempotency-Key': 'abc'}
+        for _ in range(2):
+            response = self.client.post(
+                '/items/', json={'item_id': 1}, headers=headers)
+            assert 201 == response.status_code
+            assert {'item_id': 1} == response.json
+            assert '1' == response.headers['X-Count']
+        assert [1] == created_items
+
+        # Different params or keys are not duplicates.
+        self.client.post('/items/', json={'item_id': 2}, headers=headers)
+        self.client.post('/items/', json={'item_id': 1},
+                         headers={'Idempotency-Key': 'abd'})
+        assert [1, 2, 1] == created_items
+
+    def test_no_key(self):
+        self.client.post('/items/', json={'item_id': 1})
+        self.client.post('/items/', json={'item_id': 1})
+        assert [1, 1] == created_items
+
+
+item_limit = ConcurrencyLimit(1, retry_after=2)
+
+
+def get_limited_item(item_id: ItemId) -> Item:
+    return {'item_id': item_id}
+
+
+class ConcurrencyLimitTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/items/<int:item_id>/', methods=[
+                get(get_limited_item, concurrency_limit=item_limit)]),
+        )
+        return create_routes(routes)
+
+    def test_shed_requests(self):
+        response = self.client.get('/items/1/')
+        assert 200 == response.status_code
+        assert 0 == item_limit.active
+
+        # Simulate a slow request holding the only slot.
+        with item_limit:
+            response = self.client.get('/items/1/')
+        assert 503 == response.status_code
+        assert '2' == response.headers['Retry-After']
+        assert 1 == item_limit.shed
+
+        response = self.client.get('/items/1/')
+        assert 200 == response.status_code
+
+
+deadlines = []
+
+
+def get_item_with_deadline(item_id: ItemId, deadline: Deadline) -> Item:
+    deadlines.append(deadline)
+    return {'item_id': item_id}
+
+
+def get_slow_item(item_id: ItemId, deadline: Deadline) -> Item:
+    deadlines.append(deadline)
+    # Simulate a slow call that uses all of the remaining time.
+    deadline.expires -= deadline.timeout
+    return {'item_id': item_id}
+
+
+class DeadlineTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/items/<int:item_id>/', methods=[
+                get(get_item_with_deadline, timeout=10)]),
+            Route('/items/<int:item_id>/expired/', methods=[
+                get(get_item_with_deadline, timeout=0)]),
+            Route('/items/<int:item_id>/slow/', methods=[
+                get(get_slow_item, timeout=10)]),
+            Route('/items/<int:item_id>/no-timeout/', methods=[
+                get(get_item_with_deadline)]),
+        )
+        return create_routes(routes)
+
+    def setUp(self):
+        del deadlines[:]
+
+    def test_deadline_is_passed_to_logic(self):
+        response = self.client.get(
+            '/items/1/', query_string={'deadline': 'foo'})
+        assert 200 == response.status_code
+        assert {'item_id': 1} == response.json
+        assert 1 == len(deadlines)
+        assert 10 == deadlines[0].timeout
+        assert 0 < deadlines[0].remaining() <= 10
+
+        self.client.get('/items/1/no-timeout/')
+        assert deadlines[1].remaining() is None
+
+    def test_deadline_exceeded_before_logic(self):
+        response = self.client.get('/items/1/expired/')
+        assert 504 == response.status_code
+        assert b'not handled within 0 seconds' in response.data
+        assert [] == deadlines
+
+    def test_deadline_exceeded_after_logic(self):
+        response = self.client.get('/items/1/slow/')
+        assert 504 == response.status_code
+        assert 1 == len(deadlines)
+
+
+hook_executor = HookExecutor(max_workers=1)
+hook_results = []
+hook_event = threading.Event()
+
+
+def slow_after_hook(result):
+    hook_event.wait(5)
+    hook_results.append(result)
+
+
+class AsyncAfterHookTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/items/', methods=[post(create_idempotent_item)],
+                  after=AsyncHook(slow_after_hook, hook_executor)),
+        )
+        return create_routes(routes)
+
+    def test_response_does_not_wait_for_hook(self):
+        response = self.client.post('/items/', json={'item_id': 1})
+        assert 201 == response.status_code
+        assert [] == hook_results
+
+        hook_event.set()
+        hook_executor.shutdown()
+        assert 1 == len(hook_results)
+        assert 1 == hook_executor.stats['completed']
+
+
+RecordItemId = integer('The item id.')
+
+
+class ItemRecord(Object):
+    description = 'An item.'
+    additional_properties = False
+    record = True
+    properties = {
+        'item_id': RecordItemId,
+        'name': string('The item name.'),
+    }
+    required = ['item_id']
+
+
+ItemRecords = array('Items.', items=ItemRecord)
+received_records = []
+
+
+def create_item_records(items: ItemRecords) -> ItemRecords:
+    received_records.extend(items)
+    return items
+
+
+def stream_item_records() -> ItemRecords:
+    return iter([ItemRecord({'item_id': 1}), ItemRecord({'item_id': 2})])
+
+
+def get_item_record(item_id: RecordItemId) -> ItemRecord:
+    return ItemRecord({'item_id': item_id, 'name': 'foo'})
+
+
+class RecordTestCase(FlaskTestCase):
+
+    def get_routes(self):
+        routes = (
+            Route('/items/', methods=[
+                get(stream_item_records), post(create_item_records)]),
+            Route('/items/<int:item_id>/', methods=[get(get_item_record)]),
+        )
+        return create_routes(routes)
+
+    def setUp(self):
+        del received_records[:]
+
+    def test_records(self):
+        items = [{'item_id': 1, 'name': 'a'}, {'item_id': 2}]
+        response = self.client.post('/items/', json={'items': items})
+        assert 201 == response.status_code
+        assert items == response.json
+        assert 2 == len(received_records)
+        assert isinstance(received_records[0], Record)
+        assert 'a' == received_records[0].name
+
+        response = self.client.post(
+            '/items/', json={'items': [{'item_id': 1, 'foo': 'bar'}]})
+        assert 400 == response.status_code
+
+    def test_record_response(self):
+        response = self.client.get('/items/1/')
+        assert 200 == response.status_code
+        assert {'item_id': 1, 'name': 'foo'} == response.json
+
+        response = self.client.get('/items/')
+        assert 200 == response.status_code
+        assert [{'item_id': 1}, {'item_id': 2}] == response.json
@@ -0,0 +1,223 @@
+from datetime import date, datetime, timedelta, timezone
+
+import isodate
+import pytest
+
+from doctor.formats import (
+    FORMATS, parse_date, parse_datetime, parse_time, register_format,
+    validate_email, validate_hostname, validate_ipv4, validate_ipv6,
+    validate_uri, validate_uri_reference, validate_uuid)
+
+
+class TestParseDate(object):
+
+    def test_parse_date(self):
+        assert parse_date('2018-10-22') == date(2018, 10, 22)
+
+    def test_parse_date_not_zero_padded(self):
+        # Falls back to strptime, which doesn't require zero padding.
+        assert parse_date('2018-1-2') == date(2018, 1, 2)
+
+    @pytest.mark.parametrize('value, expected_msg', (
+        ('foo', "time data 'foo' does not match format '%Y-%m-%d'"),
+        ('2018-13-01', "time data '2018-13-01' does not match format"),
+        ('2018-02-30', 'day is out of range for month'),
+    ))
+    def test_parse_date_invalid(self, value, expected_msg):
+        with pytest.raises(ValueError, match=expected_msg):
+            parse_date(value)
+
+
+class TestParseDatetime(object):
+
+    @pytest.mark.parametrize('value, expected', (
+        ('2018-10-22T11:12:00', datetime(2018, 10, 22, 11, 12)),
+        ('2018-10-22T11:12', datetime(2018, 10, 22, 11, 12)),
+        ('2018-10-22T11:12:00.123',
+         datetime(2018, 10, 22, 11, 12, 0, 123000)),
+        ('2018-10-22T11:12:00Z',
+         datetime(2018, 10, 22, 11, 12, tzinfo=timezone.utc)),
+        ('2018-10-22T11:12:00.5Z',
+         datetime(2018, 10, 22, 11, 12, 0, 500000, tzinfo=timezone.utc)),
+        ('2018-10-22T11:12:00.123456+05:30',
+         datetime(2018, 10, 22, 11, 12, 0, 123456,
+                  tzinfo=timezone(timedelta(hours=5, minutes=30)))),
+        ('2018-10-22T11:12:00.12-08:00',
+         datetime(2018, 10, 22, 11, 12, 0, 120000,
+                  tzinfo=timezone(timedelta(hours=-8)))),
+        # Falls back to isodate for less common ISO 8601 forms.
+        ('20181022T111200', datetime(2018, 10, 22, 11, 12)),
+        ('2018-10-22T11:12:00+0100',
+         datetime(2018, 10, 22, 11, 12,
+                  tzinfo=timezone(timedelta(hours=1)))),
+    ))
+    def test_parse_datetime(self, value, expected):
+        actual = parse_datetime(value)
+        assert actual == expected
+        assert actual.utcoffset() == expected.utcoffset()
+
+    @pytest.mark.parametrize('value', (
+        'foo', '2018-10-22t11:12:00', '2018-13-22T11:12:00Z',
+        '2018-10-22T25:12:00+01:00',
+    ))
+    def test_parse_datetime_invalid(self, value):
+        with pytest.raises(ValueError) as excinfo:
+            parse_datetime(value)
+        # The error should be the same as the one isodate raises.
+        with pytest.raises(ValueError) as isodate_excinfo:
+            isodate.parse_datetime(value)
+        assert str(excinfo.value) == str(isodate_excinfo.value)
+
+
+class TestParseTime(object):
+
+    def test_parse_time(self):
+        assert parse_time('13:10:00') == datetime(1900, 1, 1, 13, 10, 0)
+
+    def test_parse_time_not_zero_padded(self):
+        assert parse_time('1:2:3') == datetime(1900, 1, 1, 1, 2, 3)
+
+    @pytest.mark.parametrize('value, expected_msg', (
+        ('foo', "time data 'foo' does not match format '%H:%M:%S'"),
+        ('24:00:00', "time data '24:00:00' does not match format"),
+    ))
+    def test_parse_time_invalid(self, value, expected_msg):
+        with pytest.raises(ValueError, match=expected_msg):
+            parse_time(value)
+
+
+class TestValidateUri(object):
+
+    @pytest.mark.parametrize('value', (
+        'https://doctor.com',
+        'http://user:pw@host:80/p/a/t/h?q=1&b=2#frag',
+        'mailto:user@domain.net',
+        'urn:isbn:0451450523',
+        'file:///etc/passwd',
+        'http://[::1]:8080/',
+        'http://a%2Fb.com/',
+    ))
+    def test_valid(self, value):
+        assert validate_uri(value) == value
+
+    @pytest.mark.parametrize('value', (
+        'foo', '//doctor.com', 'http://exa mple.com', 'http://a%2Gb',
+        'http://[zz::1]/', '1http://doctor.com', 'http://a/b?c#d#e',
+    ))
+    def test_invalid(self, value):
+        with pytest.raises(ValueError, match='is not a valid'):
+            validate_uri(value)
+
+    def test_long_invalid_value_is_fast(self):
+        # These would take a very long time with a regex that backtracks.
+        for value in ('http://' + ':' * 100000 + ' ',
+                      'a:' + '/%41' * 100000 + ' '):
+            with pytest.raises(ValueError):
+                validate_uri(value)
+
+
+class TestValidateUriReference(object):
+
+    @pytest.mark.parametrize('value', (
+        'https://doctor.com', '//doctor.com/foo', '/a/b', 'a/b', './a:b',
+        '?q=1', '#frag', '',
+    ))
+    def test_valid(self, value):
+        assert validate_uri_reference(value) == value
+
+    @pytest.mark.parametrize('value', ('a:b c', '1a:b', 'a b'))
+    def test_invalid(self, value):
+        with pytest.raises(ValueError, match='is not a valid'):
+            validate_uri_reference(value)
+
+
+class TestValidateEmail(object):
+
+    @pytest.mark.parametrize('value', (
+        'user@domain.net', 'first.last+tag@sub.domain.net',
+        '"quoted @ local"@domain.net', 'user@[127.0.0.1]',
+        'user@[IPv6:::1]', 'user@localhost',
+    ))
+    def test_valid(self, value):
+        assert validate_email(value) == value
+
+    @pytest.mark.parametrize('value', (
+        'foo.net', '@domain.net', 'user@', 'user.@domain.net',
+        'us er@domain.net', 'user@-domain.net', 'user@[300.0.0.1]',
+        'a' * 65 + '@domain.net',
+    ))
+    def test_invalid(self, value):
+        with pytest.raises(ValueError, match='Not a valid email address.'):
+            validate_email(value)
+
+
+class TestValidateHostname(object):
+
+    @pytest.mark.parametrize('value', (
+        'localhost', 'doctor.com', 'a-b.c-d.com', 'a' * 63 + '.com'))
+    def test_valid(self, value):
+        assert validate_hostname(value) == value
+
+    @pytest.mark.parametrize('value', (
+        '', '-doctor.com', 'doctor-.com', 'doctor..com', 'doc tor.com',
+        'a' * 64 + '.com', '.'.join(['a' * 50] * 5),
+    ))
+    def test_invalid(self, value):
+        with pytest.raises(ValueError, match='Not a valid hostname.'):
+            validate_hostname(value)
+
+
+class TestValidateIp(object):
+
+    def test_ipv4(self):
+        assert validate_ipv4('127.0.0.1') == '127.0.0.1'
+        for value in ('256.0.0.1', '::1', 'localhost'):
+            with pytest.raises(ValueError, match='Not a valid IPv4 address.'):
+                validate_ipv4(value)
+
+    def test_ipv6(self):
+        assert validate_ipv6('::1') == '::1'
+        assert validate_ipv6('2001:db8::ff00:42:8329')
+        for value in ('127.0.0.1', '2001:db8::g', ':::'):
+            with pytest.raises(ValueError, match='Not a valid IPv6 address.'):
+                validate_ipv6(value)
+
+
+class TestValidateUuid(object):
+
+    def test_valid(self):
+        value = '6fa459ea-ee8a-3ca4-894e-db77e160355e'
+        assert validate_uuid(value) == value
+        assert validate_uuid(value.upper()) == value.upper()
+
+    @pytest.mark.parametrize('value', (
+        '6fa459eaee8a3ca4894edb77e160355e',
+        '6fa459ea-ee8a-3ca4-894e-db77e160355',
+        '6fa459ea-ee8a-3ca4-894e-db77e160355g',
+    ))
+    def test_invalid(self, value):
+        with pytest.raises(ValueError, match='Not a valid UUID.'):
+            validate_uuid(value)
+
+
+class TestRegisterFormat(object):
+
+    def teardown_method(self, method):
+        FORMATS.pop('even-length', None)
+
+    def test_register_format(self):
+        def validate_even_length(value):
+            if len(value) % 2:
+                raise ValueError('Must have an even number of characters.')
+            return value
+
+        assert register_format('even-length', validate_even_length) is (
+            validate_even_length)
+        assert FORMATS['even-length'] is validate_even_length
+
+    def test_register_format_decorator(self):
+        @register_format('even-length')
+        def validate_even_length(value):
+            return value
+
+        assert FORMATS['even-length'] is validate_even_length
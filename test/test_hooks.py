@@ -0,0 +1,113 @@
+import threading
+
+import mock
+import pytest
+
+from doctor.hooks import (
+    get_default_hook_executor, set_default_hook_executor, AsyncHook,
+    HookExecutor)
+
+
+class TestHookExecutor(object):
+
+    def test_submit(self):
+        executor = HookExecutor(max_workers=1)
+        calls = []
+        executor.submit(calls.append, 1)
+        executor.submit(calls.append, 2)
+        executor.shutdown()
+        assert [1, 2] == calls
+        assert {'submitted': 2, 'completed': 2, 'failed': 0, 'dropped': 0,
+                'ran_inline': 0, 'pending': 0} == executor.stats
+
+    @mock.patch('doctor.hooks.logging')
+    def test_errors_are_isolated(self, mock_logging):
+        executor = HookExecutor(max_workers=1)
+
+        def hook(result):
+            raise ValueError('boom')
+
+        executor.submit(hook, 1)
+        executor.shutdown()
+        assert 1 == executor.stats['failed']
+        assert 0 == executor.stats['completed']
+        mock_logging.exception.assert_called_once_with(
+            'Error in hook %s', 'hook')
+
+    def _fill(self, executor):
+        """Blocks the executor's only pending slot until the event is set."""
+        event = threading.Event()
+        executor.submit(event.wait)
+        return event
+
+    def test_overflow_run(self):
+        executor = HookExecutor(max_workers=1, max_pending=1)
+        event = self._fill(executor)
+        calls = []
+        executor.submit(calls.append, 1)
+        # The hook ran in this thread because the executor was full.
+        assert [1] == calls
+        assert 1 == executor.stats['ran_inline']
+        assert 1 == executor.stats['pending']
+        event.set()
+        executor.shutdown()
+        assert 0 == executor.stats['pending']
+        assert 2 == executor.stats['completed']
+
+    @mock.patch('doctor.hooks.logging')
+    def test_overflow_drop(self, mock_logging):
+        executor = HookExecutor(max_workers=1, max_pending=1, overflow='drop')
+        event = self._fill(executor)
+        calls = []
+        executor.submit(calls.append, 1)
+        event.set()
+        executor.shutdown()
+        assert [] == calls
+        assert 1 == executor.stats['dropped']
+        assert mock_logging.warning.called
+
+    def test_overflow_block(self):
+        executor = HookExecutor(max_workers=1, max_pending=1,
+                                overflow='block')
+        event = self._fill(executor)
+        calls = []
+        thread = threading.Thread(
+            target=executor.submit, args=(calls.append, 1))
+        thread.start()
+        thread.join(0.05)
+        # The submit waits for the pending hook to finish.
+        assert thread.is_alive()
+        event.set()
+        thread.join(5)
+        executor.shutdown()
+        assert [1] == calls
+        assert 0 == executor.stats['ran_inline']
+
+    def test_invalid_overflow(self):
+        with pytest.raises(ValueError, match='overflow must be one of'):
+            HookExecutor(overflow='foo')
+
+
+class TestAsyncHook(object):
+
+    def test_call(self):
+        executor = HookExecutor(max_workers=1)
+        hook = mock.Mock(__name__='hook')
+        AsyncHook(hook, executor)('result')
+        executor.shutdown()
+        hook.assert_called_once_with('result')
+
+    def test_default_executor(self):
+        executor = HookExecutor(max_workers=1)
+        set_default_hook_executor(executor)
+        try:
+            assert executor is get_default_hook_executor()
+            hook = mock.Mock(__name__='hook')
+            AsyncHook(hook)('result')
+            executor.shutdown()
+            hook.assert_called_once_with('result')
+        finally:
+            set_default_hook_executor(None)
+        default = get_default_hook_executor()
+        assert default is not executor
+        assert default is get_default_hook_executor()
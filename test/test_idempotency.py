@@ -0,0 +1,202 @@
+import threading
+import time
+
+import mock
+import pytest
+
+from doctor.errors import ImmutableError
+from doctor.idempotency import (
+    Idempotency, IdempotencyStore, MemoryStore, SQLiteStore)
+
+
+class TestIdempotencyStore(object):
+
+    def test_methods_must_be_implemented(self):
+        store = IdempotencyStore()
+        with pytest.raises(NotImplementedError,
+                           match='subclasses of IdempotencyStore'):
+            store.get('a')
+        with pytest.raises(NotImplementedError,
+                           match='subclasses of IdempotencyStore'):
+            store.set('a', (1, None, None), 10)
+
+
+class TestMemoryStore(object):
+
+    def test_get_set(self):
+        store = MemoryStore()
+        assert store.get('a') is None
+        store.set('a', ({'id': 1}, 201, None), 10)
+        assert ({'id': 1}, 201, None) == store.get('a')
+
+    def test_ttl(self):
+        store = MemoryStore()
+        store.set('a', (1, None, None), 0)
+        assert store.get('a') is None
+
+    def test_evicts_least_recently_used(self):
+        store = MemoryStore(max_size=2)
+        store.set('a', (1, None, None), 10)
+        store.set('b', (2, None, None), 10)
+        store.get('a')
+        store.set('c', (3, None, None), 10)
+        assert store.get('b') is None
+        assert (1, None, None) == store.get('a')
+        assert (3, None, None) == store.get('c')
+
+
+class TestSQLiteStore(object):
+
+    def test_get_set(self, tmpdir):
+        path = str(tmpdir.join('idempotency.db'))
+        store = SQLiteStore(path)
+        assert store.get('a') is None
+        store.set('a', ({'id': 1}, 201, {'X-Foo': 'bar'}), 10)
+        assert ({'id': 1}, 201, {'X-Foo': 'bar'}) == store.get('a')
+
+        # Responses are shared with other stores using the same file.
+        assert ({'id': 1}, 201, {'X-Foo': 'bar'}) == SQLiteStore(
+            path).get('a')
+
+    def test_ttl(self, tmpdir):
+        store = SQLiteStore(str(tmpdir.join('idempotency.db')))
+        store.set('a', (1, None, None), 0)
+        assert store.get('a') is None
+
+    def test_threads(self, tmpdir):
+        store = SQLiteStore(str(tmpdir.join('idempotency.db')))
+        thread = threading.Thread(
+            target=store.set, args=('a', (1, None, None), 10))
+        thread.start()
+        thread.join()
+        assert (1, None, None) == store.get('a')
+
+    @mock.patch('doctor.idempotency.logging')
+    def test_unpicklable_response(self, mock_logging, tmpdir):
+        store = SQLiteStore(str(tmpdir.join('idempotency.db')))
+        store.set('a', (lambda: 1, None, None), 10)
+        assert store.get('a') is None
+        assert 1 == mock_logging.warning.call_count
+
+        func = mock.Mock(return_value=(threading.Lock(), None, None))
+        idempotency = Idempotency(store)
+        assert func.return_value == idempotency.call('b', func)
+        assert store.get('b') is None
+
+
+class TestIdempotency(object):
+
+    def test_get_key(self):
+        idempotency = Idempotency()
+        key = idempotency.get_key('abc', 'POST', '/foo/', {'a': 1, 'b': 2})
+        assert key == idempotency.get_key(
+            'abc', 'POST', '/foo/', {'b': 2, 'a': 1})
+        assert key != idempotency.get_key(
+            'abd', 'POST', '/foo/', {'a': 1, 'b': 2})
+        assert key != idempotency.get_key(
+            'abc', 'PUT', '/foo/', {'a': 1, 'b': 2})
+        assert key != idempotency.get_key(
+            'abc', 'POST', '/foo/', {'a': 1, 'b': 3})
+
+    def test_call(self):
+        idempotency = Idempotency()
+        func = mock.Mock(return_value=({'id': 1}, 201, None))
+        assert ({'id': 1}, 201, None) == idempotency.call('a', func)
+        assert ({'id': 1}, 201, None) == idempotency.call('a', func)
+        assert 1 == func.call_count
+
+    def test_call_does_not_store_errors_or_iterators(self):
+        idempotency = Idempotency()
+        func = mock.Mock(side_effect=ValueError('error'))
+        for _ in range(2):
+            try:
+                idempotency.call('a', func)
+            except ValueError:
+                pass
+        assert 2 == func.call_count
+
+        func = mock.Mock(return_value=(iter([]), None, None))
+        idempotency.call('b', func)
+        idempotency.call('b', func)
+        assert 2 == func.call_count
+
+    def test_call_concurrent_duplicates_wait(self):
+        idempotency = Idempotency()
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.1)
+            return ({'id': len(calls)}, None, None)
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(idempotency.call('a', func)))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert 1 == len(calls)
+        assert [({'id': 1}, None, None)] * 5 == results
+
+    def test_call_wait_timeout(self):
+        idempotency = Idempotency(wait_timeout=0.01)
+        started = threading.Event()
+        finish = threading.Event()
+
+        def slow_func():
+            started.set()
+            finish.wait(5)
+            return ({'id': 1}, None, None)
+
+        thread = threading.Thread(target=idempotency.call,
+                                  args=('a', slow_func))
+        thread.start()
+        started.wait(5)
+        func = mock.Mock()
+        with pytest.raises(ImmutableError, match='still being handled'):
+            idempotency.call('a', func)
+        finish.set()
+        thread.join()
+        func.assert_not_called()
+        assert ({'id': 1}, None, None) == idempotency.call('a', func)
+
+    def test_call_retries_once_after_failure(self):
+        idempotency = Idempotency()
+        started = threading.Event()
+        fail = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) == 1:
+                started.set()
+                fail.wait(5)
+                raise ValueError('error')
+            time.sleep(0.05)
+            return ({'id': len(calls)}, None, None)
+
+        def call_first():
+            with pytest.raises(ValueError):
+                idempotency.call('a', func)
+
+        results = []
+        first = threading.Thread(target=call_first)
+        first.start()
+        started.wait(5)
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(idempotency.call('a', func)))
+            for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        # Let the duplicates start waiting before the first call fails.
+        time.sleep(0.1)
+        fail.set()
+        for thread in [first] + threads:
+            thread.join()
+        assert 2 == len(calls)
+        assert [({'id': 2}, None, None)] * 3 == results
+        assert ({'id': 2}, None, None) == idempotency.store.get('a')
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+import doctor
+
+
+def test_submodules_are_lazily_importable():
+    assert doctor.errors.DoctorError
+    assert doctor.schema.Schema
+    assert 'routing' in dir(doctor)
+
+
+def test_import_types_does_not_import_heavy_dependencies():
+    code = (
+        'import sys, doctor, doctor.types, doctor.routing; '
+        'heavy = ("jsonschema", "yaml", "isodate", "rfc3987", "simplejson"); '
+        'print(",".join(m for m in heavy if m in sys.modules))')
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.decode('utf-8').strip() == ''
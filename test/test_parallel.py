@@ -0,0 +1,48 @@
+import itertools
+
+import pytest
+
+from doctor.parallel import iter_chunks, map_chunks
+
+
+def double(values):
+    return [value * 2 for value in values]
+
+
+def add_offset(values):
+    return [value + offset for value in values]
+
+
+def set_offset(value):
+    global offset
+    offset = value
+
+
+def test_iter_chunks():
+    assert [[0, 1], [2, 3], [4]] == list(iter_chunks(range(5), 2))
+    assert [] == list(iter_chunks([], 2))
+
+
+def test_map_chunks():
+    results = map_chunks(double, range(100), processes=2, chunk_size=7)
+    assert [value * 2 for value in range(100)] == list(results)
+
+
+def test_map_chunks_initializer():
+    results = map_chunks(add_offset, range(10), processes=2, chunk_size=3,
+                         initializer=set_offset, initargs=(100,))
+    assert list(range(100, 110)) == list(results)
+
+
+def test_map_chunks_is_lazy():
+    # Only a few chunks are read ahead of the results that are consumed.
+    values = itertools.count()
+    results = map_chunks(double, values, processes=1, chunk_size=2)
+    assert [0, 2, 4] == list(itertools.islice(results, 3))
+    results.close()
+    assert next(values) <= 8
+
+
+def test_map_chunks_invalid_chunk_size():
+    with pytest.raises(ValueError, match='chunk_size must be at least 1'):
+        list(map_chunks(double, range(10), chunk_size=0))
@@ -5,10 +5,12 @@ import json
 
 import pytest
 
-from doctor.errors import ParseError, TypeSystemError
+from doctor.errors import (
+    InvalidValueError, ParseError, PayloadTooLargeError, TypeSystemError)
 from doctor.parsers import (
-    map_param_names, parse_form_and_query_params, parse_json, parse_value,
-    _parse_string)
+    check_payload_limits, get_default_payload_limits, map_param_names,
+    parse_form_and_query_params, parse_json, parse_value, PayloadLimits,
+    set_default_payload_limits, _parse_string)
 from doctor.types import string
 
 from .base import TestCase
@@ -37,6 +39,15 @@ class TestParsers(TestCase):
         with pytest.raises(ParseError, match=message):
             parse_json('bad json')
 
+    def test_parse_json_error_truncates_value(self):
+        value = '{"foo": ' + 'x' * 1000
+        with pytest.raises(ParseError) as excinfo:
+            parse_json(value)
+        message = str(excinfo.value)
+        assert message.startswith(
+            'Error parsing JSON: \'{"foo": ' + 'x' * 88 + '... error: ')
+        assert 'x' * 100 not in message
+
     def test_parse_json_with_sig_params(self):
         """
         Verifies if we pass a signature it maps parameters properly.
@@ -51,6 +62,50 @@ class TestParsers(TestCase):
         actual = parse_json(request_params, sig.parameters)
         assert {'lat': 127.11} == actual
 
+    def test_parse_json_with_limits(self):
+        limits = PayloadLimits(max_body_bytes=25, max_depth=2,
+                               max_array_length=2, max_object_keys=2)
+        assert {'a': [1, 2]} == parse_json('{"a": [1, 2]}', limits=limits)
+        assert {'a': [1, 2]} == parse_json(b'{"a": [1, 2]}', limits=limits)
+
+        with pytest.raises(PayloadTooLargeError,
+                           match='Payload must not be larger than 25 bytes'):
+            parse_json('{"a": "' + 'x' * 20 + '"}', limits=limits)
+        with pytest.raises(InvalidValueError,
+                           match='nested more than 2 levels deep'):
+            parse_json('{"a": [[1]]}', limits=limits)
+        with pytest.raises(InvalidValueError,
+                           match='Arrays must not have more than 2 items'):
+            parse_json('[1, 2, 3]', limits=limits)
+        with pytest.raises(InvalidValueError,
+                           match='Objects must not have more than 2 keys'):
+            parse_json('{"a": 1, "b": 2, "c": 3}', limits=limits)
+
+    def test_check_payload_limits(self):
+        # No limits
+        check_payload_limits([[[[{'a': 1}]]]], PayloadLimits())
+
+        limits = PayloadLimits(max_depth=3)
+        check_payload_limits(1, limits)
+        check_payload_limits({'a': [{'b': 1}], 'c': {'d': []}}, limits)
+        with pytest.raises(InvalidValueError):
+            check_payload_limits({'a': [{'b': []}]}, limits)
+
+        # Nested values are checked.
+        limits = PayloadLimits(max_array_length=1)
+        with pytest.raises(InvalidValueError):
+            check_payload_limits({'a': {'b': [1, 2]}}, limits)
+
+    def test_default_payload_limits(self):
+        assert get_default_payload_limits() is None
+        limits = PayloadLimits(max_depth=1)
+        set_default_payload_limits(limits)
+        try:
+            assert get_default_payload_limits() is limits
+        finally:
+            set_default_payload_limits(None)
+        assert get_default_payload_limits() is None
+
     def test_parse_value_allowed_types_is_str(self):
         assert ('integer', 12) == parse_value('12', allowed_types='integer')
 
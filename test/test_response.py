@@ -0,0 +1,15 @@
+import pytest
+
+from doctor.response import Response
+
+
+class TestResponse(object):
+
+    def test_validate_every(self):
+        assert 1 == Response([]).validate_every
+        assert 10 == Response(iter([]), validate_every=10).validate_every
+
+    @pytest.mark.parametrize('validate_every', [0, -1, 1.5, '2', None, True])
+    def test_invalid_validate_every(self, validate_every):
+        with pytest.raises(ValueError, match='validate_every must be an int'):
+            Response(iter([]), validate_every=validate_every)
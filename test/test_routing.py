@@ -1,10 +1,18 @@
 import inspect
 
+import mock
+import pytest
 from flask_restful import Resource
 
+from doctor.concurrency import ConcurrencyLimit
+from doctor.deadline import Deadline
+from doctor.errors import ServiceUnavailableError
 from doctor.flask import handle_http
+from doctor.idempotency import Idempotency
+from doctor.parsers import PayloadLimits
 from doctor.routing import (
-    create_routes, delete, get, get_handler_name, post, put, HTTPMethod, Route)
+    create_http_method, create_routes, delete, get, get_handler_name, post,
+    put, HTTPMethod, Route)
 from doctor.utils import Params
 
 from .types import Age, Foo, FooId, FooInstance, Foos, IsAlive, Name
@@ -46,6 +54,83 @@ class TestRouting(object):
         assert [ValueError] == m.logic._doctor_allowed_exceptions
         assert 'Retrieve' == m.logic._doctor_title
         assert m.logic._doctor_req_obj_type is None
+        assert m.logic._doctor_payload_limits is None
+        assert m.logic._doctor_max_errors is None
+        assert m.logic._doctor_sparse_fields is False
+        assert m.logic._doctor_idempotency is None
+        assert m.logic._doctor_concurrency_limit is None
+        assert m.logic._doctor_timeout is None
+        assert m.logic._doctor_deadline_param is None
+
+    def test_httpmethod_with_payload_limits(self):
+        limits = PayloadLimits(max_depth=2)
+        m = post(create_foo, payload_limits=limits)
+        assert m.logic._doctor_payload_limits is limits
+
+    def test_httpmethod_with_max_errors(self):
+        m = put(update_foo, max_errors=1)
+        assert 1 == m.logic._doctor_max_errors
+
+    def test_httpmethod_with_sparse_fields(self):
+        m = get(get_foo, sparse_fields=True)
+        assert m.logic._doctor_sparse_fields is True
+
+    def test_httpmethod_with_idempotency(self):
+        idempotency = Idempotency()
+        m = post(create_foo, idempotency=idempotency)
+        assert m.logic._doctor_idempotency is idempotency
+        m = put(update_foo, idempotency=idempotency)
+        assert m.logic._doctor_idempotency is idempotency
+
+    def test_httpmethod_with_concurrency_limit(self):
+        limit = ConcurrencyLimit(1)
+        for func in (delete, get, post, put):
+            m = func(get_foo, concurrency_limit=limit)
+            assert m.logic._doctor_concurrency_limit is limit
+
+    def test_httpmethod_with_timeout(self):
+        def get_foo_with_deadline(name: Name, deadline: Deadline):
+            pass
+
+        m = get(get_foo_with_deadline, timeout=1.5)
+        assert 1.5 == m.logic._doctor_timeout
+        assert 'deadline' == m.logic._doctor_deadline_param
+
+    def test_create_http_method_concurrency_limit(self):
+        limit = ConcurrencyLimit(1)
+        logic = get(get_foo, concurrency_limit=limit).logic
+        mock_handle_http = mock.Mock(
+            side_effect=lambda *args: limit.active)
+        handle_error = mock.Mock(return_value='shed')
+        fn = create_http_method(logic, 'get', mock_handle_http,
+                                handle_error=handle_error)
+
+        # The slot is held while the request is handled and then released.
+        assert 1 == fn(None)
+        assert 0 == limit.active
+
+        limit.acquire()
+        assert 'shed' == fn(None)
+        assert 1 == mock_handle_http.call_count
+        error = handle_error.call_args[0][0]
+        assert isinstance(error, ServiceUnavailableError)
+
+        # Without handle_error the error is raised.
+        fn = create_http_method(logic, 'get', mock_handle_http)
+        with pytest.raises(ServiceUnavailableError):
+            fn(None)
+        assert 2 == limit.shed
+
+    def test_create_http_method_global_concurrency_limit(self):
+        limit = ConcurrencyLimit(1)
+        limit.acquire()
+        mock_handle_http = mock.Mock()
+        fn = create_http_method(get(get_foo).logic, 'get', mock_handle_http)
+        with mock.patch('doctor.routing.get_global_concurrency_limit',
+                        return_value=limit):
+            with pytest.raises(ServiceUnavailableError):
+                fn(None)
+        assert not mock_handle_http.called
 
     def test_httpmethod_with_req_obj_type(self):
         m = HTTPMethod('get', get_foo, allowed_exceptions=[ValueError],
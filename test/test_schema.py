@@ -1,19 +1,26 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import jsonschema
 import mock
 import pytest
 import simplejson as json
 
+from doctor.compiler import CompiledValidator
 from doctor.errors import (
     ParseError, SchemaError, SchemaLoadingError, SchemaValidationError)
-from doctor.schema import Schema, SchemaRefResolver
+from doctor.schema import (
+    clear_schema_cache, get_default_validator_backend, get_schema_cache_dir,
+    load_schema_file, preload_schema_files, set_default_validator_backend,
+    set_schema_cache_dir, Schema, SchemaRefResolver)
 from .base import TestCase
 
 
 class TestSchema(TestCase):
 
     def setUp(self):
+        clear_schema_cache()
         self.schema = Schema.from_file(os.path.join(
             os.path.dirname(__file__), 'schema', 'annotation.yaml'))
 
@@ -140,6 +147,44 @@ class TestSchemaRefResolver(TestCase):
         with pytest.raises(SchemaError, match=expected_message):
             self.resolver.resolve('#/invalid_ref_chain_1')
 
+    def test_scopes_are_per_thread(self):
+        barrier = threading.Barrier(2)
+        scopes = {}
+
+        def resolve_in_scope(name):
+            with self.resolver.in_scope(name + '.yaml'):
+                # Both threads have pushed a scope before either reads it.
+                barrier.wait(5)
+                scopes[name] = self.resolver.resolution_scope
+                barrier.wait(5)
+
+        threads = [threading.Thread(target=resolve_in_scope, args=(name,))
+                   for name in ('foo', 'bar')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert self.base_uri + 'foo.yaml' == scopes['foo']
+        assert self.base_uri + 'bar.yaml' == scopes['bar']
+        assert self.base_uri == self.resolver.resolution_scope
+
+    def test_concurrent_validation(self):
+        schema = {'type': 'array', 'items': {'$ref': '#/definitions/urls'}}
+        validator = self.schema.get_validator(schema)
+        valid = [['https://upsight.com']]
+
+        def validate(i):
+            for _ in range(50):
+                self.schema.validate(valid, validator)
+                with pytest.raises(SchemaValidationError):
+                    self.schema.validate([[i]], validator)
+                assert 'Auto-increment ID.' == self.resolver.resolve(
+                    '#/test_ref')[1]['description']
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(validate, range(16)))
+        assert [self.base_uri] == self.resolver._scopes_stack
+
     def test_resolve_error_circular_chain(self):
         """If there is a circular reference, should raise an error."""
         expected_message = (
@@ -148,3 +193,365 @@ class TestSchemaRefResolver(TestCase):
             r"/#/circular_ref_chain_1")
         with pytest.raises(SchemaError, match=expected_message):
             self.resolver.resolve('#/circular_ref_chain_1')
+
+
+class TestSchemaCache(object):
+
+    def setup_method(self, method):
+        clear_schema_cache()
+
+    def teardown_method(self, method):
+        clear_schema_cache()
+
+    def write_schema(self, path, description):
+        path.write('definitions:\n  foo:\n    description: {}\n'
+                   '    type: string\n'.format(description))
+        return str(path)
+
+    def test_load_schema_file(self, tmpdir):
+        path = self.write_schema(tmpdir.join('foo.yaml'), 'Foo.')
+        document = load_schema_file(path)
+        assert 'Foo.' == document['definitions']['foo']['description']
+        with mock.patch('doctor.schema.yaml') as mock_yaml:
+            assert document is load_schema_file(path)
+            assert not mock_yaml.load.called
+
+    def test_load_schema_file_changed(self, tmpdir):
+        path = self.write_schema(tmpdir.join('foo.yaml'), 'Foo.')
+        document = load_schema_file(path)
+        self.write_schema(tmpdir.join('foo.yaml'), 'Changed foo.')
+        # Make sure the modification time changes on coarse filesystems.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        reloaded = load_schema_file(path)
+        assert reloaded is not document
+        assert 'Changed foo.' == reloaded['definitions']['foo']['description']
+
+    def test_from_file_is_shared(self, tmpdir):
+        path = self.write_schema(tmpdir.join('foo.yaml'), 'Foo.')
+        schema = Schema.from_file(path)
+        assert schema is Schema.from_file(path)
+        assert schema.resolver is Schema.from_file(path).resolver
+
+        # Other classes and extra kwargs create new instances, but share the
+        # parsed document.
+        class OtherSchema(Schema):
+            def __init__(self, schema, foo=None, **kwargs):
+                super().__init__(schema, **kwargs)
+                self.foo = foo
+
+        other = OtherSchema.from_file(path)
+        assert other is not schema
+        assert other.schema is schema.schema
+        assert other is OtherSchema.from_file(path)
+        with_kwargs = OtherSchema.from_file(path, foo=1)
+        assert 1 == with_kwargs.foo
+        assert with_kwargs is not OtherSchema.from_file(path, foo=1)
+
+    def test_clear_schema_cache(self, tmpdir):
+        path = self.write_schema(tmpdir.join('foo.yaml'), 'Foo.')
+        other_path = self.write_schema(tmpdir.join('bar.yaml'), 'Bar.')
+        schema = Schema.from_file(path)
+        other = Schema.from_file(other_path)
+
+        clear_schema_cache(path)
+        assert schema is not Schema.from_file(path)
+        assert other is Schema.from_file(other_path)
+
+        clear_schema_cache()
+        assert other is not Schema.from_file(other_path)
+
+
+class TestSchemaCacheDir(object):
+
+    def setup_method(self, method):
+        clear_schema_cache()
+
+    def teardown_method(self, method):
+        clear_schema_cache()
+        set_schema_cache_dir(None)
+
+    def test_parsed_schema_is_stored(self, tmpdir):
+        path = tmpdir.join('foo.yaml')
+        path.write('definitions:\n  foo:\n    type: string\n')
+        cache_dir = tmpdir.join('cache')
+        set_schema_cache_dir(str(cache_dir))
+        assert str(cache_dir) == get_schema_cache_dir()
+
+        document = load_schema_file(str(path))
+        assert 1 == len(cache_dir.listdir())
+
+        # A new process loads the stored file instead of parsing the YAML.
+        clear_schema_cache()
+        with mock.patch('doctor.schema.yaml') as mock_yaml:
+            assert document == load_schema_file(str(path))
+            assert not mock_yaml.load.called
+
+    def test_values_marshal_cant_store(self, tmpdir):
+        path = tmpdir.join('foo.yaml')
+        path.write('example: 2020-01-01\n')
+        cache_dir = tmpdir.join('cache')
+        set_schema_cache_dir(str(cache_dir))
+        document = load_schema_file(str(path))
+        assert '2020-01-01' == str(document['example'])
+        assert not cache_dir.exists()
+
+    @mock.patch('doctor.schema.logging')
+    def test_invalid_stored_file(self, mock_logging, tmpdir):
+        path = tmpdir.join('foo.yaml')
+        path.write('type: string\n')
+        cache_dir = tmpdir.join('cache')
+        set_schema_cache_dir(str(cache_dir))
+        load_schema_file(str(path))
+        cache_dir.listdir()[0].write('invalid')
+
+        clear_schema_cache()
+        assert {'type': 'string'} == load_schema_file(str(path))
+        assert mock_logging.warning.called
+
+
+class TestBundle(object):
+
+    def write_schemas(self, tmpdir):
+        tmpdir.join('common.yaml').write(
+            'definitions:\n'
+            '  id:\n'
+            '    $ref: "#/definitions/integer_id"\n'
+            '  integer_id:\n'
+            '    type: integer\n')
+        path = tmpdir.join('foo.yaml')
+        path.write(
+            'definitions:\n'
+            '  foo_id:\n'
+            '    $ref: "common.yaml#/definitions/id"\n'
+            '  node:\n'
+            '    type: object\n'
+            '    properties:\n'
+            '      children:\n'
+            '        type: array\n'
+            '        items:\n'
+            '          $ref: "#/definitions/node"\n'
+            'type: object\n'
+            'properties:\n'
+            '  foo_id:\n'
+            '    $ref: "#/definitions/foo_id"\n'
+            '  parent_id:\n'
+            '    $ref: "#/definitions/foo_id"\n'
+            'additionalProperties: false\n'
+            'not_a_keyword:\n'
+            '  $ref: "#/doesnotexist"\n')
+        return str(path)
+
+    def test_bundle(self, tmpdir):
+        schema = Schema.from_file(self.write_schemas(tmpdir))
+        bundled = schema.bundle()
+        assert {'type': 'object',
+                'properties': {'foo_id': {'type': 'integer'},
+                               'parent_id': {'type': 'integer'}},
+                'additionalProperties': False,
+                'definitions': schema.schema['definitions'],
+                'not_a_keyword': {'$ref': '#/doesnotexist'}} == bundled
+        # References to the same value are inlined once.
+        assert bundled['properties']['foo_id'] is (
+            bundled['properties']['parent_id'])
+        assert bundled is schema.bundle()
+
+        validator = schema.get_validator(bundled)
+        schema.validate({'foo_id': 1}, validator)
+        with pytest.raises(SchemaValidationError):
+            schema.validate({'foo_id': 'a'}, validator)
+
+    def test_bundle_ref(self, tmpdir):
+        schema = Schema.from_file(self.write_schemas(tmpdir))
+        assert {'type': 'integer'} == schema.bundle('#/definitions/foo_id')
+
+    def test_bundle_recursive(self, tmpdir):
+        schema = Schema.from_file(self.write_schemas(tmpdir))
+        with pytest.raises(SchemaError, match='Circular reference in schema'):
+            schema.bundle('#/definitions/node')
+
+    def test_bundle_invalid_ref(self, tmpdir):
+        schema = Schema.from_file(self.write_schemas(tmpdir))
+        with pytest.raises(SchemaError, match='doesnotexist'):
+            schema.bundle('#/doesnotexist')
+
+
+class TestValidatorBackend(object):
+
+    @pytest.fixture(autouse=True)
+    def restore_default_backend(self):
+        yield
+        set_default_validator_backend('jsonschema')
+
+    def get_schema(self, **kwargs):
+        return Schema({
+            'definitions': {
+                'id': {'type': 'integer'},
+                'node': {
+                    'type': 'object',
+                    'properties': {
+                        'children': {
+                            'type': 'array',
+                            'items': {'$ref': '#/definitions/node'}}}}},
+            'type': 'object',
+            'properties': {'id': {'$ref': '#/definitions/id'}},
+            'required': ['id']}, **kwargs)
+
+    def test_default_backend(self):
+        assert 'jsonschema' == get_default_validator_backend()
+        validator = self.get_schema().get_validator()
+        assert isinstance(validator, jsonschema.Draft4Validator)
+
+    def test_set_default_validator_backend(self):
+        set_default_validator_backend('compiled')
+        assert 'compiled' == get_default_validator_backend()
+        assert isinstance(self.get_schema().get_validator(),
+                          CompiledValidator)
+
+        with pytest.raises(ValueError, match='backend must be one of'):
+            set_default_validator_backend('foo')
+
+    def test_schema_backend(self):
+        schema = self.get_schema(validator_backend='compiled')
+        validator = schema.get_validator()
+        assert isinstance(validator, CompiledValidator)
+        assert validator is schema.get_validator()
+        schema.validate({'id': 1}, validator)
+        with pytest.raises(SchemaValidationError) as exc_info:
+            schema.validate({'id': 'a'}, validator)
+        assert {'id': "'a' is not of type 'integer'"} == (
+            exc_info.value.errors)
+        with pytest.raises(SchemaValidationError) as exc_info:
+            schema.validate({}, validator)
+        assert {'_other': "'id' is a required property"} == (
+            exc_info.value.errors)
+
+        # A schema's backend overrides the default.
+        set_default_validator_backend('compiled')
+        schema = self.get_schema(validator_backend='jsonschema')
+        assert isinstance(schema.get_validator(), jsonschema.Draft4Validator)
+
+        with pytest.raises(ValueError, match='backend must be one of'):
+            self.get_schema(validator_backend='foo')
+
+    def test_compiled_bundles(self):
+        schema = self.get_schema(validator_backend='compiled')
+        bundled = schema.bundle('#/definitions/id')
+        validator = schema.get_validator(bundled)
+        assert isinstance(validator, CompiledValidator)
+        assert validator is schema.get_validator(bundled)
+
+        # Schemas that aren't bundles of the schema aren't compiled.
+        validator = schema.get_validator({'type': 'integer'})
+        assert isinstance(validator, jsonschema.Draft4Validator)
+
+    def test_recursive_schema_not_compiled(self):
+        schema = self.get_schema(validator_backend='compiled')
+        schema.schema['properties']['node'] = {'$ref': '#/definitions/node'}
+        validator = schema.get_validator()
+        assert isinstance(validator, jsonschema.Draft4Validator)
+        schema.validate({'id': 1, 'node': {'children': [{}]}}, validator)
+
+
+class TestPreload(object):
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        clear_schema_cache()
+        yield
+        clear_schema_cache()
+
+    def write_schemas(self, tmpdir):
+        tmpdir.join('foo.yaml').write(
+            'type: object\n'
+            'properties:\n'
+            '  bar:\n'
+            '    $ref: "sub/bar.json#/definitions/bar"\n')
+        tmpdir.mkdir('sub').join('bar.json').write(
+            '{"definitions": {"bar": {"type": "integer"}}}')
+        tmpdir.join('bad.yml').write('foo: [')
+        tmpdir.join('README.txt').write('not a schema')
+
+    @pytest.mark.parametrize('processes', (False, True))
+    def test_preload_schema_files(self, tmpdir, processes):
+        self.write_schemas(tmpdir)
+        result = preload_schema_files(str(tmpdir), max_workers=2,
+                                      processes=processes)
+        foo_path = str(tmpdir.join('foo.yaml'))
+        bar_path = str(tmpdir.join('sub', 'bar.json'))
+        bad_path = str(tmpdir.join('bad.yml'))
+        assert [foo_path, bar_path] == sorted(result.documents)
+        assert {'definitions': {'bar': {'type': 'integer'}}} == (
+            result.documents[bar_path])
+        assert [foo_path, bar_path] == sorted(result.timings)
+        assert all(seconds >= 0 for seconds in result.timings.values())
+        assert [bad_path] == list(result.errors)
+        assert result.total >= max(result.timings.values())
+
+        # The files were added to the cache.
+        with mock.patch('doctor.schema._parse_schema') as mock_parse:
+            assert result.documents[foo_path] is load_schema_file(foo_path)
+            assert result.documents[bar_path] is load_schema_file(bar_path)
+            # Cached files aren't loaded again.
+            result = preload_schema_files(str(tmpdir))
+        # Only the invalid file is parsed again.
+        mock_parse.assert_called_once_with(b'foo: [')
+        assert 0.0 == result.timings[foo_path]
+        assert 0.0 == result.timings[bar_path]
+
+    def test_preload(self, tmpdir):
+        self.write_schemas(tmpdir)
+        schema = Schema.from_file(str(tmpdir.join('foo.yaml')))
+        result = schema.preload()
+        assert str(tmpdir) == result.root
+        bar_path = str(tmpdir.join('sub', 'bar.json'))
+        assert result.documents[bar_path] is (
+            schema.resolver.store['file://' + bar_path])
+
+        with mock.patch('doctor.schema.load_schema_file') as mock_load:
+            validator = schema.get_validator()
+            schema.validate({'bar': 1}, validator)
+            with pytest.raises(SchemaValidationError):
+                schema.validate({'bar': 'a'}, validator)
+        mock_load.assert_not_called()
+
+    def test_preload_requires_root(self):
+        with pytest.raises(ValueError, match='root directory is required'):
+            Schema({}).preload()
+
+
+class TestValidateMany(object):
+
+    def get_schema(self):
+        return Schema({
+            'definitions': {'id': {'type': 'integer'}},
+            'type': 'object',
+            'properties': {'id': {'$ref': '#/definitions/id'}}})
+
+    def test_validate_many(self):
+        schema = self.get_schema()
+        with mock.patch.object(schema, 'get_validator',
+                               wraps=schema.get_validator) as mock_get:
+            results = list(schema.validate_many(
+                iter([{'id': 1}, {'id': 'a'}])))
+        mock_get.assert_called_once_with(None)
+        assert ({'id': 1}, None) == results[0]
+        value, error = results[1]
+        assert {'id': 'a'} == value
+        assert isinstance(error, SchemaValidationError)
+        assert {'id': "'a' is not of type 'integer'"} == error.errors
+
+    def test_custom_schema(self):
+        schema = self.get_schema()
+        results = schema.validate_many(
+            [1, 'a'], schema=schema.bundle('#/definitions/id'))
+        assert [None, "'a' is not of type 'integer'"] == [
+            error and error.args[0] for _, error in results]
+
+    def test_processes(self):
+        values = [{'id': i} for i in range(20)] + [{'id': 'a'}]
+        results = list(self.get_schema().validate_many(
+            values, processes=2, chunk_size=3))
+        assert values == [value for value, _ in results]
+        assert [None] * 20 == [error for _, error in results[:20]]
+        assert {'id': "'a' is not of type 'integer'"} == results[20][1].errors
@@ -1,14 +1,23 @@
+import operator
 import os
+import pickle
+import re
+import sys
+import warnings
 from datetime import date, datetime
 
+import mock
 import pytest
 
 from doctor.errors import TypeSystemError
+from doctor.formats import FORMATS, register_format
 from doctor.resource import ResourceSchema
+from doctor.schema import set_default_validator_backend
 from doctor.types import (
-    array, Array, boolean, Boolean, enum, Enum, integer, json_schema_type,
-    Object, new_type, number, Number, string, String, MissingDescriptionError,
-    SuperType, UnionType)
+    array, Array, boolean, Boolean, CheckResult, enum, Enum, integer,
+    json_schema_type, limit_errors, Object, new_type, number, Number, Record,
+    string, String, MissingDescriptionError, SuperType, to_native, UnionType,
+    UnsafePatternError)
 
 
 class TestSuperType(object):
@@ -144,6 +153,70 @@ class TestString(object):
         with pytest.raises(TypeSystemError):
             S('bar')
 
+    def test_pattern_is_compiled(self):
+        S = string('a regex', pattern=r'^foo')
+        assert S._pattern_re.pattern == r'^foo'
+        # Changing the pattern after the class is created recompiles it.
+        S.pattern = r'^bar'
+        S('bar')
+        with pytest.raises(TypeSystemError) as excinfo:
+            S('foo')
+        assert 'Must match the pattern /^bar/.' == excinfo.value.detail
+
+        class SubString(S):
+            pass
+        with pytest.raises(TypeSystemError, match=r'pattern /\^bar/'):
+            SubString('foo')
+
+    def test_pattern_max_length(self):
+        S = string('a regex', pattern=r'^a+$', pattern_max_length=3)
+        S('aaa')
+        with pytest.raises(TypeSystemError,
+                           match='Must have no more than 3 characters to '
+                                 'match the pattern'):
+            S('aaaa')
+
+    def test_unsafe_pattern(self):
+        with pytest.warns(UserWarning, match='has nested quantifiers'):
+            string('unsafe', pattern=r'^(a+)+$')
+
+        with pytest.raises(UnsafePatternError,
+                           match='has nested quantifiers'):
+            string('unsafe', pattern=r'^(\w*\s?)*$', unsafe_pattern='error')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            string('unsafe', pattern=r'^(a+)+$', unsafe_pattern='ignore')
+            # Safe patterns
+            string('safe', pattern=r'^(?:[a-z]+-)?[a-z]+$')
+            string('safe', pattern=r'^(?:ab{2})*$')
+            string('safe', pattern=r'^(?:a++)*$')
+
+    def test_unsafe_pattern_warning_location(self):
+        with pytest.warns(UserWarning) as record:
+            string('unsafe', pattern=r'^(a+)+$')
+
+            class S(String):
+                description = 'unsafe'
+                pattern = r'^(b+)+$'
+        assert [__file__, __file__] == [w.filename for w in record]
+
+    def test_compiled_pattern(self):
+        with pytest.warns(UserWarning) as record:
+            S = string('unsafe', pattern=re.compile(r'^(a+)+$', re.I))
+            S('AA')
+            with pytest.raises(TypeSystemError) as excinfo:
+                S('b')
+        assert 'Must match the pattern /^(a+)+$/.' == excinfo.value.detail
+        assert 1 == len(record)
+        with mock.patch('doctor.types.compile_pattern') as mock_compile:
+            S('aaa')
+        mock_compile.assert_not_called()
+
+        # The pattern is recompiled if it's replaced.
+        S.pattern = re.compile(r'^b$')
+        S('b')
+
     def test_format_date(self):
         S = string('date', format='date')
         # No exception
@@ -196,6 +269,34 @@ class TestString(object):
         with pytest.raises(TypeSystemError, match=expected_msg):
             S('foo')
 
+    def test_format_uuid(self):
+        S = string('uuid', format='uuid')
+        # no exception
+        S('6fa459ea-ee8a-3ca4-894e-db77e160355e')
+        # Invalid uuid
+        with pytest.raises(TypeSystemError, match='Not a valid UUID.'):
+            S('foo')
+
+    def test_format_custom(self):
+        @register_format('upper')
+        def parse_upper(value):
+            if not value.isalpha():
+                raise ValueError('Must only contain letters.')
+            return value.upper()
+
+        try:
+            S = string('upper', format='upper')
+            assert 'FOO' == S('foo')
+            with pytest.raises(TypeSystemError,
+                               match='Must only contain letters.'):
+                S('foo1')
+        finally:
+            del FORMATS['upper']
+
+    def test_format_unknown(self):
+        S = string('unknown', format='unknown')
+        assert 'foo' == S('foo')
+
     def test_get_example(self):
         S = string('A string.', example='Foo')
         assert 'Foo' == S.get_example()
@@ -636,6 +737,49 @@ class TestArray(object):
         with pytest.raises(TypeSystemError, match='This item is not unique.'):
             A([1, 1, 1, 2])
 
+    def test_unique_items_unhashable(self):
+        A = array('unique', unique_items=True)
+        A([{'a': [1, 2]}, {'a': [2, 1]}, [{'a': 1}], [{'a': 2}], {}, []])
+        with pytest.raises(TypeSystemError) as excinfo:
+            A([{'a': [1, {'b': 2}]}, [1], {'a': [1, {'b': 2}]}, [1]])
+        assert {2: 'This item is not unique.',
+                3: 'This item is not unique.'} == excinfo.value.detail
+
+        A = array('unique', items=FooObject, unique_items=True)
+        with pytest.raises(TypeSystemError, match='not unique'):
+            A([{'foo': 'aa', 'bar': 'b'}, {'bar': 'b', 'foo': 'aa'}])
+
+    def test_unique_items_unique_key(self):
+        A = array('unique', items=FooObject, unique_items=True,
+                  unique_key=operator.itemgetter('foo'))
+        A([{'foo': 'aa', 'bar': 'b'}, {'foo': 'bb', 'bar': 'b'}])
+        with pytest.raises(TypeSystemError) as excinfo:
+            A([{'foo': 'aa', 'bar': 'b'}, {'foo': 'aa', 'bar': 'c'}])
+        assert {1: 'This item is not unique.'} == excinfo.value.detail
+
+    def test_unique_items_unique_key_error(self):
+        A = array('unique', unique_items=True,
+                  unique_key=operator.itemgetter('foo'))
+        with pytest.raises(TypeSystemError) as excinfo:
+            A([{'foo': 1}, {'bar': 1}, 'a', None])
+        assert {1: 'Could not get the unique key of this item.',
+                2: 'Could not get the unique key of this item.',
+                3: 'Could not get the unique key of this item.'} == (
+            excinfo.value.detail)
+
+        A = array('unique', unique_items=True,
+                  unique_key=operator.attrgetter('foo'))
+        with pytest.raises(TypeSystemError,
+                           match='Could not get the unique key'):
+            A([{'foo': 1}])
+
+    def test_unique_items_lists_and_tuples(self):
+        A = array('unique', unique_items=True)
+        A([[1, 2], (1, 2), [[1]], [(1,)]])
+        with pytest.raises(TypeSystemError) as excinfo:
+            A([(1, 2), [1, 2], (1, 2)])
+        assert {2: 'This item is not unique.'} == excinfo.value.detail
+
     def test_get_example(self):
         A = array('No example of items')
         assert [1] == A.get_example()
@@ -698,6 +842,42 @@ class TestJsonSchema(object):
                            match="'foobar' is not of type 'integer'"):
             J(data)
 
+    def test_bundled_schema(self):
+        schema_file = os.path.join(
+            os.path.dirname(__file__), 'schema', 'annotation.yaml')
+        J = json_schema_type(schema_file, definition_key='auth')
+        assert {'description': 'auth token',
+                'example': 'eb25f25becca416092752b0f457f1271',
+                'type': ['string']} == J.bundled_schema
+        assert 'token' == J('token')
+        with pytest.raises(TypeSystemError, match="is not of type 'string'"):
+            J(1)
+
+        # Recursive definitions can't be bundled, so their references are
+        # resolved while validating.
+        J = json_schema_type(schema_file, definition_key='annotations')
+        assert J.bundled_schema is None
+        data = [{'annotation_id': 1, 'name': 'test'}]
+        assert data == J(data)
+
+    def test_compiled_validator_backend(self):
+        schema_file = os.path.join(
+            os.path.dirname(__file__), 'schema', 'annotation.yaml')
+        J = json_schema_type(schema_file, definition_key='auth')
+        set_default_validator_backend('compiled')
+        try:
+            assert 'token' == J('token')
+            with pytest.raises(TypeSystemError,
+                               match="1 is not of type 'string'"):
+                J(1)
+
+            # Recursive definitions are validated with jsonschema.
+            J = json_schema_type(schema_file, definition_key='annotations')
+            data = [{'annotation_id': 1, 'name': 'test'}]
+            assert data == J(data)
+        finally:
+            set_default_validator_backend('jsonschema')
+
     def test_no_definition_key_no_example(self):
         """
         This tests that if we don't pass a definition_key and the schema
@@ -843,3 +1023,437 @@ def test_new_type_allows_custom_description():
     S = string('A string', example='Foo')
     N = new_type(S, description='A different description')
     assert 'A different description' == N.description
+
+
+class TestCheck(object):
+
+    def test_valid(self):
+        result = string('A string', max_length=5).check(' abc ')
+        assert result.valid
+        assert result.value == 'abc'
+        assert result.detail is None
+
+    def test_invalid_detail_is_formatted_lazily(self):
+        S = string('A string', max_length=2)
+        result = S.check('abc')
+        assert not result.valid
+        assert result.code == 'max_length'
+        assert result.detail == 'Must have no more than 2 characters.'
+        with pytest.raises(TypeSystemError,
+                           match='Must have no more than 2 characters.'):
+            result.raise_for_error()
+
+    @pytest.mark.parametrize('annotation, value', (
+        (string('str', min_length=2, pattern='^a'), 'abc'),
+        (string('str', min_length=2, pattern='^a'), 'b'),
+        (string('str', min_length=2, pattern='^a'), 'bc'),
+        (string('date', format='date'), '2018-13-01'),
+        (number('num', minimum=1, maximum=5, multiple_of=0.5), '2.5'),
+        (number('num', minimum=1, maximum=5, multiple_of=0.5), 2.2),
+        (number('num', minimum=1, maximum=5, multiple_of=0.5), 'foo'),
+        (integer('int', exclusive_minimum=True, minimum=1), 1),
+        (integer('int', nullable=True), None),
+        (boolean('bool'), 'on'),
+        (boolean('bool'), 0),
+        (boolean('bool'), 'nope'),
+        (enum('enum', enum=['A', 'B'], case_insensitive=True), 'a'),
+        (enum('enum', enum=['A', 'B']), 'C'),
+        (array('arr', items=integer('int'), unique_items=True), [1, '2']),
+        (array('arr', items=integer('int'), unique_items=True), [1, 'x', 1]),
+        (array('arr', items=integer('int')), 'abc'),
+        (array('arr', items=[integer('int'), string('str')]), [1, 'a']),
+        (new_type(FooObject), {'foo': 'a', 'bar': 'b'}),
+        (new_type(FooObject), {'foo': 'a', 'bar': 1}),
+        (new_type(FooObject), 'foo'),
+        (new_type(FooObject), {1: 'a'}),
+        (NoAddtPropsObject, {'foo': 'a', 'baz': 1}),
+        (RequiredPropsObject, {}),
+        (PropertyDependenciesObject, {'foo': 'a'}),
+    ))
+    def test_matches_constructor(self, annotation, value):
+        result = annotation.check(value)
+        assert isinstance(result, CheckResult)
+        try:
+            expected = annotation(value)
+        except TypeSystemError as e:
+            assert not result.valid
+            assert result.detail == e.detail
+            assert result.to_exception().detail == e.detail
+        else:
+            assert result.valid
+            assert result.value == expected
+            assert type(result.value) is type(expected)
+
+    def test_union(self):
+        class IntOrBool(UnionType):
+            description = 'int or bool'
+            types = [integer('int'), boolean('bool')]
+
+        assert IntOrBool.check('1').value == 1
+        result = IntOrBool.check('x')
+        assert not result.valid
+        assert result.detail.startswith(
+            "Value is not one of ['Integer', 'Boolean']")
+
+    def test_validate_errors_are_returned(self):
+        def validate(value):
+            raise TypeSystemError('Custom error.')
+
+        S = string('A string', validate=staticmethod(validate))
+        result = S.check('abc')
+        assert not result.valid
+        assert result.detail == 'Custom error.'
+        assert str(result.to_exception()) == 'Custom error.'
+
+    def test_custom_constructor_is_called(self):
+        class FooString(String):
+            description = 'foo string'
+
+            def __new__(cls, *args, **kwargs):
+                value = super().__new__(cls, *args, **kwargs)
+                if not value.startswith('foo'):
+                    raise TypeSystemError('Must start with foo', cls=cls)
+                return value
+
+        assert FooString.check('foobar').value == 'foobar'
+        assert FooString.check('bar').detail == 'Must start with foo'
+        A = array('arr', items=FooString)
+        assert A.check(['bar']).detail == {0: 'Must start with foo'}
+
+
+class TestMaxErrors(object):
+
+    def test_array(self):
+        A = array('arr', items=integer('int'))
+        assert 3 == len(A.check(['a', 'b', 'c']).detail)
+
+        A = array('arr', items=integer('int'), max_errors=2)
+        assert {0: 'Must be a valid number.',
+                1: 'Must be a valid number.'} == A.check(['a', 'b', 'c']).detail
+        with pytest.raises(TypeSystemError) as excinfo:
+            A(['a', 1, 'b', 'c'])
+        assert {0: 'Must be a valid number.',
+                2: 'Must be a valid number.'} == excinfo.value.detail
+
+        # Items after the last error are not validated.
+        ints = iter([1, 2])
+
+        def validate(value):
+            next(ints)
+        Int = integer('int', validate=staticmethod(validate))
+        A = array('arr', items=Int, max_errors=1)
+        assert {1: 'Must be a valid number.'} == A.check(
+            [1, 'a', 3, 4, 5]).detail
+
+    def test_object(self):
+        Obj = new_type(RequiredPropsObject, additional_properties=False,
+                       max_errors=1)
+        result = Obj.check({'foo': 'ab', 'baz': 2, 'qux': 3})
+        assert {'bar': 'This field is required.'} == result.detail
+
+        Obj = new_type(Obj, max_errors=None)
+        result = Obj.check({'foo': 'ab', 'baz': 2, 'qux': 3})
+        assert {'bar': 'This field is required.',
+                'baz': 'Additional properties are not allowed.',
+                'qux': 'Additional properties are not allowed.'} == (
+            result.detail)
+
+    def test_limit_errors(self):
+        A = array('arr', items=integer('int'))
+        with limit_errors(1):
+            assert 1 == len(A.check(['a', 'b', 'c']).detail)
+            with limit_errors(None):
+                assert 3 == len(A.check(['a', 'b', 'c']).detail)
+            assert 1 == len(A.check(['a', 'b', 'c']).detail)
+            # The max_errors attribute of a type takes precedence.
+            A2 = new_type(A, max_errors=2)
+            assert 2 == len(A2.check(['a', 'b', 'c']).detail)
+        assert 3 == len(A.check(['a', 'b', 'c']).detail)
+
+
+class TestValidateMany(object):
+
+    def get_details(self, results):
+        return [result.value if result.valid else result.detail
+                for result in results]
+
+    def test_validate_many(self):
+        S = string('A string', max_length=2)
+        results = S.validate_many(iter(['a', 'abc', 'ab']))
+        assert ['a', 'Must have no more than 2 characters.', 'ab'] == (
+            self.get_details(results))
+
+    def test_object(self):
+        results = list(RequiredPropsObject.validate_many(
+            [{'bar': '1'}, {'foo': 'a', 'bar': 1}, 'a']))
+        assert [{'bar': 1},
+                {'foo': 'Must have at least 2 characters.'},
+                'Must be an object.'] == self.get_details(results)
+        assert isinstance(results[0].value, RequiredPropsObject)
+
+        # Objects that override __init__ are still created.
+        class InitObject(RequiredPropsObject):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self['init'] = True
+
+        assert [{'bar': 1, 'init': True}] == self.get_details(
+            InitObject.validate_many([{'bar': 1}]))
+
+    def test_json_schema(self):
+        schema_file = os.path.join(
+            os.path.dirname(__file__), 'schema', 'annotation.yaml')
+        J = json_schema_type(schema_file, definition_key='annotation_id')
+        with mock.patch.object(J.schema, 'get_validator',
+                               wraps=J.schema.get_validator) as mock_get:
+            results = J.validate_many(['1', 2, 'a'])
+            assert [1, 2, "'a' is not of type 'integer'"] == (
+                self.get_details(results))
+        mock_get.assert_called_once_with(J.bundled_schema)
+
+    def test_processes(self):
+        Obj = new_type(RequiredPropsObject, additional_properties=False)
+        values = [{'bar': i} for i in range(20)] + [{'foo': 'a', 'bar': 1}]
+        results = list(Obj.validate_many(values, processes=2, chunk_size=3))
+        assert values[:20] == [result.value for result in results[:20]]
+        assert not results[20].valid
+        assert {'foo': 'Must have at least 2 characters.'} == (
+            results[20].detail)
+
+
+class TestMemoize(object):
+
+    def test_disabled_by_default(self):
+        S = string('A string')
+        assert 'a' == S('a')
+        assert {} == S.memo_info()
+
+    def test_string(self):
+        S = string('A string', max_length=3, memoize=2)
+        with mock.patch.object(S, '_check', wraps=S._check) as mock_check:
+            assert 'abc' == S(' abc ')
+            assert 'abc' == S(' abc ')
+            assert S.check(' abc ').valid
+            for _ in range(2):
+                with pytest.raises(TypeSystemError,
+                                   match='Must have no more than 3'):
+                    S('abcd')
+        assert 2 == mock_check.call_count
+        assert {'hits': 3, 'misses': 2, 'hit_rate': 0.6, 'size': 2,
+                'maxsize': 2} == S.memo_info()
+
+        # The least recently used result is discarded.
+        S('ab')
+        assert 2 == S.memo_info()['size']
+        with mock.patch.object(S, '_check', wraps=S._check) as mock_check:
+            assert not S.check('abcd').valid
+            assert 'abc' == S(' abc ')
+        assert 1 == mock_check.call_count
+
+        S.clear_memo()
+        assert {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 0,
+                'maxsize': 2} == S.memo_info()
+
+    def test_validate_many(self):
+        S = string('A string', max_length=3, memoize=10)
+        results = list(S.validate_many(['a', 'b', 'abcd'] * 100))
+        assert ['a', 'b'] == [r.value for r in results[:2]]
+        assert not results[2].valid
+        assert {'hits': 297, 'misses': 3, 'hit_rate': 0.99, 'size': 3,
+                'maxsize': 10} == S.memo_info()
+
+    def test_keyed_by_type(self):
+        N = number('A number', memoize=10)
+        assert 1.0 == N.check(1).value
+        assert 1.0 == N.check(True).value
+        assert 2 == N.memo_info()['misses']
+
+        B = boolean('A bool', memoize=10)
+        assert B('1') is True
+        assert B(1) is True
+        assert B('0') is False
+        assert 0 == B.memo_info()['hits']
+
+    def test_unhashable_values(self):
+        S = string('A string', memoize=10)
+        assert "['a']" == S.check(['a']).value
+        assert 0 == S.memo_info()['size']
+
+    def test_validate_failures_raise_new_exceptions(self):
+        class S(String):
+            description = 'A string'
+            memoize = 10
+
+            @classmethod
+            def validate(cls, value):
+                raise TypeSystemError('Is not allowed', cls=cls)
+
+        def get_error():
+            with pytest.raises(TypeSystemError) as excinfo:
+                S('a')
+            return excinfo.value
+
+        def traceback_length(e):
+            tb, length = e.__traceback__, 0
+            while tb is not None:
+                tb, length = tb.tb_next, length + 1
+            return length
+
+        errors = [get_error() for _ in range(3)]
+        assert 2 == S.memo_info()['hits']
+        assert errors[0] is not errors[1]
+        assert errors[1] is not errors[2]
+        assert ['Is not allowed'] * 3 == [e.detail for e in errors]
+        assert (traceback_length(errors[0]) ==
+                traceback_length(errors[1]) ==
+                traceback_length(errors[2]))
+
+    def test_subclasses_have_own_memo(self):
+        E = enum('An enum', enum=['A', 'B'], memoize=10)
+        E('A')
+        E2 = new_type(E, enum=['B'])
+        with pytest.raises(TypeSystemError, match='Must be one of'):
+            E2('A')
+        assert 1 == E.memo_info()['size']
+        assert 1 == E2.memo_info()['size']
+
+    def test_object_properties(self):
+        Id = integer('An id', memoize=10)
+        Obj = new_type(Object, description='obj', properties={'id': Id})
+        A = array('arr', items=Obj)
+        A([{'id': '1'}, {'id': '1'}, {'id': '2'}])
+        assert {'hits': 1, 'misses': 2, 'hit_rate': 1 / 3, 'size': 2,
+                'maxsize': 10} == Id.memo_info()
+
+
+class TestIntern(object):
+
+    def new_str(self, value):
+        # Build the string at runtime, so it isn't a constant that's already
+        # shared.
+        return ''.join(list(value))
+
+    def test_enum(self):
+        E = enum('An enum', enum=['active', 'inactive'])
+        first, second = E(self.new_str('active')), E(self.new_str('active'))
+        assert first == second
+        assert first is not second
+
+        E = enum('An enum', enum=['active', 'inactive'], intern_values=True)
+        first, second = E(self.new_str('active')), E(self.new_str('active'))
+        assert first is second
+        assert first is sys.intern('active')
+
+        E = enum('An enum', enum=['A', 'B'], case_insensitive=True,
+                 intern_values=True)
+        assert E(self.new_str('A')) is E(self.new_str('a'))
+
+    def test_object(self):
+        Obj = new_type(RequiredPropsObject, intern_keys=True)
+        values = [{self.new_str('bar'): 1, self.new_str('foo'): 'ab',
+                   self.new_str('other'): 2} for _ in range(2)]
+        first, second = [Obj(value) for value in values]
+        assert ['bar', 'foo', 'other'] == list(first)
+        first_keys, second_keys = list(first), list(second)
+        assert first_keys[0] is second_keys[0]
+        assert first_keys[1] is second_keys[1]
+        # Additional properties aren't interned.
+        assert first_keys[2] is not second_keys[2]
+
+        items = [Obj.check({self.new_str('bar'): 1}).value
+                 for _ in range(2)]
+        assert list(items[0])[0] is list(items[1])[0]
+
+
+class RecordObject(Object):
+    description = 'A record.'
+    additional_properties = False
+    record = True
+    properties = {
+        'id': integer('An id'),
+        'name': string('A name'),
+        'my-key': string('Not an identifier'),
+        'keys': integer('Same name as a method'),
+    }
+    required = ['id']
+
+
+class TestRecord(object):
+
+    def test_record(self):
+        record = RecordObject({'id': '1', 'name': 'a', 'my-key': 'b'})
+        assert isinstance(record, Record)
+        assert not isinstance(record, dict)
+        assert 'RecordObjectRecord' == record.__class__.__name__
+        assert record.__class__ is RecordObject.get_record_class()
+        assert 1 == record.id
+        assert 'a' == record['name']
+        assert 'b' == record['my-key']
+        assert {'id': 1, 'name': 'a', 'my-key': 'b'} == record
+        assert {'id': 1, 'name': 'a', 'my-key': 'b'} == dict(record)
+        assert ['id', 'name', 'my-key'] == list(record)
+        assert 3 == len(record)
+        # Properties that weren't set are missing.
+        assert 'keys' not in record
+        assert record.get('keys') is None
+        with pytest.raises(KeyError):
+            record['keys']
+        with pytest.raises(KeyError):
+            record['foo']
+        # Properties whose name isn't an identifier or is a method name can
+        # only be read as items.
+        assert callable(record.keys)
+        assert ("RecordObjectRecord({'id': 1, 'name': 'a', 'my-key': 'b'})" ==
+                repr(record))
+        # Records are smaller than dicts.
+        assert sys.getsizeof(record) < sys.getsizeof(dict(record))
+        with pytest.raises(AttributeError):
+            record.foo = 1
+
+    def test_read_only(self):
+        record = RecordObject({'id': 1, 'name': 'a'})
+        with pytest.raises(AttributeError, match='is read only'):
+            record.name = 'b'
+        with pytest.raises(AttributeError, match='is read only'):
+            record._0 = 2
+        with pytest.raises(AttributeError, match='is read only'):
+            del record.name
+        with pytest.raises(TypeError):
+            record['name'] = 'b'
+        assert {'id': 1, 'name': 'a'} == record
+
+    def test_check(self):
+        result = RecordObject.check({'id': 1})
+        assert isinstance(result.value, Record)
+        assert {'id': 'Must be a valid number.'} == (
+            RecordObject.check({'id': 'a'}).detail)
+        with pytest.raises(TypeSystemError,
+                           match='Additional properties are not allowed'):
+            RecordObject({'id': 1, 'foo': 2})
+
+    def test_nested(self):
+        A = array('Records', items=RecordObject)
+        records = A([{'id': 1}, {'id': 2}])
+        assert all(isinstance(record, Record) for record in records)
+        # Records are valid values of their type.
+        assert records == A(records)
+        assert [{'id': 1}, {'id': 2}] == to_native(records)
+        assert [{'id': 1}, {'id': 2}] == pickle.loads(
+            pickle.dumps(list(records)))
+
+    def test_unique_items(self):
+        A = array('Records', items=RecordObject, unique_items=True)
+        assert [{'id': 1}, {'id': 2}] == A([{'id': 1}, {'id': 2}])
+        with pytest.raises(TypeSystemError) as excinfo:
+            A([{'id': 1}, {'id': 2}, {'id': 1}])
+        assert {2: 'This item is not unique.'} == excinfo.value.detail
+
+    def test_new_type(self):
+        R = new_type(RecordObject, properties={'id': integer('An id')})
+        record = R({'id': 1})
+        assert ('id',) == record._fields
+        assert record.__class__ is not RecordObject.get_record_class()
+
+    def test_requires_no_additional_properties(self):
+        with pytest.raises(TypeError, match='can only set record if'):
+            new_type(RecordObject, additional_properties=True)